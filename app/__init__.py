@@ -1,21 +1,66 @@
 from flask import Flask
-from .extensions import db, migrate, jwt
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .extensions import db, jwt, init_migrate
 from .routes import register_routes
+from .cli import register_commands
+from .services.instrumentacao_service import init_instrumentacao
+from .services.nplusone_service import init_deteccao_nplusone
+from .services.metricas_service import init_metricas
+from .services.slow_query_service import init_slow_query
+from .services.profiling_service import init_profiling
+from .services.saude_service import init_saude
+from .services.idempotencia_service import init_idempotencia
+from .services.limite_requisicoes_service import init_limite_requisicoes
+from .services.replicas_service import init_replicas
+from .services.auditoria_service import init_auditoria
+from .services.eventos_consultas_service import init_eventos_consultas
 from app import models  # Importa todos os modelos para garantir que sejam registrados
 import os
 
-def create_app(config_name="development"):
+def create_app(config_name=None):
     app = Flask(__name__)
 
+    # Sem nome explícito, a config vem de FLASK_ENV (development, production)
+    config_name = config_name or os.getenv("FLASK_ENV", "development")
+
     # Carrega config de app/config.py
     app.config.from_object(f"app.config.{config_name.capitalize()}Config")
 
+    # Atrás de proxy reverso o remote_addr seria o do proxy (um único balde de limite para todos os clientes)
+    if app.config["TRUSTED_PROXIES"]:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["TRUSTED_PROXIES"])
+
     # Inicializa extensões
     db.init_app(app)
-    migrate.init_app(app, db)
     jwt.init_app(app)
 
+    # Aguarda o banco na subida quando WAIT_FOR_DB_SECONDS > 0 (ex.: container subindo junto com o banco)
+    init_saude(app)
+
+    # Migrações só são usadas pela CLI (`flask db ...`); workers do gunicorn não pagam o import do alembic
+    if os.getenv("FLASK_RUN_FROM_CLI"):
+        init_migrate(app)
+
+    # Instrumentação de performance (Server-Timing, tempo de DB e serialização)
+    init_instrumentacao(app)
+    init_deteccao_nplusone(app)
+    init_metricas(app)
+    init_slow_query(app)
+    init_profiling(app)
+    # Antes da idempotência: requisição recusada com 429 não reserva a Idempotency-Key
+    init_limite_requisicoes(app)
+    init_idempotencia(app)
+    # Leituras de GET/HEAD nas réplicas (REPLICA_DATABASE_URLS); escritas sempre no primário
+    init_replicas(app)
+    # Trilha de auditoria das alterações (outbox na mesma transação, gravação em lote em segundo plano)
+    init_auditoria(app)
+    # Eventos de consultas gravados no commit e distribuídos aos streams SSE de todos os workers
+    init_eventos_consultas(app)
+
     # Registra rotas
     register_routes(app)
 
+    # Registra comandos de linha de comando (flask ...)
+    register_commands(app)
+
     return app
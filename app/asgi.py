@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Modo de serviço assíncrono (ASGI).
+
+As leituras mais pesadas (agenda do médico, busca de pacientes e prontuário) são atendidas por
+corrotinas com SQLAlchemy asyncio (aiosqlite/asyncpg): enquanto uma query espera o banco, o mesmo
+processo continua atendendo outras requisições. O stream SSE de consultas (/consultas/eventos) também
+é nativo: cada conexão aberta custa uma corrotina, não uma thread. Todas as demais rotas, inclusive as
+escritas, seguem para o app Flask síncrono, executado em um pool de threads.
+"""
+import asyncio
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import create_app
+from app.controllers import leitura_async_controller
+from app.services.async_db_service import criar_engine_assincrona
+from app.services.eventos_consultas_service import ParametrosEventosError, abrir_fluxo, ler_parametros
+from app.services.limite_requisicoes_service import identidade_cliente, resposta_limitada, rota_limitada, tempo_de_espera
+from app.services.metricas_service import REQUISICAO_DURACAO
+
+
+class _InstanciaWsgiEmThreads(WsgiToAsgiInstance):
+    # O asgiref executa o WSGI com thread_sensitive=True, ou seja, todas as requisições na mesma
+    # thread; aqui cada requisição usa uma thread do executor padrão do loop (ASYNC_WSGI_THREADS).
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False)
+
+
+class _WsgiEmThreads(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _InstanciaWsgiEmThreads(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+async def _agenda_medico(sessoes, parametros, args):
+    try:
+        consultas = await leitura_async_controller.listar_consultas_por_medico(sessoes, int(parametros["medico_id"]))
+        consultas_data = [consulta.to_dict() for consulta in consultas]
+        return {
+            "sucesso": True,
+            "consultas": consultas_data,
+            "count": len(consultas_data)
+        }, 200
+    except Exception as e:
+        return {
+            "sucesso": False,
+            "error": str(e)}, 400
+
+
+async def _buscar_pacientes(sessoes, parametros, args):
+    try:
+        nome = args.get("nome", [""])[0]
+        if not nome:
+            return {
+                "success": False,
+                "message": "Parâmetro 'nome' é obrigatório"
+            }, 400
+
+        pacientes = await leitura_async_controller.paciente_nome(sessoes, nome)
+        return {
+            "success": True,
+            "data": [p.to_dict() for p in pacientes],
+            "count": len(pacientes)
+        }, 200
+    except Exception as e:
+        return {
+            "success": False,
+            "message": str(e)
+        }, 400
+
+
+async def _prontuario(sessoes, parametros, args):
+    try:
+        paciente, consultas, exames = await leitura_async_controller.prontuario_paciente(sessoes, int(parametros["id"]))
+        return {
+            "success": True,
+            "data": {
+                **paciente.to_dict(),
+                "consultas": [c.to_dict() for c in consultas],
+                "exames": [e.to_dict() for e in exames]
+            }
+        }, 200
+    except Exception as e:
+        return {
+            "success": False,
+            "message": str(e)
+        }, 404
+
+
+# (método, caminho, blueprint, endpoint Flask equivalente, handler): mesmas URLs e respostas das
+# rotas síncronas, e os mesmos rótulos nas métricas
+ROTAS_ASSINCRONAS = [
+    ("GET", re.compile(r"^/consultas/medico/(?P<medico_id>\d+)$"), "consultas",
+     "consultas.listar_consultas_por_medico", _agenda_medico),
+    ("GET", re.compile(r"^/pacientes/buscar$"), "pacientes", "pacientes.search_paciente", _buscar_pacientes),
+    ("GET", re.compile(r"^/pacientes/(?P<id>\d+)/prontuario$"), "pacientes", "pacientes.get_prontuario", _prontuario),
+]
+
+
+# Stream SSE de consultas: servido por uma corrotina por cliente (ver _eventos_consultas)
+ROTA_EVENTOS_CONSULTAS = "/consultas/eventos"
+
+
+async def _aguardar_desconexao(receive):
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            return
+
+
+async def _responder_json(send, status, corpo):
+    conteudo = (json.dumps(corpo, separators=(",", ":")) + "\n").encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(conteudo)).encode())],
+    })
+    await send({"type": "http.response.body", "body": conteudo})
+
+
+class AplicacaoAsgi:
+    """
+    ASGI application: async read routes served natively, everything else delegated to Flask.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = _WsgiEmThreads(flask_app)
+        self.engine = None
+        self.sessoes = None
+
+    def _iniciar(self):
+        """
+        function to create the async engine and the WSGI thread pool inside the running event loop
+        :return: None
+        """
+        if self.engine is None:
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+                max_workers=self.flask_app.config["ASYNC_WSGI_THREADS"], thread_name_prefix="wsgi"))
+            self.engine, self.sessoes = criar_engine_assincrona(self.flask_app)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                self._iniciar()
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _espera_limite(self, scope, endpoint):
+        """
+        function to apply the route's rate limit (same buckets as the Flask hook)
+        :return: seconds until the next token, or None when the request may proceed
+        """
+        if rota_limitada(self.flask_app, endpoint) is None:
+            return None
+        cabecalhos = dict(scope["headers"])
+        with self.flask_app.app_context():
+            identidade = identidade_cliente(cabecalhos.get(b"authorization", b"").decode("latin-1"),
+                                            (scope.get("client") or ("",))[0])
+        # Chamada síncrona de propósito: o balde (SQLite em /dev/shm) responde em microssegundos
+        return tempo_de_espera(self.flask_app, endpoint, identidade)
+
+    async def _servir(self, send, scope, blueprint, endpoint, handler, parametros):
+        inicio = time.perf_counter()
+        self._iniciar()
+        cabecalhos_extras = {}
+        espera = self._espera_limite(scope, endpoint)
+        if espera is not None:
+            corpo, cabecalhos_extras = resposta_limitada(espera)
+            status = 429
+        else:
+            args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            corpo, status = await handler(self.sessoes, parametros, args)
+        conteudo = (self.flask_app.json.dumps(corpo, separators=(",", ":")) + "\n").encode("utf-8")
+
+        duracao = time.perf_counter() - inicio
+        REQUISICAO_DURACAO.labels(blueprint, endpoint, "GET", str(status)).observe(duracao)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(conteudo)).encode()),
+                (b"server-timing", f"app;dur={duracao * 1000:.2f}".encode()),
+            ] + [(nome.lower().encode(), valor.encode()) for nome, valor in cabecalhos_extras.items()],
+        })
+        await send({"type": "http.response.body", "body": conteudo})
+
+    async def _eventos_consultas(self, scope, receive, send):
+        """
+        function to serve GET /consultas/eventos: same stream as the Flask route, but an idle client costs a
+        queue and a pending task instead of a worker thread
+        """
+        self._iniciar()
+        central = self.flask_app.extensions.get("eventos_consultas")
+        if central is None:
+            return await _responder_json(send, 404, {"sucesso": False, "error": "Eventos de consultas desativados"})
+        args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        cabecalhos = dict(scope["headers"])
+        try:
+            medico_id, ultimo_id = ler_parametros(
+                args.get("medico_id", [None])[0],
+                cabecalhos.get(b"last-event-id", b"").decode("latin-1") or args.get("last_event_id", [None])[0])
+        except ParametrosEventosError as e:
+            return await _responder_json(send, 400, {"sucesso": False, "error": str(e)})
+
+        loop = asyncio.get_running_loop()
+        fila = asyncio.Queue()
+
+        def abrir():
+            with self.flask_app.app_context():
+                # entregar é chamado pela thread da central: o item entra na fila pelo event loop
+                return abrir_fluxo(central, medico_id, ultimo_id,
+                                   lambda mensagem: loop.call_soon_threadsafe(fila.put_nowait, mensagem))
+
+        assinatura, cursor, mensagens = await loop.run_in_executor(None, abrir)
+        desconexao = asyncio.ensure_future(_aguardar_desconexao(receive))
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                            (b"x-accel-buffering", b"no")],
+            })
+            await send({"type": "http.response.body", "body": "".join(mensagens).encode("utf-8"), "more_body": True})
+            while True:
+                proximo = asyncio.ensure_future(fila.get())
+                prontos, _ = await asyncio.wait({proximo, desconexao}, return_when=asyncio.FIRST_COMPLETED,
+                                                timeout=self.flask_app.config["SSE_HEARTBEAT_SECONDS"])
+                if desconexao in prontos:
+                    proximo.cancel()
+                    return
+                if proximo not in prontos:
+                    proximo.cancel()
+                    corpo = ": heartbeat\n\n"
+                else:
+                    seq, corpo = proximo.result()
+                    if seq <= cursor:
+                        continue
+                    cursor = seq
+                await send({"type": "http.response.body", "body": corpo.encode("utf-8"), "more_body": True})
+        finally:
+            desconexao.cancel()
+            central.cancelar(assinatura)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http":
+            if scope["path"] == ROTA_EVENTOS_CONSULTAS and scope["method"] == "GET":
+                return await self._eventos_consultas(scope, receive, send)
+            for metodo, padrao, blueprint, endpoint, handler in ROTAS_ASSINCRONAS:
+                correspondencia = padrao.match(scope["path"])
+                if correspondencia and scope["method"] == metodo:
+                    return await self._servir(send, scope, blueprint, endpoint, handler,
+                                              correspondencia.groupdict())
+        await self.wsgi(scope, receive, send)
+
+
+def criar_app_asgi(config_name=None):
+    """
+    function to build the ASGI application (async reads + Flask for everything else)
+    :param config_name: configuration name, as in create_app
+    :return: AplicacaoAsgi
+    """
+    return AplicacaoAsgi(create_app(config_name))
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.controllers import user_controller
+from app.services import (alteracoes_service, auditoria_service, duplicidade_service, idempotencia_service,
+                          particionamento_service)
+from app.services.auth_service import PAPEIS
+
+consultas_cli = AppGroup("consultas", help="Manutenção da tabela de consultas.")
+idempotencia_cli = AppGroup("idempotencia", help="Manutenção das chaves de idempotência.")
+auditoria_cli = AppGroup("auditoria", help="Manutenção da trilha de auditoria.")
+alteracoes_cli = AppGroup("alteracoes", help="Manutenção do feed de alterações (GET /changes).")
+pacientes_cli = AppGroup("pacientes", help="Deduplicação de pacientes.")
+usuarios_cli = AppGroup("usuarios", help="Administração de usuários.")
+
+
+@consultas_cli.command("particionar")
+@click.option("--meses-a-frente", default=3, show_default=True,
+              help="Quantidade de meses futuros que devem ter partição criada.")
+def particionar(meses_a_frente):
+    """
+    Converte consultas em tabela particionada por mês (PostgreSQL) e cria as partições futuras.
+    Pode ser executado periodicamente (cron) para manter as partições sempre à frente.
+    """
+    particoes = particionamento_service.garantir_particoes(meses_a_frente)
+    click.echo(f"{len(particoes)} partições mensais em consultas: {', '.join(particoes)}")
+
+
+@consultas_cli.command("arquivar")
+@click.option("--meses-retidos", default=12, show_default=True,
+              help="Meses (incluindo o atual) mantidos na tabela quente.")
+def arquivar(meses_retidos):
+    """
+    Arquiva consultas antigas: desanexa partições (PostgreSQL) ou move linhas para consultas_arquivo (SQLite).
+    """
+    resultado = particionamento_service.arquivar_consultas(meses_retidos)
+    if "particoes" in resultado:
+        click.echo(f"Partições arquivadas antes de {resultado['limite']}: {', '.join(resultado['particoes']) or 'nenhuma'}")
+    else:
+        click.echo(f"{resultado['linhas']} consultas anteriores a {resultado['limite']} movidas para {resultado['tabela']}")
+
+
+@idempotencia_cli.command("limpar")
+def limpar_idempotencia():
+    """
+    Remove chaves de idempotência expiradas (IDEMPOTENCY_TTL_HOURS). Pode ser agendado (cron).
+    """
+    removidas = idempotencia_service.limpar_chaves_expiradas()
+    click.echo(f"{removidas} chaves de idempotência expiradas removidas")
+
+
+@auditoria_cli.command("drenar")
+@click.option("--carencia", default=0.0, show_default=True,
+              help="Segundos: só move linhas do outbox mais antigas que isso.")
+def drenar_auditoria(carencia):
+    """
+    Move para a tabela auditoria os registros que ficaram no outbox (ex.: worker encerrado antes da gravação).
+    """
+    movidos = auditoria_service.drenar_outbox(carencia, current_app.config["AUDIT_BATCH_SIZE"])
+    click.echo(f"{movidos} registros de auditoria movidos do outbox")
+
+
+@alteracoes_cli.command("compactar")
+@click.option("--retencao-dias", default=None, type=float,
+              help="Dias que um tombstone de exclusão fica no feed (padrão: CHANGES_TOMBSTONE_RETENTION_DAYS).")
+def compactar_alteracoes(retencao_dias):
+    """
+    Remove tombstones antigos do feed. Clientes com cursor anterior recebem 410 e sincronizam de novo.
+    Pode ser agendado (cron).
+    """
+    if retencao_dias is None:
+        retencao_dias = current_app.config["CHANGES_TOMBSTONE_RETENTION_DAYS"]
+    removidos = alteracoes_service.compactar_tombstones(retencao_dias)
+    click.echo(f"{removidos} tombstones removidos do feed de alterações")
+
+
+@alteracoes_cli.command("popular")
+def popular_alteracoes():
+    """
+    Publica no feed os pacientes e médicos cadastrados antes dele (uma vez, após criar a tabela alteracoes).
+    """
+    publicados = alteracoes_service.popular_alteracoes()
+    click.echo(f"{publicados} registros publicados no feed de alterações")
+
+
+@pacientes_cli.command("chaves")
+@click.option("--recalcular", is_flag=True, help="Recalcula todos os pacientes, não só os sem chave.")
+@click.option("--lote", default=1000, show_default=True, help="Pacientes por transação.")
+def chaves_pacientes(recalcular, lote):
+    """
+    Preenche as chaves de deduplicação de pacientes gravados sem o ORM (carga em massa, linhas antigas).
+    """
+    atualizados = duplicidade_service.preencher_chaves(lote, recalcular)
+    click.echo(f"{atualizados} pacientes com chaves de deduplicação atualizadas")
+
+
+@pacientes_cli.command("duplicatas")
+@click.option("--limiar", default=None, type=click.FloatRange(0, 1),
+              help="Pontuação mínima de um par (padrão: DEDUP_MIN_SCORE).")
+@click.option("--max-bloco", default=None, type=int,
+              help="Blocos maiores são ignorados (padrão: DEDUP_MAX_BLOCK_SIZE).")
+@click.option("--saida", default="-", type=click.File("w"), show_default=True,
+              help="Arquivo NDJSON com um par por linha.")
+def duplicatas_pacientes(limiar, max_bloco, saida):
+    """
+    Varre os blocos de pacientes (mesmo nome fonético, mesmo nascimento, mesmo telefone) e grava os prováveis
+    pares duplicados. Só pacientes do mesmo bloco são comparados. Pode ser agendado (cron).
+    """
+    if limiar is None:
+        limiar = current_app.config["DEDUP_MIN_SCORE"]
+    if max_bloco is None:
+        max_bloco = current_app.config["DEDUP_MAX_BLOCK_SIZE"]
+    estatisticas = {}
+    for par in duplicidade_service.varrer_duplicatas(limiar, max_bloco, estatisticas=estatisticas):
+        saida.write(json.dumps(par, ensure_ascii=False) + "\n")
+    click.echo(f"{estatisticas['pares']} pares em {estatisticas['blocos']} blocos "
+               f"({estatisticas['comparacoes']} comparações, {estatisticas['blocos_ignorados']} blocos "
+               f"maiores que {max_bloco} ignorados)", err=True)
+
+
+@usuarios_cli.command("papel")
+@click.argument("username")
+@click.argument("papel", type=click.Choice(PAPEIS))
+def papel_usuario(username, papel):
+    """
+    Altera o papel de um usuário. É o único jeito de conceder "admin": o cadastro pela API sempre cria
+    usuários "recepcao". Tokens já emitidos mantêm o papel antigo até expirarem.
+    """
+    try:
+        usuario = user_controller.definir_papel(username, papel)
+    except Exception as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Usuário {usuario.username} agora tem o papel {usuario.role}")
+
+
+def register_commands(app):
+    app.cli.add_command(consultas_cli)
+    app.cli.add_command(idempotencia_cli)
+    app.cli.add_command(auditoria_cli)
+    app.cli.add_command(alteracoes_cli)
+    app.cli.add_command(pacientes_cli)
+    app.cli.add_command(usuarios_cli)
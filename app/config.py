@@ -5,8 +5,121 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///db.sqlite3")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Exportações em lote (consultas/exames)
+    EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.abspath("exports"))
+    EXPORT_MAX_WORKERS = int(os.getenv("EXPORT_MAX_WORKERS", "2"))
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    # Job pendente/processando sem progresso há mais que isso é dado como interrompido (worker reiniciado)
+    EXPORT_STALE_SECONDS = float(os.getenv("EXPORT_STALE_SECONDS", "300"))
+
+    # Instrumentação por requisição (header Server-Timing); a linha de log JSON por requisição é opcional
+    PERF_INSTRUMENTATION = os.getenv("PERF_INSTRUMENTATION", "true").lower() == "true"
+    PERF_LOG_REQUESTS = os.getenv("PERF_LOG_REQUESTS", "false").lower() == "true"
+
+    # Detector de N+1: "warn" (padrão em debug), "raise" (padrão sob pytest) ou "off"
+    NPLUSONE_MODE = os.getenv("NPLUSONE_MODE")
+    NPLUSONE_THRESHOLD = int(os.getenv("NPLUSONE_THRESHOLD", "3"))
+
+    # Métricas Prometheus em /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Slow query log: limite em ms (negativo desativa), amostragem de EXPLAIN ANALYZE (PostgreSQL)
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+    SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "100"))
+
+    # Profiling sob demanda (?_profile=1 ou ?_profile=cprofile, apenas JWT de admin)
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.abspath("profiles"))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+
+    # Health checks: /readyz cacheia o resultado e limita o tempo de checkout; WAIT_FOR_DB_SECONDS > 0
+    # faz o create_app aguardar o banco (backoff exponencial) antes de subir
+    READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+    READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "5"))
+    MIGRATIONS_DIR = os.getenv("MIGRATIONS_DIR", os.path.abspath("migrations"))
+    WAIT_FOR_DB_SECONDS = float(os.getenv("WAIT_FOR_DB_SECONDS", "0"))
+
+    # Modo assíncrono (asgi.py): pool do engine asyncio e threads para as rotas Flask delegadas
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+    ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "10"))
+    ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20"))
+    ASYNC_WSGI_THREADS = int(os.getenv("ASYNC_WSGI_THREADS", "8"))
+
+    # Idempotency-Key em POST/PUT: validade da resposta gravada, duração da reserva de uma requisição em
+    # andamento (maior que o GUNICORN_TIMEOUT; reserva de worker morto é retomada ao expirar) e tempo
+    # máximo aguardando uma requisição em andamento
+    IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+    # POST /batch: máximo de operações por lote (uma transação e um commit por lote)
+    BATCH_MAX_OPERACOES = int(os.getenv("BATCH_MAX_OPERACOES", "100"))
+
+    # Busca por vários ids (?ids= e POST /<recurso>/lookup): limite por requisição e ids por query IN
+    MULTIGET_MAX_IDS = int(os.getenv("MULTIGET_MAX_IDS", "1000"))
+    MULTIGET_CHUNK_SIZE = int(os.getenv("MULTIGET_CHUNK_SIZE", "500"))
+
+    # Limite de requisições (token bucket por cliente e rota, comum a todos os workers): "requisições/segundos"
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sqlite")  # sqlite | memoria | pacote.modulo:Classe
+    RATE_LIMIT_STORAGE_PATH = os.getenv("RATE_LIMIT_STORAGE_PATH")  # padrão: /dev/shm/curasys-ratelimit-<hash do instance path>.sqlite3
+    RATE_LIMIT_LOGIN = os.getenv("RATE_LIMIT_LOGIN", "10/60")
+    RATE_LIMIT_BUSCA = os.getenv("RATE_LIMIT_BUSCA", "30/10")
+    # Proxies reversos confiáveis na frente da API: o IP do cliente vem do X-Forwarded-For
+    TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+    # Réplicas de leitura (URLs separadas por vírgula): GETs leem de uma réplica, escritas vão ao primário.
+    # Após uma escrita o cliente (identidade do JWT ou IP, cookie ou X-Primario-Ate) lê do primário por
+    # REPLICA_STICKY_SECONDS; réplica atrasada mais de REPLICA_MAX_LAG_SECONDS (conferido a cada
+    # REPLICA_LAG_CHECK_SECONDS) é evitada
+    REPLICA_DATABASE_URLS = [url.strip() for url in os.getenv("REPLICA_DATABASE_URLS", "").split(",") if url.strip()]
+    SQLALCHEMY_BINDS = {f"replica_{indice}": url for indice, url in enumerate(REPLICA_DATABASE_URLS)}
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    REPLICA_STICKY_STORAGE_PATH = os.getenv("REPLICA_STICKY_STORAGE_PATH")  # padrão: /dev/shm/curasys-primario-<hash>.sqlite3
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2"))
+    REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "1"))
+    REPLICA_LAG_SQL = os.getenv("REPLICA_LAG_SQL")  # atraso em segundos; padrão só para PostgreSQL
+
+    # Auditoria de pacientes, médicos, consultas e exames: outbox gravado na transação da alteração e
+    # movido para a tabela auditoria em lotes por uma thread; sobras além da carência são drenadas
+    AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1"))
+    AUDIT_OUTBOX_GRACE_SECONDS = float(os.getenv("AUDIT_OUTBOX_GRACE_SECONDS", "60"))
+
+    # Feed de alterações (GET /changes?since=): tamanho de página e retenção dos tombstones de exclusão
+    CHANGES_ENABLED = os.getenv("CHANGES_ENABLED", "true").lower() == "true"
+    CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "500"))
+    CHANGES_MAX_PAGE_SIZE = int(os.getenv("CHANGES_MAX_PAGE_SIZE", "1000"))
+    CHANGES_TOMBSTONE_RETENTION_DAYS = float(os.getenv("CHANGES_TOMBSTONE_RETENTION_DAYS", "30"))
+
+    # Eventos de consultas (SSE em /consultas/eventos): heartbeat, janela de retomada por Last-Event-ID e,
+    # sem PostgreSQL (LISTEN/NOTIFY), o arquivo em /dev/shm que avisa os workers a cada commit
+    SSE_ENABLED = os.getenv("SSE_ENABLED", "true").lower() == "true"
+    SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    SSE_EVENT_RETENTION_MINUTES = float(os.getenv("SSE_EVENT_RETENTION_MINUTES", "60"))
+    SSE_REPLAY_MAX = int(os.getenv("SSE_REPLAY_MAX", "1000"))
+    SSE_POLL_INTERVAL_SECONDS = float(os.getenv("SSE_POLL_INTERVAL_SECONDS", "0.25"))
+    SSE_FALLBACK_POLL_SECONDS = float(os.getenv("SSE_FALLBACK_POLL_SECONDS", "5"))
+    SSE_NOTIFY_PATH = os.getenv("SSE_NOTIFY_PATH")  # padrão: /dev/shm/curasys-consultas-eventos
+
+    # Deduplicação de pacientes (GET /pacientes/<id>/duplicatas e flask pacientes duplicatas): pontuação
+    # mínima de um par, candidatos lidos por paciente e tamanho acima do qual um bloco é comum demais
+    DEDUP_MIN_SCORE = float(os.getenv("DEDUP_MIN_SCORE", "0.75"))
+    DEDUP_MAX_CANDIDATES = int(os.getenv("DEDUP_MAX_CANDIDATES", "200"))
+    DEDUP_MAX_BLOCK_SIZE = int(os.getenv("DEDUP_MAX_BLOCK_SIZE", "1000"))
+
 class DevelopmentConfig(Config):
     DEBUG = True
 
 class ProductionConfig(Config):
     DEBUG = False
+
+class TestingConfig(Config):
+    TESTING = True
+    # Banco descartável dos testes (tests/conftest.py aponta para um diretório temporário)
+    SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL", "sqlite:///test.sqlite3")
+    SECRET_KEY = "chave-de-testes-com-pelo-menos-32-bytes"
+    # Baldes no processo: cada execução começa com limites cheios e nada fica no host
+    RATE_LIMIT_BACKEND = "memoria"
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models.alteracao import Alteracao, SequenciaAlteracoes
+from app.services.alteracoes_service import MODELOS_FEED, CursorExpiradoError
+
+
+def listar_alteracoes(desde, limite):
+    """
+    function to list the changes of pacientes and médicos after a cursor, in commit order
+    Upserts carry the current state of the record; deletions are tombstones without data.
+    :param desde: cursor (sequence of the last change the client has seen; 0 for a full sync; negative
+                  while a full sync started after the last compaction is still below it)
+    :param limite: maximum number of changes
+    :return: (changes, next cursor, whether more changes are waiting)
+    """
+    try:
+        minimo = db.session.execute(select(SequenciaAlteracoes.minimo).where(SequenciaAlteracoes.id == 1)).scalar()
+        minimo = minimo or 0
+        # since=0 continua válido: o feed compactado tem uma linha por registro vivo
+        if 0 < desde < minimo:
+            raise CursorExpiradoError("Cursor anterior à última compactação: sincronize novamente com since=0")
+
+        inicio = abs(desde)
+        linhas = Alteracao.query.filter(Alteracao.seq > inicio).order_by(Alteracao.seq).limit(limite + 1).all()
+        mais = len(linhas) > limite
+        linhas = linhas[:limite]
+
+        # Estado atual dos registros: uma query IN por recurso
+        atuais = {}
+        for recurso, modelo in MODELOS_FEED.items():
+            ids = [linha.registro_id for linha in linhas if linha.recurso == recurso and linha.operacao == "upsert"]
+            if ids:
+                atuais.update(((recurso, registro.id), registro) for registro in modelo.query.filter(modelo.id.in_(ids)))
+
+        alteracoes = []
+        for linha in linhas:
+            item = {"seq": linha.seq, "recurso": linha.recurso, "id": linha.registro_id, "operacao": "delete"}
+            registro = atuais.get((linha.recurso, linha.registro_id))
+            # Removido depois da leitura do feed: o tombstone já vem mais adiante, antecipá-lo é equivalente
+            if linha.operacao == "upsert" and registro is not None:
+                item.update(operacao="upsert", data=registro.to_dict())
+            alteracoes.append(item)
+        cursor = linhas[-1].seq if linhas else inicio
+        # Sincronização completa que ainda não passou da compactação: um cursor positivo ali seria recusado
+        # como antigo; o negativo só é emitido para quem começou depois dela
+        if desde <= 0 and cursor < minimo:
+            cursor = -cursor
+        return alteracoes, cursor, mais
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao listar alterações: {str(e)}")
@@ -1,9 +1,22 @@
 # -*- coding: utf-8 -*-
 from app.models.consulta import Consulta
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from app.extensions import db
+from app.services.busca_ids_service import buscar_por_ids
+from app.services.concorrencia_service import VersaoDivergenteError, verificar_versao
+from app.services.transacao_service import confirmar
+from app.services.validacao_service import Campo, Esquema
 from datetime import datetime
 
+ESQUEMA_CONSULTA = Esquema(
+    data_consulta=Campo("data", obrigatorio=True),
+    hora_consulta=Campo("hora", obrigatorio=True),
+    paciente_id=Campo("id", obrigatorio=True),
+    medico_id=Campo("id", obrigatorio=True),
+    status=Campo("opcao", opcoes=('agendada', 'realizada', 'cancelada')),
+)
+
 def listar_consultas():
     """
     function to list all consultas
@@ -14,6 +27,17 @@ def listar_consultas():
     except SQLAlchemyError as e:
         raise Exception(f"Erro ao listar consultas: {str(e)}")
 
+def consultas_por_ids(ids):
+    """
+    function to get several consultas by ID with IN queries
+    :param ids: list of consulta identifiers
+    :return: (consultas in the requested order, missing ids)
+    """
+    try:
+        return buscar_por_ids(Consulta, ids)
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar consultas: {str(e)}")
+
 def consulta_id(id):
     """
     function to get a consulta by ID
@@ -34,36 +58,14 @@ def criar_consulta(data):
     :param data: my database
     :return: consulta
     """
+    data = ESQUEMA_CONSULTA.validar(data)
     try:
-        # Validar dados obrigatorios
-        campos_obrigatorios = ['data_consulta', 'hora_consulta', 'paciente_id', 'medico_id']
-        for campo in campos_obrigatorios:
-            if campo not in data or not data[campo]:
-                raise Exception(f"Campo obrigatório faltando: {campo}")
-
-        # Converter data_consulta se for string
-        if isinstance(data['data_consulta'], str):
-            try:
-                data['data_consulta'] = datetime.strptime(data['data_consulta'], '%d-%m-%Y').date()
-            except ValueError:
-                raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-
-        # Converter hora_consulta se for string
-        if isinstance(data['hora_consulta'], str):
-            try:
-                data['hora_consulta'] = datetime.strptime(data['hora_consulta'], '%H:%M').time()
-            except ValueError:
-                raise Exception("Formato de hora inválido. Use HH:MM")
-
         nova_consulta = Consulta(
-            data_consulta=data['data_consulta'],
-            hora_consulta=data['hora_consulta'],
-            paciente_id=data['paciente_id'],
-            medico_id=data['medico_id'],
-            descricao=data.get('descricao')
+            data_consulta=datetime.combine(data.pop('data_consulta'), data.pop('hora_consulta')),
+            **data
         )
         db.session.add(nova_consulta)
-        db.session.commit()
+        confirmar()
         return nova_consulta
     except IntegrityError as e:
         db.session.rollback()
@@ -73,36 +75,33 @@ def criar_consulta(data):
         raise Exception(f"Erro ao criar consulta: {str(e)}")
 
 
-def atualizar_consulta(id, data):
+def atualizar_consulta(id, data, versao=None):
     """
     function to update consulta
     :param id: consulta identifier
     :param data: my database
+    :param versao: versions accepted by the If-Match header (None: no precondition)
     :return: consulta updated
     """
+    data = ESQUEMA_CONSULTA.validar(data, parcial=True)
     try:
         consulta = Consulta.query.get(id)
         if not consulta:
             raise Exception("Consulta não encontrada")
+        verificar_versao(consulta, versao)
 
-        # Atualizar campos permitidos
-        campos_permitidos = ['data_consulta', 'hora_consulta', 'status', 'descricao', 'paciente_id', 'medico_id']
-        for campo in campos_permitidos:
-            if campo in data:
-                if campo == 'data_consulta' and isinstance(data[campo], str):
-                    try:
-                        data[campo] = datetime.strptime(data[campo], '%d-%m-%Y').date()
-                    except ValueError:
-                        raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-                if campo == 'hora_consulta' and isinstance(data[campo], str):
-                    try:
-                        data[campo] = datetime.strptime(data[campo], '%H:%M').time()
-                    except ValueError:
-                        raise Exception("Formato de hora inválido. Use HH:MM")
-                setattr(consulta, campo, data[campo])
+        # data e hora chegam separadas; a que não veio mantém o valor atual
+        if 'data_consulta' in data or 'hora_consulta' in data:
+            data['data_consulta'] = datetime.combine(data.get('data_consulta', consulta.data_consulta.date()),
+                                                     data.pop('hora_consulta', consulta.data_consulta.time()))
+        for campo, valor in data.items():
+            setattr(consulta, campo, valor)
 
-        db.session.commit()
+        confirmar()
         return consulta
+    except StaleDataError:
+        db.session.rollback()
+        raise VersaoDivergenteError("Registro alterado por outra requisição")
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"Erro ao atualizar consulta: {str(e)}")
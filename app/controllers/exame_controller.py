@@ -1,8 +1,19 @@
 # -*- coding: utf-8 -*-
 from app.models.exame import Exame
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from app.extensions import db
-from datetime import datetime
+from app.services.busca_ids_service import buscar_por_ids
+from app.services.concorrencia_service import VersaoDivergenteError, verificar_versao
+from app.services.transacao_service import confirmar
+from app.services.validacao_service import SOMENTE_LEITURA, Campo, Esquema
+
+ESQUEMA_EXAME = Esquema(
+    id_paciente=Campo("id", obrigatorio=True),
+    tipo=Campo("texto", obrigatorio=True),
+    resultado=Campo("texto"),
+    somente_leitura=(*SOMENTE_LEITURA, "arquivo_exame"),  # gravado pelo upload
+)
 
 def listar_exames():
     """
@@ -14,6 +25,17 @@ def listar_exames():
     except SQLAlchemyError as e:
         raise Exception(f"Erro ao listar exames: {str(e)}")
 
+def exames_por_ids(ids):
+    """
+    function to get several exams by ID with IN queries
+    :param ids: list of exam identifiers
+    :return: (exams in the requested order, missing ids)
+    """
+    try:
+        return buscar_por_ids(Exame, ids)
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar exames: {str(e)}")
+
 def exame_id(id):
     """
     function to get an exam by ID
@@ -34,28 +56,11 @@ def criar_exame(data):
     :param data: my database
     :return: exam
     """
+    data = ESQUEMA_EXAME.validar(data)
     try:
-        # Validar dados obrigatorios
-        campos_obrigatorios = ['tipo', 'data_exame', 'resultado', 'consulta_id']
-        for campo in campos_obrigatorios:
-            if campo not in data or not data[campo]:
-                raise Exception(f"Campo obrigatório faltando: {campo}")
-
-        # Converter data_exame se for string
-        if isinstance(data['data_exame'], str):
-            try:
-                data['data_exame'] = datetime.strptime(data['data_exame'], '%d-%m-%Y').date()
-            except ValueError:
-                raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-
-        novo_exame = Exame(
-            tipo=data['tipo'],
-            data_exame=data['data_exame'],
-            resultado=data['resultado'],
-            consulta_id=data['consulta_id']
-        )
+        novo_exame = Exame(**data)
         db.session.add(novo_exame)
-        db.session.commit()
+        confirmar()
         return novo_exame
     except IntegrityError as e:
         db.session.rollback()
@@ -64,36 +69,29 @@ def criar_exame(data):
         db.session.rollback()
         raise Exception(f"Erro ao criar exame: {str(e)}")
 
-def atualizar_exame(id, data):
+def atualizar_exame(id, data, versao=None):
     """
     function to update an exam
     :param id: exam identifier
     :param data: my database
+    :param versao: versions accepted by the If-Match header (None: no precondition)
     :return: exam
     """
+    data = ESQUEMA_EXAME.validar(data, parcial=True)
     try:
         exame = Exame.query.get(id)
         if not exame:
             raise Exception("Exame não encontrado")
+        verificar_versao(exame, versao)
 
-        # Atualizar campos se presentes nos dados
-        if 'tipo' in data:
-            exame.tipo = data['tipo']
-        if 'data_exame' in data:
-            if isinstance(data['data_exame'], str):
-                try:
-                    exame.data_exame = datetime.strptime(data['data_exame'], '%d-%m-%Y').date()
-                except ValueError:
-                    raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-            else:
-                exame.data_exame = data['data_exame']
-        if 'resultado' in data:
-            exame.resultado = data['resultado']
-        if 'consulta_id' in data:
-            exame.consulta_id = data['consulta_id']
+        for campo, valor in data.items():
+            setattr(exame, campo, valor)
 
-        db.session.commit()
+        confirmar()
         return exame
+    except StaleDataError:
+        db.session.rollback()
+        raise VersaoDivergenteError("Registro alterado por outra requisição")
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"Erro ao atualizar exame: {str(e)}")
@@ -124,7 +122,7 @@ def listar_exames_paciente(id_paciente):
     :return: exam list by patient ID
     """
     try:
-        exames = Exame.query.join(Exame.consulta).filter_by(id_paciente=id_paciente).all()
+        exames = Exame.query.filter_by(id_paciente=id_paciente).all()
         return exames
     except SQLAlchemyError as e:
         raise Exception(f"Erro ao listar exames do paciente: {str(e)}")
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import os
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models.exportacao import Exportacao
+from app.services import exportacao_service
+from app.services.transacao_service import confirmar
+
+def criar_exportacao(data):
+    """
+    function to create a new export job and schedule it in background
+    :param data: export parameters (recurso, formato, data_inicio, data_fim and filters)
+    :return: export job
+    """
+    try:
+        if not data or not data.get('recurso'):
+            raise Exception("Campo obrigatório faltando: recurso")
+
+        recurso = data['recurso']
+        if recurso not in exportacao_service.RECURSOS:
+            raise Exception(f"Recurso inválido. Use: {', '.join(exportacao_service.RECURSOS)}")
+
+        formato = data.get('formato', 'csv')
+        if formato not in exportacao_service.EXTENSOES:
+            raise Exception(f"Formato inválido. Use: {', '.join(exportacao_service.EXTENSOES)}")
+
+        # Converter datas do intervalo (DD-MM-YYYY) para ISO antes de persistir
+        filtros = {}
+        for campo in ['data_inicio', 'data_fim']:
+            if data.get(campo):
+                try:
+                    filtros[campo] = datetime.strptime(data[campo], '%d-%m-%Y').date().isoformat()
+                except (TypeError, ValueError):
+                    raise Exception("Formato de data inválido. Use DD-MM-YYYY")
+
+        if filtros.get('data_inicio') and filtros.get('data_fim') and filtros['data_inicio'] > filtros['data_fim']:
+            raise Exception("data_inicio deve ser anterior ou igual a data_fim")
+
+        for campo in exportacao_service.RECURSOS[recurso]['filtros']:
+            if data.get(campo) is not None:
+                filtros[campo] = data[campo]
+
+        exportacao = Exportacao(recurso=recurso, formato=formato, filtros=filtros, status='pendente')
+        db.session.add(exportacao)
+        db.session.commit()
+
+        exportacao_service.iniciar_exportacao(current_app._get_current_object(), exportacao.id)
+        return exportacao
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise Exception(f"Erro ao criar exportação: {str(e)}")
+
+def exportacao_id(id):
+    """
+    function to get an export job by ID (a job orphaned by a worker restart is marked as failed here)
+    :param id: export identifier
+    :return: export job
+    """
+    try:
+        exportacao = db.session.get(Exportacao, id)
+        if not exportacao:
+            raise Exception("Exportação não encontrada")
+        limite = current_app.config["EXPORT_STALE_SECONDS"]
+        if exportacao_service.interrompida(exportacao, limite):
+            exportacao_service.marcar_interrompida(exportacao, limite)
+            confirmar()
+        return exportacao
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise Exception(f"Erro ao buscar exportação: {str(e)}")
+
+def arquivo_exportacao(id):
+    """
+    function to get the finished file of an export job
+    :param id: export identifier
+    :return: path of the compressed file
+    """
+    exportacao = exportacao_id(id)
+    if exportacao.status != 'concluida':
+        raise Exception(f"Exportação ainda não concluída (status: {exportacao.status})")
+    if not exportacao.arquivo or not os.path.exists(exportacao.arquivo):
+        raise Exception("Arquivo da exportação não encontrado")
+    return exportacao.arquivo
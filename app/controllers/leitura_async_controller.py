@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Versões assíncronas (SQLAlchemy asyncio) das leituras mais pesadas, usadas pelo asgi.py.
+As escritas continuam nos controllers síncronos.
+"""
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.consulta import Consulta
+from app.models.exame import Exame
+from app.models.paciente import Paciente
+
+
+async def listar_consultas_por_medico(sessoes, medico_id):
+    """
+    function to list the consultations of a doctor (agenda)
+    :param sessoes: async_sessionmaker
+    :param medico_id: doctor identifier
+    :return: list of consultations
+    """
+    try:
+        async with sessoes() as sessao:
+            resultado = await sessao.scalars(select(Consulta).filter_by(medico_id=medico_id))
+            return resultado.all()
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao listar consultas por medico: {str(e)}")
+
+
+async def paciente_nome(sessoes, nome):
+    """
+    function to search patients by name
+    :param sessoes: async_sessionmaker
+    :param nome: patient's name (or part of it)
+    :return: list of patients
+    """
+    if not nome or len(nome.strip()) < 2:
+        raise Exception("O nome deve ter pelo menos 2 caracteres")
+    try:
+        async with sessoes() as sessao:
+            resultado = await sessao.scalars(select(Paciente).filter(Paciente.nome.ilike(f"%{nome}%")))
+            return resultado.all()
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar pacientes: {str(e)}")
+
+
+async def _consultar(sessoes, consulta):
+    async with sessoes() as sessao:
+        return (await sessao.scalars(consulta)).all()
+
+
+async def prontuario_paciente(sessoes, id):
+    """
+    function to get the patient chart; the three reads run concurrently on separate pooled connections
+    :param sessoes: async_sessionmaker
+    :param id: patient identifier
+    :return: tuple (patient, consultation list, exam list)
+    """
+    try:
+        pacientes, consultas, exames = await asyncio.gather(
+            _consultar(sessoes, select(Paciente).filter_by(id=id)),
+            _consultar(sessoes, select(Consulta).filter_by(paciente_id=id).order_by(Consulta.data_consulta.desc())),
+            _consultar(sessoes, select(Exame).filter_by(id_paciente=id).order_by(Exame.criado_em.desc(), Exame.id.desc())),
+        )
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar prontuário: {str(e)}")
+    if not pacientes:
+        raise Exception("Paciente não encontrado")
+    return pacientes[0], consultas, exames
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from flask import current_app
+
+from app.controllers import consulta_controller, exame_controller, medico_controller, paciente_controller
+from app.services.concorrencia_service import RegistroDuplicadoError, VersaoDivergenteError
+from app.services.nplusone_service import ajustar_orcamento
+from app.services.transacao_service import queries_de_abertura, transacao_unica
+from app.services.validacao_service import ValidacaoError
+
+# recurso -> operação -> (função do controller, endpoint equivalente, status HTTP da operação)
+OPERACOES = {
+    "pacientes": {
+        "criar": (paciente_controller.criar_paciente, "pacientes.post_paciente", 201),
+        "atualizar": (paciente_controller.atualizar_paciente, "pacientes.put_paciente", 200),
+        "deletar": (paciente_controller.deletar_paciente, "pacientes.delete_paciente", 200),
+    },
+    "medicos": {
+        "criar": (medico_controller.criar_medico, "medicos.post_medico", 201),
+        "atualizar": (medico_controller.atualizar_medico, "medicos.put_medico", 200),
+        "deletar": (medico_controller.deletar_medico, "medicos.delete_medico", 200),
+    },
+    "consultas": {
+        "criar": (consulta_controller.criar_consulta, "consultas.criar_consulta", 201),
+        "atualizar": (consulta_controller.atualizar_consulta, "consultas.atualizar_consulta", 200),
+        "deletar": (consulta_controller.deletar_consulta, "consultas.deletar_consulta", 200),
+    },
+    "exames": {
+        "criar": (exame_controller.criar_exame, "exames.post_exame", 201),
+        "atualizar": (exame_controller.atualizar_exame, "exames.put_exame", 200),
+        "deletar": (exame_controller.deletar_exame, "exames.delete_exame", 200),
+    },
+}
+
+
+class OperacaoLoteError(Exception):
+    """
+    Raised when one operation of a batch fails; the whole batch was rolled back.
+    """
+
+    def __init__(self, indice, status, mensagem, erros=None):
+        super().__init__(mensagem)
+        self.indice = indice
+        self.status = status
+        self.erros = erros
+
+
+def resolver_referencias(valor, criados):
+    """
+    function to replace {"$ref": "<ref>"} by the id of the record created earlier in the batch
+    :param valor: operation id or data (any JSON value)
+    :param criados: dictionary ref -> created id
+    :return: value with the references resolved
+    """
+    if isinstance(valor, dict):
+        if set(valor) == {"$ref"}:
+            if valor["$ref"] not in criados:
+                raise Exception(f"Referência desconhecida: {valor['$ref']}")
+            return criados[valor["$ref"]]
+        return {chave: resolver_referencias(item, criados) for chave, item in valor.items()}
+    if isinstance(valor, list):
+        return [resolver_referencias(item, criados) for item in valor]
+    return valor
+
+
+def _validar_operacoes(operacoes):
+    """
+    function to validate the batch shape before touching the database
+    :param operacoes: list of operations
+    :return: None
+    """
+    if not isinstance(operacoes, list) or not operacoes:
+        raise OperacaoLoteError(None, 400, "Campo obrigatório faltando: operacoes")
+    maximo = current_app.config["BATCH_MAX_OPERACOES"]
+    if len(operacoes) > maximo:
+        raise OperacaoLoteError(None, 400, f"O lote deve ter no máximo {maximo} operações")
+
+    refs = set()
+    for indice, operacao in enumerate(operacoes):
+        if not isinstance(operacao, dict):
+            raise OperacaoLoteError(indice, 400, "Operação deve ser um objeto")
+        recurso, tipo = operacao.get("recurso"), operacao.get("operacao")
+        if recurso not in OPERACOES:
+            raise OperacaoLoteError(indice, 400, f"Recurso inválido. Use: {', '.join(OPERACOES)}")
+        if tipo not in OPERACOES[recurso]:
+            raise OperacaoLoteError(indice, 400, f"Operação inválida. Use: {', '.join(OPERACOES[recurso])}")
+        if tipo != "criar" and operacao.get("id") is None:
+            raise OperacaoLoteError(indice, 400, "Campo obrigatório faltando: id")
+        if tipo != "deletar" and not isinstance(operacao.get("dados"), dict):
+            raise OperacaoLoteError(indice, 400, "Campo obrigatório faltando: dados")
+        if operacao.get("ref") is not None:
+            if tipo != "criar":
+                raise OperacaoLoteError(indice, 400, "ref só pode ser usada em operações de criação")
+            if operacao["ref"] in refs:
+                raise OperacaoLoteError(indice, 400, f"ref duplicada: {operacao['ref']}")
+            refs.add(operacao["ref"])
+
+
+def executar_lote(operacoes):
+    """
+    function to run a list of create/update/delete operations in one transaction with one commit
+    Each operation calls the same controller function as its route. An operation may reference the
+    id of a record created earlier in the batch with {"$ref": "<ref>"}. The first failure rolls back
+    every operation of the batch.
+    :param operacoes: list of {"recurso", "operacao", "ref"?, "id"?, "versao"?, "dados"?}
+    :return: list of per-operation results
+    """
+    _validar_operacoes(operacoes)
+
+    # Mesmo custo de queries das rotas equivalentes, mais SAVEPOINT/RELEASE de cada operação e a
+    # abertura da transação única
+    orcamento = queries_de_abertura()
+    for operacao in operacoes:
+        view = current_app.view_functions[OPERACOES[operacao["recurso"]][operacao["operacao"]][1]]
+        orcamento += getattr(view, "orcamento_queries", 0) + 2
+    ajustar_orcamento(orcamento, current_app.config.get("NPLUSONE_THRESHOLD", 3) * len(operacoes))
+
+    resultados = []
+    criados = {}
+    with transacao_unica():
+        for indice, operacao in enumerate(operacoes):
+            funcao, _, status = OPERACOES[operacao["recurso"]][operacao["operacao"]]
+            try:
+                if operacao["operacao"] == "criar":
+                    objeto = funcao(resolver_referencias(operacao["dados"], criados))
+                elif operacao["operacao"] == "atualizar":
+                    versao = operacao.get("versao")
+                    objeto = funcao(resolver_referencias(operacao["id"], criados),
+                                    resolver_referencias(operacao["dados"], criados),
+                                    {versao} if versao is not None else None)
+                else:
+                    objeto = None
+                    funcao(resolver_referencias(operacao["id"], criados))
+            except VersaoDivergenteError as e:
+                raise OperacaoLoteError(indice, 412, str(e))
+            except ValidacaoError as e:
+                raise OperacaoLoteError(indice, 422, str(e), e.erros)
+            except RegistroDuplicadoError as e:
+                raise OperacaoLoteError(indice, 409, str(e))
+            except Exception as e:
+                raise OperacaoLoteError(indice, 400, str(e))
+
+            resultado = {"indice": indice, "recurso": operacao["recurso"], "operacao": operacao["operacao"],
+                         "status": status}
+            if operacao.get("ref") is not None:
+                criados[operacao["ref"]] = objeto.id
+                resultado["ref"] = operacao["ref"]
+            if objeto is not None:
+                resultado["data"] = objeto.to_dict()
+            resultados.append(resultado)
+    return resultados
@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
 from app.models.medico import Medico
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from app.extensions import db
-from datetime import datetime
+from app.services.busca_ids_service import buscar_por_ids
+from app.services.concorrencia_service import VersaoDivergenteError, registro_duplicado, verificar_versao
+from app.services.transacao_service import confirmar
+from app.services.validacao_service import Campo, Esquema, limpar_cpf
+
+ESQUEMA_MEDICO = Esquema(
+    nome=Campo("texto", obrigatorio=True),
+    crm=Campo("texto", obrigatorio=True),
+    especialidade=Campo("texto", obrigatorio=True),
+    telefone=Campo("texto"),
+    email=Campo("email"),
+)
+# coluna única -> mensagem do 409
+DUPLICADOS_MEDICO = {"crm": "CRM já cadastrado"}
 
 def listar_medicos():
     """
@@ -14,6 +28,17 @@ def listar_medicos():
     except SQLAlchemyError as e:
         raise Exception(f"Erro ao listar pacientes: {str(e)}")
 
+def medicos_por_ids(ids):
+    """
+    function to get several doctors by ID with IN queries
+    :param ids: list of doctor identifiers
+    :return: (doctors in the requested order, missing ids)
+    """
+    try:
+        return buscar_por_ids(Medico, ids)
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar medicos: {str(e)}")
+
 def medico_id(id):
     """
     function to get a doctor by ID
@@ -34,78 +59,48 @@ def criar_medico(data):
     :param data: my database
     :return: doctor
     """
+    data = ESQUEMA_MEDICO.validar(data)
     try:
-        # Validar dados obrigatorios
-        campos_obrigatorios = ['nome', 'data_nascimento', 'cpf']
-        for campo in campos_obrigatorios:
-            if campo not in data or not data[campo]:
-                raise Exception(f"Campo obrigatório faltando: {campo}")
-
-        # Verifica de cpf já existe
-        if Medico.query.filter_by(cpf=data['cpf']).first():
-            raise Exception("CPF já cadastrado")
-
-        # Converter data_nascimento se for string
-        if isinstance(data['data_nascimento'], str):
-            try:
-                data['data_nascimento'] = datetime.strptime(data['data_nascimento'], '%d-%m-%Y').date()
-            except ValueError:
-                raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-
-
-        # Validar CPF (apenas números e 11 dígitos)
-        cpf = data['cpf'].replace('.', '').replace('-', '')
-        if not (cpf.isdigit() and len(cpf) == 11):
-            raise Exception("CPF inválido. Deve conter 11 dígitos numéricos.")
-        data['cpf'] = cpf
-
         medico = Medico(**data)
         db.session.add(medico)
-        db.session.commit()
+        confirmar()
         return medico
 
+    except IntegrityError as e:
+        db.session.rollback()
+        raise registro_duplicado(e, DUPLICADOS_MEDICO) or Exception(f"erro ao criar paciente: {str(e)}")
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"erro ao criar paciente: {str(e)}")
-    except ValueError:
-        raise Exception("Formato de data inválido. Use YYYY-MM-DD")
 
-def atualizar_medico(id, data):
+def atualizar_medico(id, data, versao=None):
     """
     function to update doctor
     :param id: doctor identifier
     :param data: database
+    :param versao: versions accepted by the If-Match header (None: no precondition)
     :return: doctor update by ID
     """
+    data = ESQUEMA_MEDICO.validar(data, parcial=True)
     try:
         medico = medico_id(id)
+        verificar_versao(medico, versao)
 
-        # Verifica de cpf já existe
-        if Medico.query.filter_by(cpf=data['cpf']).first():
-            raise Exception("CPF já cadastrado")
-
-        # Converter data_nascimento se for string
-        if 'data_nascimento' in data and isinstance(data['data_nascimento'], str):
-            try:
-                data['data_nascimento'] = datetime.strptime(data['data_nascimento'], '%d-%m-%Y').date()
-            except ValueError:
-                raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-
-        # Atualizar campos do medico
-        campos_permitidos = ['nome', 'data_nascimento', 'cpf', 'telefone', 'email']
         for key, value in data.items():
-            if key in campos_permitidos and hasattr(medico, key):
-                setattr(medico, key, value)
+            setattr(medico, key, value)
 
-        db.session.commit()
+        confirmar()
         return medico
 
+    except StaleDataError:
+        db.session.rollback()
+        raise VersaoDivergenteError("Registro alterado por outra requisição")
     except IndexError:
         db.session.rollback()
         raise Exception("Medico não encontrado")
-    except IntegrityError:
+    except IntegrityError as e:
         db.session.rollback()
-        raise Exception("Erro de integridade: possível duplicação de CPF")
+        raise registro_duplicado(e, DUPLICADOS_MEDICO) or Exception(f"Erro ao atualizar pacientes: {str(e)}")
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"Erro ao atualizar pacientes: {str(e)}")
@@ -149,9 +144,10 @@ def medico_cpf(cpf):
         if not cpf:
             raise Exception("CPF não fornecido")
 
-        cpf_limpo = cpf.replace('.', '').replace('-', '')
-        if not (cpf_limpo.isdigit() and len(cpf_limpo) == 11):
-            raise Exception("CPF inválido. Deve conter 11 dígitos numéricos.")
+        try:
+            cpf_limpo = limpar_cpf(cpf)
+        except ValueError as e:
+            raise Exception(str(e))
 
         paciente = Medico.query.filter_by(cpf=cpf_limpo).first()
         if not paciente:
@@ -1,8 +1,25 @@
 # -*- coding: utf-8 -*-
 from app.models.paciente import Paciente
+from app.models.consulta import Consulta
+from app.models.exame import Exame
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from app.extensions import db
-from datetime import datetime
+from app.services.busca_ids_service import buscar_por_ids
+from app.services import duplicidade_service
+from app.services.concorrencia_service import VersaoDivergenteError, registro_duplicado, verificar_versao
+from app.services.transacao_service import confirmar
+from app.services.validacao_service import Campo, Esquema, limpar_cpf
+
+ESQUEMA_PACIENTE = Esquema(
+    nome=Campo("texto", obrigatorio=True, max_len=150),
+    data_nascimento=Campo("data", obrigatorio=True),
+    cpf=Campo("cpf", obrigatorio=True),
+    telefone=Campo("texto", max_len=15),
+    email=Campo("email", max_len=100),
+)
+# coluna única -> mensagem do 409
+DUPLICADOS_PACIENTE = {"cpf": "CPF já cadastrado"}
 
 def listar_pacientes():
     """
@@ -14,6 +31,17 @@ def listar_pacientes():
     except SQLAlchemyError as e:
         raise Exception(f"Erro ao listar pacientes: {str(e)}")
 
+def pacientes_por_ids(ids):
+    """
+    function to get several patients by ID with IN queries
+    :param ids: list of patient identifiers
+    :return: (patients in the requested order, missing ids)
+    """
+    try:
+        return buscar_por_ids(Paciente, ids)
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar pacientes: {str(e)}")
+
 def paciente_id(id):
     """
     function to get a patient by ID
@@ -34,78 +62,48 @@ def criar_paciente(data):
     :param data: my database
     :return: patient
     """
+    data = ESQUEMA_PACIENTE.validar(data)
     try:
-        # Validar dados obrigatorios
-        campos_obrigatorios = ['nome', 'data_nascimento', 'cpf']
-        for campo in campos_obrigatorios:
-            if campo not in data or not data[campo]:
-                raise Exception(f"Campo obrigatório faltando: {campo}")
-
-        # Verifica de cpf já existe
-        if Paciente.query.filter_by(cpf=data['cpf']).first():
-            raise Exception("CPF já cadastrado")
-
-        # Converter data_nascimento se for string
-        if isinstance(data['data_nascimento'], str):
-            try:
-                data['data_nascimento'] = datetime.strptime(data['data_nascimento'], '%d-%m-%Y').date()
-            except ValueError:
-                raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-
-
-        # Validar CPF (apenas números e 11 dígitos)
-        cpf = data['cpf'].replace('.', '').replace('-', '')
-        if not (cpf.isdigit() and len(cpf) == 11):
-            raise Exception("CPF inválido. Deve conter 11 dígitos numéricos.")
-        data['cpf'] = cpf
-
         paciente = Paciente(**data)
         db.session.add(paciente)
-        db.session.commit()
+        confirmar()
         return paciente
 
+    except IntegrityError as e:
+        db.session.rollback()
+        raise registro_duplicado(e, DUPLICADOS_PACIENTE) or Exception(f"erro ao criar paciente: {str(e)}")
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"erro ao criar paciente: {str(e)}")
-    except ValueError:
-        raise Exception("Formato de data inválido. Use YYYY-MM-DD")
 
-def atualizar_paciente(id, data):
+def atualizar_paciente(id, data, versao=None):
     """
     function to update patient
     :param id: patient identifier
     :param data: database
+    :param versao: versions accepted by the If-Match header (None: no precondition)
     :return: patient update by ID
     """
+    data = ESQUEMA_PACIENTE.validar(data, parcial=True)
     try:
         paciente = paciente_id(id)
+        verificar_versao(paciente, versao)
 
-        # Verifica de cpf já existe
-        if Paciente.query.filter_by(cpf=data['cpf']).first():
-            raise Exception("CPF já cadastrado")
-
-        # Converter data_nascimento se for string
-        if 'data_nascimento' in data and isinstance(data['data_nascimento'], str):
-            try:
-                data['data_nascimento'] = datetime.strptime(data['data_nascimento'], '%d-%m-%Y').date()
-            except ValueError:
-                raise Exception("Formato de data inválido. Use DD-MM-YYYY")
-
-        # Atualizar campos do paciente
-        campos_permitidos = ['nome', 'data_nascimento', 'cpf', 'telefone', 'email']
         for key, value in data.items():
-            if key in campos_permitidos and hasattr(paciente, key):
-                setattr(paciente, key, value)
+            setattr(paciente, key, value)
 
-        db.session.commit()
+        confirmar()
         return paciente
 
+    except StaleDataError:
+        db.session.rollback()
+        raise VersaoDivergenteError("Registro alterado por outra requisição")
     except IndexError:
         db.session.rollback()
         raise Exception("Paciente não encontrado")
-    except IntegrityError:
+    except IntegrityError as e:
         db.session.rollback()
-        raise Exception("Erro de integridade: possível duplicação de CPF")
+        raise registro_duplicado(e, DUPLICADOS_PACIENTE) or Exception(f"Erro ao atualizar pacientes: {str(e)}")
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"Erro ao atualizar pacientes: {str(e)}")
@@ -150,9 +148,10 @@ def paciente_cpf(cpf):
         if not cpf:
             raise Exception("CPF não fornecido")
 
-        cpf_limpo = cpf.replace('.', '').replace('-', '')
-        if not (cpf_limpo.isdigit() and len(cpf_limpo) == 11):
-            raise Exception("CPF inválido. Deve conter 11 dígitos numéricos.")
+        try:
+            cpf_limpo = limpar_cpf(cpf)
+        except ValueError as e:
+            raise Exception(str(e))
 
         paciente = Paciente.query.filter_by(cpf=cpf_limpo).first()
         if not paciente:
@@ -161,4 +160,30 @@ def paciente_cpf(cpf):
         return paciente
 
     except SQLAlchemyError as e:
-        raise Exception(f"Erro ao buscar paciente por CPF: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Erro ao buscar paciente por CPF: {str(e)}")
+
+def prontuario_paciente(id):
+    """
+    function to get the patient chart: patient data, consultations and exams (most recent first)
+    :param id: patient identifier
+    :return: tuple (patient, consultation list, exam list)
+    """
+    try:
+        paciente = paciente_id(id)
+        consultas = Consulta.query.filter_by(paciente_id=id).order_by(Consulta.data_consulta.desc()).all()
+        exames = Exame.query.filter_by(id_paciente=id).order_by(Exame.criado_em.desc(), Exame.id.desc()).all()
+        return paciente, consultas, exames
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar prontuário: {str(e)}")
+
+def duplicatas_paciente(id, limiar=None):
+    """
+    function to find probable duplicates of a patient among the patients sharing one of its blocking keys
+    :param id: patient identifier
+    :param limiar: minimum score (default DEDUP_MIN_SCORE)
+    :return: list of (patient, score, similarities), best first
+    """
+    try:
+        return duplicidade_service.duplicatas(paciente_id(id), limiar)
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar duplicatas: {str(e)}")
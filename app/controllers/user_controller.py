@@ -1,9 +1,33 @@
 # -*- coding: utf-8 -*-
 from app.models.user import User
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from app.extensions import db
-import re
-from datetime import datetime
+from app.services.auth_service import PAPEIS
+from app.services.busca_ids_service import buscar_por_ids
+from app.services.concorrencia_service import VersaoDivergenteError, registro_duplicado, verificar_versao
+from app.services.metricas_service import BCRYPT_DURACAO
+from app.services.transacao_service import confirmar
+from app.services.validacao_service import Campo, Esquema
+
+ESQUEMA_USUARIO = Esquema(
+    username=Campo("texto", obrigatorio=True, max_len=80),
+    email=Campo("email", obrigatorio=True, max_len=120),
+    password=Campo("senha", obrigatorio=True),
+)
+# coluna única -> mensagem do 409
+DUPLICADOS_USUARIO = {"username": "Username já cadastrado", "email": "Email já cadastrado"}
+
+
+def _definir_senha(usuario, senha):
+    """
+    function to hash and set a user password, timing bcrypt for /metrics
+    :param usuario: user
+    :param senha: plain text password
+    :return: None
+    """
+    with BCRYPT_DURACAO.labels('hash').time():
+        usuario.set_password(senha)
 
 
 def listar_usuarios():
@@ -16,6 +40,19 @@ def listar_usuarios():
     except SQLAlchemyError as e:
         raise Exception(f"Erro ao listar usuários: {str(e)}")
 
+
+def usuarios_por_ids(ids):
+    """
+    function to get several users by ID with IN queries
+    :param ids: list of user identifiers
+    :return: (users in the requested order, missing ids)
+    """
+    try:
+        return buscar_por_ids(User, ids)
+    except SQLAlchemyError as e:
+        raise Exception(f"Erro ao buscar usuários: {str(e)}")
+
+
 def usuario_id(id):
     """
     function to get a user by ID
@@ -36,66 +73,53 @@ def criar_usuario(data):
     :param data: my database
     :return: user
     """
+    data = ESQUEMA_USUARIO.validar(data)
     try:
-        # Validar dados obrigatorios
-        campos_obrigatorios = ['username', 'email', 'password']
-        for campo in campos_obrigatorios:
-            if campo not in data or not data[campo]:
-                raise Exception(f"Campo obrigatório faltando: {campo}")
-
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", data['email']):
-            raise Exception("Email inválido")
-
-        # Verifica de username ou email já existe
-        if User.query.filter_by(username=data['username']).first():
-            raise Exception("Username já cadastrado")
-        if User.query.filter_by(email=data['email']).first():
-            raise Exception("Email já cadastrado")
-
         usuario = User(
             username=data['username'],
             email=data['email'],
         )
-        usuario.set_password(data['password'])
+        _definir_senha(usuario, data['password'])
         db.session.add(usuario)
-        db.session.commit()
+        confirmar()
         return usuario
     except IntegrityError as e:
         db.session.rollback()
-        raise Exception(f"Erro de integridade ao criar usuário: {str(e)}")
+        raise registro_duplicado(e, DUPLICADOS_USUARIO) or Exception(f"Erro de integridade ao criar usuário: {str(e)}")
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"Erro ao criar usuário: {str(e)}")
 
-def atualizar_usuario(id, data):
+def atualizar_usuario(id, data, versao=None):
     """
     function to update user
     :param id: user identifier
     :param data: my database
+    :param versao: versions accepted by the If-Match header (None: no precondition)
     :return: updated user
     """
+    data = ESQUEMA_USUARIO.validar(data, parcial=True)
     try:
         usuario = User.query.get(id)
         if not usuario:
             raise Exception("Usuário não encontrado")
+        verificar_versao(usuario, versao)
 
-        # Atualizar campos permitidos
-        campos_permitidos = ['username', 'email', 'password']
-        for campo in campos_permitidos:
-            if campo in data and data[campo]:
-                if campo == 'username' and data['username'] != usuario.username:
-                    if User.query.filter_by(username=data['username']).first():
-                        raise Exception("Username já cadastrado")
-                if campo == 'email' and data['email'] != usuario.email:
-                    if User.query.filter_by(email=data['email']).first():
-                        raise Exception("Email já cadastrado")
-                setattr(usuario, campo, data[campo])
+        for campo, valor in data.items():
+            if campo == 'password':
+                _definir_senha(usuario, valor)
+            else:
+                setattr(usuario, campo, valor)
 
-        db.session.commit()
+        confirmar()
         return usuario
+    except StaleDataError:
+        db.session.rollback()
+        raise VersaoDivergenteError("Registro alterado por outra requisição")
     except IntegrityError as e:
         db.session.rollback()
-        raise Exception(f"Erro de integridade ao atualizar usuário: {str(e)}")
+        raise (registro_duplicado(e, DUPLICADOS_USUARIO)
+               or Exception(f"Erro de integridade ao atualizar usuário: {str(e)}"))
     except SQLAlchemyError as e:
         db.session.rollback()
         raise Exception(f"Erro ao atualizar usuário: {str(e)}")
@@ -117,6 +141,26 @@ def deletar_usuario(id):
         db.session.rollback()
         raise Exception(f"Erro ao deletar usuário: {str(e)}")
 
+def definir_papel(username, papel):
+    """
+    function to change the role of a user (the only way to grant "admin")
+    :param username: user username
+    :param papel: new role
+    :return: user with the new role
+    """
+    if papel not in PAPEIS:
+        raise Exception(f"Papel inválido. Use: {', '.join(PAPEIS)}")
+    try:
+        usuario = User.query.filter_by(username=username).first()
+        if not usuario:
+            raise Exception("Usuário não encontrado")
+        usuario.role = papel
+        confirmar()
+        return usuario
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise Exception(f"Erro ao alterar papel do usuário: {str(e)}")
+
 def usuario_username(username):
     """
     function to get a user by username
@@ -154,7 +198,11 @@ def autenticar_usuario(username, password):
     """
     try:
         usuario = User.query.filter_by(username=username).first()
-        if not usuario or not usuario.check_password(password):
+        if not usuario:
+            raise Exception("Credenciais inválidas")
+        with BCRYPT_DURACAO.labels('check').time():
+            senha_confere = usuario.check_password(password)
+        if not senha_confere:
             raise Exception("Credenciais inválidas")
         return usuario
     except SQLAlchemyError as e:
@@ -172,7 +220,7 @@ def alterar_senha(id, nova_senha):
         if not usuario:
             raise Exception("Usuário não encontrado")
 
-        usuario.password = nova_senha  # Assumindo que a senha será hashada no setter do modelo
+        _definir_senha(usuario, nova_senha)
         db.session.commit()
         return usuario
     except SQLAlchemyError as e:
@@ -191,7 +239,7 @@ def resetar_senha(email, nova_senha):
         if not usuario:
             raise Exception("Usuário não encontrado")
 
-        usuario.password = nova_senha  # Assumindo que a senha será hashada no setter do modelo
+        _definir_senha(usuario, nova_senha)
         db.session.commit()
         return usuario
     except SQLAlchemyError as e:
@@ -1,7 +1,51 @@
+import sqlite3
+
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
 from flask_jwt_extended import JWTManager
+from sqlalchemy import Select, event
+from sqlalchemy.engine import Engine
+
+
+class SessaoRoteada(Session):
+    """
+    Session that sends the SELECTs of read-only requests to the replica chosen for the request
+    (g._replica_leitura, set by app/services/replicas_service.py). The first flush or non-SELECT
+    statement moves the rest of the request to the primary, so it reads what it has just written.
+    """
 
-db = SQLAlchemy()
-migrate = Migrate()
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get("_replica_leitura") is not None:
+            if not self._flushing and isinstance(clause, Select):
+                return g._replica_leitura
+            g._replica_leitura = None
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": SessaoRoteada})
 jwt = JWTManager()
+
+
+def init_migrate(app):
+    """
+    Flask-Migrate importa o alembic (~100 ms); só os comandos `flask db ...` precisam dele.
+    As tabelas criadas em tempo de execução (partições de consultas) ficam fora do autogenerate.
+    """
+    from flask_migrate import Migrate
+
+    from app.services.particionamento_service import fora_das_migracoes
+
+    Migrate(app, db, include_object=fora_das_migracoes)
+
+
+@event.listens_for(Engine, "connect")
+def _configurar_sqlite(dbapi_connection, connection_record):
+    """
+    SQLite em modo WAL: leituras longas (ex.: exportações em streaming) não bloqueiam escritas.
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
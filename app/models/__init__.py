@@ -3,6 +3,13 @@ from .paciente import Paciente
 from .user import User
 from .consulta import Consulta
 from .exame import Exame
+from .exportacao import Exportacao
+from .idempotencia import ChaveIdempotencia
+from .auditoria import RegistroAuditoria, OutboxAuditoria
+from .alteracao import Alteracao, SequenciaAlteracoes
+from .evento_consulta import EventoConsulta
 
 
-__all__ = ["Paciente", "Consulta", "Medico", "User", "Exame"]
+__all__ = ["Paciente", "Consulta", "Medico", "User", "Exame", "Exportacao", "ChaveIdempotencia",
+           "RegistroAuditoria", "OutboxAuditoria",
+           "Alteracao", "SequenciaAlteracoes", "EventoConsulta"]
@@ -0,0 +1,36 @@
+from sqlalchemy import DDL, event
+
+from app.extensions import db
+
+class Alteracao(db.Model):
+    """
+    Change feed (GET /changes): one row per record, holding the sequence of its last change. A new
+    change replaces the row of the record, so the feed is always compacted; deletions stay as tombstones
+    until `flask alteracoes compactar` removes the old ones.
+    """
+    __tablename__ = "alteracoes"
+    __table_args__ = (
+        db.UniqueConstraint("recurso", "registro_id", name="uq_alteracoes_recurso_registro"),
+    )
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    recurso = db.Column(db.String(30), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.Enum('upsert', 'delete', name='operacao_alteracao'), nullable=False)
+    alterado_em = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
+class SequenciaAlteracoes(db.Model):
+    """
+    Single row with the last sequence handed out and the oldest cursor still served (minimo).
+    Writers lock the row until they commit, so sequences become visible in commit order.
+    """
+    __tablename__ = "sequencia_alteracoes"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    valor = db.Column(db.Integer, nullable=False, server_default="0")
+    minimo = db.Column(db.Integer, nullable=False, server_default="0")
+
+
+event.listen(SequenciaAlteracoes.__table__, "after_create",
+             DDL("INSERT INTO sequencia_alteracoes (id, valor, minimo) VALUES (1, 0, 0)"))
@@ -0,0 +1,45 @@
+from app.extensions import db
+
+class RegistroAuditoria(db.Model):
+    __tablename__ = "auditoria"
+    __table_args__ = (
+        db.Index("ix_auditoria_recurso_registro", "recurso", "registro_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    recurso = db.Column(db.String(30), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.Enum('insert', 'update', 'delete', name='operacao_auditoria'), nullable=False)
+    alteracoes = db.Column(db.JSON, nullable=False)  # {"campo": {"antes": ..., "depois": ...}}
+    usuario = db.Column(db.String(100))
+    ip = db.Column(db.String(45))
+    alterado_em = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    def to_dict(self):
+        """
+        Convert RegistroAuditoria object to dictionary.
+        :return: Dictionary representation of the RegistroAuditoria object.
+        """
+        return {
+            "id": self.id,
+            "recurso": self.recurso,
+            "registro_id": self.registro_id,
+            "operacao": self.operacao,
+            "alteracoes": self.alteracoes,
+            "usuario": self.usuario,
+            "ip": self.ip,
+            "alterado_em": self.alterado_em.isoformat() if self.alterado_em else None
+        }
+
+
+class OutboxAuditoria(db.Model):
+    """
+    One row per flush with every audit record of that flush, written in the same transaction as the
+    change: committed changes always have their audit records, even if the process dies before the
+    background flush moves them to auditoria.
+    """
+    __tablename__ = "auditoria_outbox"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    registros = db.Column(db.JSON, nullable=False)
+    criado_em = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
@@ -2,6 +2,13 @@ from app.extensions import db
 
 class Consulta(db.Model):
     __tablename__ = "consultas"
+    # Índices do caminho quente (agenda por médico/paciente). No PostgreSQL a tabela é
+    # particionada por mês em data_consulta (ver app/services/particionamento_service.py),
+    # então cada partição carrega apenas a sua fatia desses índices.
+    __table_args__ = (
+        db.Index("ix_consultas_medico_data", "medico_id", "data_consulta"),
+        db.Index("ix_consultas_paciente_data", "paciente_id", "data_consulta"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
@@ -9,6 +16,12 @@ class Consulta(db.Model):
     data_consulta = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.Enum('agendada', 'realizada', 'cancelada', name='status_consulta'), server_default='agendada')  # agendada, realizada, cancelada
     criado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    versao = db.Column(db.Integer, nullable=False, server_default="1")
+
+    # eager_defaults: status, criado_em e versao já estão carregados no after_flush que grava os eventos
+    # de consultas (app/services/eventos_consultas_service.py) - pelo RETURNING do INSERT ou, em bancos
+    # sem RETURNING, por um SELECT logo depois dele
+    __mapper_args__ = {"version_id_col": versao, "eager_defaults": True}
 
     # Relacionamentos
     paciente = db.relationship("Paciente", back_populates="consultas")
@@ -25,5 +38,6 @@ class Consulta(db.Model):
             "medico_id": self.medico_id,
             "data_consulta": self.data_consulta.isoformat() if self.data_consulta else None,
             "status": self.status,
-            "criado_em": self.criado_em.isoformat() if self.criado_em else None
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "versao": self.versao
         }
\ No newline at end of file
@@ -0,0 +1,33 @@
+from app.extensions import db
+
+class EventoConsulta(db.Model):
+    """
+    Consulta changes pushed by GET /consultas/eventos, kept for SSE_EVENT_RETENTION_MINUTES so a
+    reconnecting client can resume from its Last-Event-ID.
+    """
+    __tablename__ = "eventos_consultas"
+    __table_args__ = (
+        db.Index("ix_eventos_consultas_medico_seq", "medico_id", "seq"),
+        db.Index("ix_eventos_consultas_medico_anterior_seq", "medico_anterior_id", "seq"),
+    )
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    consulta_id = db.Column(db.Integer, nullable=False)
+    medico_id = db.Column(db.Integer, nullable=False)
+    # Médico de quem a consulta saiu, quando a alteração trocou o medico_id: o stream dele também a recebe
+    medico_anterior_id = db.Column(db.Integer)
+    tipo = db.Column(db.Enum('criada', 'atualizada', 'removida', name='tipo_evento_consulta'), nullable=False)
+    dados = db.Column(db.JSON, nullable=False)
+    criado_em = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    def to_dict(self):
+        """
+        Convert EventoConsulta object to dictionary.
+        :return: Dictionary representation of the EventoConsulta object.
+        """
+        return {
+            "seq": self.seq,
+            "tipo": self.tipo,
+            "consulta": self.dados,
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None
+        }
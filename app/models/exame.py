@@ -7,6 +7,9 @@ class Exame(db.Model):
     resultado = db.Column(db.Text)
     arquivo_exame = db.Column(db.Text)
     criado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    versao = db.Column(db.Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": versao}
 
     paciente = db.relationship("Paciente", back_populates="exames")
 
@@ -21,5 +24,6 @@ class Exame(db.Model):
             "tipo": self.tipo,
             "resultado": self.resultado,
             "arquivo_exame": self.arquivo_exame,
-            "criado_em": self.criado_em.isoformat() if self.criado_em else None
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "versao": self.versao
         }
\ No newline at end of file
@@ -0,0 +1,50 @@
+from app.extensions import db
+
+class Exportacao(db.Model):
+    __tablename__ = "exportacoes"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    recurso = db.Column(db.Enum('consultas', 'exames', name='recurso_exportacao'), nullable=False)
+    formato = db.Column(db.Enum('csv', 'ndjson', name='formato_exportacao'), nullable=False, server_default='csv')
+    filtros = db.Column(db.JSON)
+    status = db.Column(db.Enum('pendente', 'processando', 'concluida', 'erro', name='status_exportacao'),
+                       nullable=False, server_default='pendente')
+    total_linhas = db.Column(db.Integer)
+    linhas_exportadas = db.Column(db.Integer, nullable=False, server_default='0')
+    arquivo = db.Column(db.Text)
+    erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    concluido_em = db.Column(db.DateTime(timezone=True))
+    # Heartbeat: renovado a cada commit do job; parado há EXPORT_STALE_SECONDS indica worker morto
+    atualizado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now())
+
+    @property
+    def progresso(self):
+        """
+        Percentage of rows already written to the export file.
+        :return: progress between 0 and 100, or None while the total is unknown.
+        """
+        if self.status == 'concluida':
+            return 100.0
+        if not self.total_linhas:
+            return None
+        return round(100.0 * (self.linhas_exportadas or 0) / self.total_linhas, 1)
+
+    def to_dict(self):
+        """
+        Convert Exportacao object to dictionary.
+        :return: Dictionary representation of the Exportacao object.
+        """
+        return {
+            "id": self.id,
+            "recurso": self.recurso,
+            "formato": self.formato,
+            "filtros": self.filtros,
+            "status": self.status,
+            "total_linhas": self.total_linhas,
+            "linhas_exportadas": self.linhas_exportadas,
+            "progresso": self.progresso,
+            "erro": self.erro,
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "concluido_em": self.concluido_em.isoformat() if self.concluido_em else None
+        }
@@ -0,0 +1,27 @@
+from app.extensions import db
+
+class ChaveIdempotencia(db.Model):
+    __tablename__ = "chaves_idempotencia"
+
+    chave = db.Column(db.String(255), primary_key=True)
+    hash_requisicao = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.Enum('processando', 'concluida', name='status_idempotencia'),
+                       nullable=False, server_default='processando')
+    status_resposta = db.Column(db.Integer)
+    corpo_resposta = db.Column(db.LargeBinary)
+    content_type = db.Column(db.String(255))
+    criado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    expira_em = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    def to_dict(self):
+        """
+        Convert ChaveIdempotencia object to dictionary.
+        :return: Dictionary representation of the ChaveIdempotencia object.
+        """
+        return {
+            "chave": self.chave,
+            "status": self.status,
+            "status_resposta": self.status_resposta,
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "expira_em": self.expira_em.isoformat() if self.expira_em else None
+        }
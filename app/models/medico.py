@@ -9,6 +9,9 @@ class Medico(db.Model):
     telefone = db.Column(db.Text)
     email = db.Column(db.Text)
     criado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    versao = db.Column(db.Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": versao}
 
     consultas = db.relationship("Consulta", back_populates="medico")
 
@@ -24,5 +27,6 @@ class Medico(db.Model):
             "especialidade": self.especialidade,
             "telefone": self.telefone,
             "email": self.email,
-            "criado_em": self.criado_em.isoformat() if self.criado_em else None
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "versao": self.versao
         }
\ No newline at end of file
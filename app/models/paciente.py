@@ -2,6 +2,14 @@ from app.extensions import db
 
 class Paciente(db.Model):
     __tablename__ = "pacientes"
+    # Blocos da deduplicação (ver app/services/duplicidade_service.py): só pacientes que dividem
+    # um destes índices são comparados entre si
+    __table_args__ = (
+        db.Index("ix_pacientes_fonetica_primeiro_nascimento", "fonetica_primeiro", "data_nascimento"),
+        db.Index("ix_pacientes_fonetica_ultimo_nascimento", "fonetica_ultimo", "data_nascimento"),
+        db.Index("ix_pacientes_fonetica_nome", "fonetica_nome"),
+        db.Index("ix_pacientes_telefone_normalizado", "telefone_normalizado"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     nome = db.Column(db.String(150), nullable=False)
@@ -10,6 +18,18 @@ class Paciente(db.Model):
     telefone = db.Column(db.String(15))
     email = db.Column(db.String(100))
     criado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    versao = db.Column(db.Integer, nullable=False, server_default="1")
+
+    # Chaves de bloqueio, recalculadas a cada INSERT/UPDATE a partir de nome e telefone;
+    # derivadas, ficam fora da auditoria e do to_dict
+    fonetica_nome = db.Column(db.String(150), info={"auditar": False})
+    fonetica_primeiro = db.Column(db.String(40), info={"auditar": False})
+    fonetica_ultimo = db.Column(db.String(40), info={"auditar": False})
+    telefone_normalizado = db.Column(db.String(15), info={"auditar": False})
+
+    # Concorrência otimista: todo UPDATE leva "AND versao = <versão carregada>" e incrementa a versão;
+    # nenhuma linha afetada vira StaleDataError (ver app/services/concorrencia_service.py)
+    __mapper_args__ = {"version_id_col": versao}
 
     consultas = db.relationship("Consulta", back_populates="paciente", lazy=True)
     exames = db.relationship("Exame", back_populates="paciente", lazy=True)
@@ -26,5 +46,6 @@ class Paciente(db.Model):
             "cpf": self.cpf,
             "telefone": self.telefone,
             "email": self.email,
-            "criado_em": self.criado_em.isoformat() if self.criado_em else None
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "versao": self.versao
         }
\ No newline at end of file
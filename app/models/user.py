@@ -1,13 +1,16 @@
 from app.extensions import db
-import bcrypt
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     username = db.Column(db.String(80), unique=True, nullable=False)
     senha_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.Text, nullable=False, server_default='admin')
+    # Papel no JWT; "admin" libera /admin/*. Só é concedido pela CLI (flask usuarios papel), nunca pela API
+    role = db.Column(db.Text, nullable=False, server_default='recepcao')
     criado_em = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    versao = db.Column(db.Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": versao}
 
     @property
     def password(self):
@@ -18,9 +21,13 @@ class User(db.Model):
         self.set_password(password)
 
     def set_password(self, password):
+        import bcrypt  # importado sob demanda: só login e cadastro precisam dele
+
         self.senha_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
     def check_password(self, password):
+        import bcrypt
+
         return bcrypt.checkpw(password.encode('utf-8'), self.senha_hash.encode('utf-8'))
 
     def to_dict(self):
@@ -33,5 +40,6 @@ class User(db.Model):
             "email": self.email,
             "username": self.username,
             "role": self.role,
-            "criado_em": self.criado_em.isoformat() if self.criado_em else None
+            "criado_em": self.criado_em.isoformat() if self.criado_em else None,
+            "versao": self.versao
         }
\ No newline at end of file
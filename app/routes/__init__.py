@@ -1,12 +1,26 @@
 from .user_routes import bp as user_bp
+from .auth_routes import bp as auth_bp
 from .paciente_routes import bp as paciente_bp
 from .medico_routes import bp as medico_bp
 from .consulta_routes import bp as consulta_bp
 from .exame_routes import bp as exame_bp
+from .exportacao_routes import bp as exportacao_bp
+from .lote_routes import bp as lote_bp
+from .alteracoes_routes import bp as alteracoes_bp
+from .metricas_routes import bp as metricas_bp
+from .admin_routes import bp as admin_bp
+from .saude_routes import bp as saude_bp
 
 def register_routes(app):
     app.register_blueprint(user_bp)
+    app.register_blueprint(auth_bp)
     app.register_blueprint(paciente_bp)
     app.register_blueprint(medico_bp)
     app.register_blueprint(consulta_bp)
     app.register_blueprint(exame_bp)
+    app.register_blueprint(exportacao_bp)
+    app.register_blueprint(lote_bp)
+    app.register_blueprint(alteracoes_bp)
+    app.register_blueprint(metricas_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(saude_bp)
@@ -0,0 +1,104 @@
+from flask import Blueprint, jsonify, request, send_file
+from app.services import profiling_service, slow_query_service
+from app.services.auth_service import admin_obrigatorio
+from app.services.nplusone_service import orcamento_queries
+
+bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+@bp.route("/slow-queries", methods=["GET"])
+@orcamento_queries(0)
+@admin_obrigatorio
+def listar_slow_queries():
+    """
+    List the slow SQL statements recorded by this worker (most recent first).
+
+    Query Parameters:
+        limite (int, optional): Maximum number of entries.
+
+    Returns:
+        Response: A JSON response containing:
+            - success (bool): Indicates if the operation was successful.
+            - data (list): Statement, masked parameters, duration, origin endpoint and,
+              for sampled PostgreSQL SELECTs, the EXPLAIN (ANALYZE, BUFFERS) plan.
+            - count (int): Number of entries returned.
+        HTTP Status Codes:
+            - 200: If the entries are returned.
+            - 401/403: If the caller is not an administrator.
+    """
+    limite = request.args.get("limite", type=int)
+    registros = slow_query_service.listar_slow_queries(limite)
+    return jsonify({
+        "success": True,
+        "data": registros,
+        "count": len(registros)
+    }), 200
+
+@bp.route("/slow-queries", methods=["DELETE"])
+@orcamento_queries(0)
+@admin_obrigatorio
+def limpar_slow_queries():
+    """
+    Clear the slow query ring buffer of this worker.
+
+    Returns:
+        Response: A JSON response with a success message.
+        HTTP Status Codes:
+            - 200: If the buffer is cleared.
+            - 401/403: If the caller is not an administrator.
+    """
+    slow_query_service.limpar_slow_queries()
+    return jsonify({
+        "success": True,
+        "message": "Slow queries removidas"
+    }), 200
+
+@bp.route("/perfis", methods=["GET"])
+@orcamento_queries(0)
+@admin_obrigatorio
+def listar_perfis():
+    """
+    List the request profiles stored by ?_profile=1 / ?_profile=cprofile.
+
+    Returns:
+        Response: A JSON response containing:
+            - success (bool): Indicates if the operation was successful.
+            - data (list): Profiles (id, modo, tamanho_bytes), most recent first.
+            - count (int): Number of profiles.
+        HTTP Status Codes:
+            - 200: If the profiles are listed.
+            - 401/403: If the caller is not an administrator.
+    """
+    perfis = profiling_service.listar_perfis()
+    return jsonify({
+        "success": True,
+        "data": perfis,
+        "count": len(perfis)
+    }), 200
+
+@bp.route("/perfis/<perfil_id>", methods=["GET"])
+@orcamento_queries(0)
+@admin_obrigatorio
+def baixar_perfil(perfil_id):
+    """
+    Download a stored profile.
+
+    Sampling profiles use the collapsed-stack format ("frame;frame;frame count"), which
+    flamegraph.pl, speedscope and similar tools read directly; cProfile runs are pstats text.
+
+    Args:
+        perfil_id (str): Identifier returned in the X-Profile-Id header.
+
+    Returns:
+        Response: The profile as text/plain.
+        HTTP Status Codes:
+            - 200: If the profile exists.
+            - 401/403: If the caller is not an administrator.
+            - 404: If the profile does not exist.
+    """
+    try:
+        caminho = profiling_service.caminho_perfil(perfil_id)
+        return send_file(caminho, mimetype="text/plain", as_attachment=True)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)}), 404
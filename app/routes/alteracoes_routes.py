@@ -0,0 +1,63 @@
+from flask import Blueprint, current_app, jsonify, request
+from app.controllers import alteracao_controller
+from app.services.alteracoes_service import MODELOS_FEED, CursorExpiradoError
+from app.services.nplusone_service import orcamento_queries
+
+bp = Blueprint("alteracoes", __name__, url_prefix="/changes")
+
+@bp.route("", methods=["GET"])
+@orcamento_queries(2 + len(MODELOS_FEED))
+def listar_alteracoes():
+    """
+    Incremental sync of pacientes and médicos: the changes after a cursor, in commit order.
+
+    Query Parameters:
+        - since (int, optional): cursor returned by the previous call; 0 (default) lists every record.
+          Pages of a full sync that started after a compaction carry a negative cursor.
+        - limit (int, optional): changes per page (default CHANGES_PAGE_SIZE, at most CHANGES_MAX_PAGE_SIZE).
+
+    Returns:
+        Response: A JSON response containing:
+            - success (bool): Indicates if the operation was successful.
+            - data (list): changes with seq, recurso, id, operacao ("upsert" with the current data of
+              the record, or "delete") and data.
+            - cursor (int): value for the next call's since.
+            - has_more (bool): whether another page is already waiting.
+        HTTP Status Codes:
+            - 200: If the changes are listed.
+            - 400: If since or limit are invalid.
+            - 410: If the cursor is older than the tombstone compaction (sync again from since=0).
+    """
+    try:
+        try:
+            desde = int(request.args.get("since", 0))
+            limite = int(request.args.get("limit", current_app.config["CHANGES_PAGE_SIZE"]))
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "message": "since e limit devem ser números inteiros"
+            }), 400
+        if limite < 1:
+            return jsonify({
+                "success": False,
+                "message": "limit deve ser >= 1"
+            }), 400
+
+        alteracoes, cursor, mais = alteracao_controller.listar_alteracoes(
+            desde, min(limite, current_app.config["CHANGES_MAX_PAGE_SIZE"]))
+        return jsonify({
+            "success": True,
+            "data": alteracoes,
+            "cursor": cursor,
+            "has_more": mais
+        }), 200
+    except CursorExpiradoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 410
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 500
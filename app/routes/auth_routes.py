@@ -0,0 +1,57 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import create_access_token
+from app.controllers import user_controller
+from app.services.nplusone_service import orcamento_queries
+from app.services.idempotencia_service import sem_idempotencia
+from app.services.limite_requisicoes_service import limite_requisicoes
+
+bp = Blueprint("auth", __name__)
+
+@bp.route("/login", methods=["POST"])
+@orcamento_queries(1)
+@sem_idempotencia
+@limite_requisicoes("RATE_LIMIT_LOGIN")
+def login():
+    """
+    Authenticate a user and issue a JWT access token.
+
+    Request Body:
+        JSON object with:
+            - username (str): The user's username.
+            - password (str): The user's password.
+
+    Returns:
+        Response: A JSON response containing:
+            - success (bool): Indicates if the authentication succeeded.
+            - access_token (str): JWT carrying the user id as identity and the role as a claim.
+            - data (dict): The authenticated user.
+        HTTP Status Codes:
+            - 200: If the credentials are valid.
+            - 400: If username or password are missing.
+            - 401: If the credentials are invalid.
+    """
+    data = request.get_json(silent=True) or {}
+    for field in ['username', 'password']:
+        if not data.get(field):
+            return jsonify({
+                "success": False,
+                "error": f"Field '{field}' is required"
+            }), 400
+
+    try:
+        usuario = user_controller.autenticar_usuario(data['username'], data['password'])
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 401
+
+    token = create_access_token(
+        identity=str(usuario.id),
+        additional_claims={"role": usuario.role, "username": usuario.username}
+    )
+    return jsonify({
+        "success": True,
+        "access_token": token,
+        "data": usuario.to_dict()
+    }), 200
@@ -1,9 +1,26 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from app.controllers import consulta_controller
+from app.services.busca_ids_service import IdsInvalidosError, ids_solicitados
+from app.services.concorrencia_service import VersaoDivergenteError, etag, versao_if_match
+from app.services.eventos_consultas_service import ParametrosEventosError, fluxo_eventos, ler_parametros
+from app.services.idempotencia_service import sem_idempotencia
+from app.services.nplusone_service import orcamento_queries
+from app.services.validacao_service import ValidacaoError
 
 bp = Blueprint("consultas", __name__, url_prefix="/consultas")
 
+def _consultas_por_ids(ids):
+    consultas, ausentes = consulta_controller.consultas_por_ids(ids_solicitados(ids))
+    consultas_data = [consulta.to_dict() for consulta in consultas]
+    return jsonify({
+        "sucesso": True,
+        "consultas": consultas_data,
+        "count": len(consultas_data),
+        "ausentes": ausentes
+    }), 200
+
 @bp.route("/", methods=["GET"])
+@orcamento_queries(1)
 def listar_consultas():
     """
     Retrieve a list of all consultations.
@@ -16,11 +33,17 @@ def listar_consultas():
             - sucesso (bool): Indicates if the operation was successful.
             - consultas (list): A list of consultations as dictionaries.
             - count (int): The total number of consultations.
+            - ausentes (list): With ?ids=1,2,3, the requested ids that do not exist; the
+              consultations come back in the requested order.
         HTTP Status Codes:
             - 200: If the consultations are successfully retrieved.
+            - 400: If ?ids= is invalid.
             - 500: If an exception occurs during the process.
     """
     try:
+        if "ids" in request.args:
+            return _consultas_por_ids(request.args["ids"])
+
         consultas = consulta_controller.listar_consultas()
         consultas_data = [consulta.to_dict() for consulta in consultas]
         return jsonify({
@@ -28,12 +51,51 @@ def listar_consultas():
             "consultas": consultas_data,
             "count": len(consultas_data)
         }), 200
+    except IdsInvalidosError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 500
+
+@bp.route("/lookup", methods=["POST"])
+@orcamento_queries(1)
+@sem_idempotencia
+def lookup_consultas():
+    """
+    Retrieve several consultations by ID (for id lists too long for ?ids=).
+
+    Request Body:
+        JSON object with:
+            - ids (list): consultation identifiers.
+
+    Returns:
+        Response: A JSON response containing:
+            - sucesso (bool): Indicates if the operation was successful.
+            - consultas (list): The consultations found, in the requested order.
+            - count (int): The number of consultations found.
+            - ausentes (list): The requested ids that do not exist.
+        HTTP Status Codes:
+            - 200: If the lookup succeeds (even if some ids are missing).
+            - 400: If ids is missing or invalid.
+            - 500: If an exception occurs during the process.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        return _consultas_por_ids(data.get("ids"))
+    except IdsInvalidosError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "sucesso": False,
             "error": str(e)}), 500
 
 @bp.route("/<int:id>", methods=["GET"])
+@orcamento_queries(1)
 def consulta_por_id(id):
     """
     Retrieve a specific consultation by its ID.
@@ -54,19 +116,21 @@ def consulta_por_id(id):
         return jsonify({
             "success": True,
             "data": consulta.to_dict()
-        }), 200
+        }), 200, etag(consulta)
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)}), 404
 
 @bp.route("/", methods=["POST"])
+@orcamento_queries(1)
 def criar_consulta():
     """
     Create a new consultation.
 
     Request Body:
-        JSON object containing the consultation data.
+        JSON object with data_consulta (DD-MM-YYYY), hora_consulta (HH:MM), paciente_id, medico_id
+        and optionally status; any other field is rejected.
 
     Returns:
         Response: A JSON response containing:
@@ -75,6 +139,7 @@ def criar_consulta():
         HTTP Status Codes:
             - 201: If the consultation is successfully created.
             - 400: If an exception occurs during the process.
+            - 422: If the body is invalid (erros lists each field and its problem).
     """
     try:
         data = request.get_json()
@@ -83,12 +148,18 @@ def criar_consulta():
             "success": True,
             "data": consulta.to_dict()
         }), 201
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "erros": e.erros}), 422
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)}), 400
 
 @bp.route("/<int:id>", methods=["PUT"])
+@orcamento_queries(2)
 def atualizar_consulta(id):
     """
     Update an existing consultation.
@@ -106,20 +177,32 @@ def atualizar_consulta(id):
         HTTP Status Codes:
             - 200: If the consultation is successfully updated.
             - 400: If an exception occurs during the process.
+            - 412: If the If-Match header does not match the current version.
+            - 422: If the body is invalid (erros lists each field and its problem).
     """
     try:
         data = request.get_json()
-        consulta = consulta_controller.atualizar_consulta(id, data)
+        consulta = consulta_controller.atualizar_consulta(id, data, versao_if_match())
         return jsonify({
             "success": True,
             "data": consulta.to_dict()
-        }), 200
+        }), 200, etag(consulta)
+    except VersaoDivergenteError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)}), 412
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "erros": e.erros}), 422
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)}), 400
 
 @bp.route("/<int:id>", methods=["DELETE"])
+@orcamento_queries(2)
 def deletar_consulta(id):
     """
     Delete a consultation.
@@ -146,6 +229,7 @@ def deletar_consulta(id):
             "error": str(e)}), 400
 
 @bp.route("/paciente/<int:paciente_id>", methods=["GET"])
+@orcamento_queries(1)
 def listar_consultas_por_paciente(paciente_id):
     """
     Retrieve all consultations for a specific patient.
@@ -177,6 +261,7 @@ def listar_consultas_por_paciente(paciente_id):
 
 
 @bp.route("/medico/<int:medico_id>", methods=["GET"])
+@orcamento_queries(1)
 def listar_consultas_por_medico(medico_id):
     """
     Retrieve all consultations for a specific doctor.
@@ -204,4 +289,45 @@ def listar_consultas_por_medico(medico_id):
     except Exception as e:
         return jsonify({
             "sucesso": False,
-            "error": str(e)}), 400
\ No newline at end of file
+            "error": str(e)}), 400
+
+
+@bp.route("/eventos", methods=["GET"])
+@orcamento_queries(0)  # as queries do stream acontecem depois que a resposta começou
+def eventos_consultas():
+    """
+    Stream consulta create/update/delete events as they commit (Server-Sent Events).
+
+    Query Parameters:
+        - medico_id (int, optional): only events of this doctor (including consultas moved away from them).
+        - last_event_id (int, optional): same as the Last-Event-ID header, for clients that cannot set it.
+
+    Headers:
+        - Last-Event-ID (optional): id of the last event received; the events after it are sent first.
+
+    Returns:
+        Response: A text/event-stream with the events consulta.criada, consulta.atualizada and
+        consulta.removida (data: {"tipo", "consulta"}), a heartbeat comment every SSE_HEARTBEAT_SECONDS
+        and a reset event when the client was away longer than the resume window.
+        HTTP Status Codes:
+            - 200: Stream opened.
+            - 400: If medico_id or Last-Event-ID are invalid.
+            - 404: If the event stream is disabled (SSE_ENABLED=false).
+    """
+    central = current_app.extensions.get("eventos_consultas")
+    if central is None:
+        return jsonify({
+            "sucesso": False,
+            "error": "Eventos de consultas desativados"}), 404
+    try:
+        medico_id, ultimo_id = ler_parametros(
+            request.args.get("medico_id"),
+            request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+    except ParametrosEventosError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 400
+
+    return Response(stream_with_context(fluxo_eventos(central, medico_id, ultimo_id)),
+                    mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
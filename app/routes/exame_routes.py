@@ -1,9 +1,24 @@
 from flask import Blueprint, jsonify, request
 from app.controllers import exame_controller
+from app.services.busca_ids_service import IdsInvalidosError, ids_solicitados
+from app.services.concorrencia_service import VersaoDivergenteError, etag, versao_if_match
+from app.services.idempotencia_service import sem_idempotencia
+from app.services.nplusone_service import orcamento_queries
+from app.services.validacao_service import ValidacaoError
 
 bp = Blueprint("exames", __name__, url_prefix="/exames")
 
+def _exames_por_ids(ids):
+    exames, ausentes = exame_controller.exames_por_ids(ids_solicitados(ids))
+    return jsonify({
+        "sucesso": True,
+        "exames": [exame.to_dict() for exame in exames],
+        "count": len(exames),
+        "ausentes": ausentes
+    }), 200
+
 @bp.route("/", methods=["GET"])
+@orcamento_queries(1)
 def get_exames():
     """
     Retrieve all exams from the database.
@@ -13,21 +28,59 @@ def get_exames():
         - sucesso (bool): Indicates if the operation was successful.
         - exames (list): List of exams as dictionaries.
         - count (int): Total number of exams.
+        - ausentes (list): With ?ids=1,2,3, the requested ids that do not exist (exams keep the requested order).
         - error (str): Error message if an exception occurs.
     """
     try:
+        if "ids" in request.args:
+            return _exames_por_ids(request.args["ids"])
+
         exames = exame_controller.listar_exames()
         return jsonify({
             "sucesso": True,
-            "exames": [exame.as_dict() for exame in exames],
+            "exames": [exame.to_dict() for exame in exames],
             "count": len(exames)
         }), 200
+    except IdsInvalidosError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 500
+
+@bp.route("/lookup", methods=["POST"])
+@orcamento_queries(1)
+@sem_idempotencia
+def lookup_exames():
+    """
+    Retrieve several exams by ID (for id lists too long for ?ids=).
+
+    Request Body:
+        JSON object with:
+        - ids (list): exam identifiers.
+
+    Returns:
+        JSON response containing:
+        - exames (list): Exams found, in the requested order.
+        - ausentes (list): Requested ids that do not exist.
+        - Error message (400 for invalid ids, 500 otherwise) if an exception occurs.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        return _exames_por_ids(data.get("ids"))
+    except IdsInvalidosError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "sucesso": False,
             "error": str(e)}), 500
 
 @bp.route("/<int:id>", methods=["GET"])
+@orcamento_queries(1)
 def get_exame(id):
     """
     Retrieve a specific exam by its ID.
@@ -43,7 +96,7 @@ def get_exame(id):
     try:
         exame = exame_controller.exame_id(id)
         if exame:
-            return jsonify(exame.as_dict()), 200
+            return jsonify(exame.to_dict()), 200, etag(exame)
         else:
             return jsonify({
                 "sucesso": False,
@@ -54,31 +107,38 @@ def get_exame(id):
             "error": str(e)}), 500
 
 @bp.route("/", methods=["POST"])
+@orcamento_queries(1)
 def post_exame():
     """
     Create a new exam in the database.
 
     Request Body:
-        JSON object containing exam data.
+        JSON object with id_paciente, tipo and optionally resultado; any other field is rejected.
 
     Returns:
         JSON response containing:
         - Created exam data as a dictionary.
-        - Error message if an exception occurs.
+        - Error message if an exception occurs (422 with erros per field if the body is invalid).
     """
     try:
         data = request.json
         exame = exame_controller.criar_exame(data)
         return jsonify({
             "sucesso": True,
-            "exame": exame.as_dict()
+            "exame": exame.to_dict()
         }), 201
+    except ValidacaoError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e),
+            "erros": e.erros}), 422
     except Exception as e:
         return jsonify({
             "sucesso": False,
             "error": str(e)}), 500
 
 @bp.route("/<int:id>", methods=["PUT"])
+@orcamento_queries(2)
 def put_exame(id):
     """
     Update an existing exam in the database.
@@ -92,21 +152,32 @@ def put_exame(id):
     Returns:
         JSON response containing:
         - Updated exam data as a dictionary.
-        - Error message if an exception occurs.
+        - Error message if an exception occurs (412 if If-Match does not match the current version,
+          422 with erros per field if the body is invalid).
     """
     try:
         data = request.json
-        exame = exame_controller.atualizar_exame(id, data)
+        exame = exame_controller.atualizar_exame(id, data, versao_if_match())
         return jsonify({
             "sucesso": True,
-            "exame": exame.as_dict()
-        }), 200
+            "exame": exame.to_dict()
+        }), 200, etag(exame)
+    except VersaoDivergenteError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e)}), 412
+    except ValidacaoError as e:
+        return jsonify({
+            "sucesso": False,
+            "error": str(e),
+            "erros": e.erros}), 422
     except Exception as e:
         return jsonify({
             "sucesso": False,
             "error": str(e)}), 500
 
 @bp.route("/<int:id>", methods=["DELETE"])
+@orcamento_queries(2)
 def delete_exame(id):
     """
     Delete an exam from the database.
@@ -131,6 +202,7 @@ def delete_exame(id):
 
 
 @bp.route("/paciente/<int:id_paciente>", methods=["GET"])
+@orcamento_queries(1)
 def listar_exames_paciente(id_paciente):
     """
     Retrieve all exams for a specific patient.
@@ -145,11 +217,12 @@ def listar_exames_paciente(id_paciente):
     """
     try:
         exames = exame_controller.listar_exames_paciente(id_paciente)
-        return jsonify([exame.as_dict() for exame in exames]), 200
+        return jsonify([exame.to_dict() for exame in exames]), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp.route("/<int:id>/upload", methods=["POST"])
+@orcamento_queries(3)
 def upload_arquivo_exame(id):
     """
     Upload a file for a specific exam.
@@ -178,6 +251,6 @@ def upload_arquivo_exame(id):
         arquivo.save(caminho_arquivo)
 
         exame = exame_controller.upload_arquivo_exame(id, caminho_arquivo)
-        return jsonify(exame.as_dict()), 200
+        return jsonify(exame.to_dict()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,99 @@
+import os
+
+from flask import Blueprint, jsonify, request, send_file
+from app.controllers import exportacao_controller
+from app.services.nplusone_service import orcamento_queries
+
+bp = Blueprint("exportacoes", __name__, url_prefix="/exportacoes")
+
+@bp.route("/", methods=["POST"])
+@orcamento_queries(2)
+def criar_exportacao():
+    """
+    Start an asynchronous export of consultations or exams.
+
+    Request Body:
+        JSON object with:
+            - recurso (str): "consultas" or "exames".
+            - formato (str): "csv" (default) or "ndjson".
+            - data_inicio / data_fim (str, optional): inclusive date range in DD-MM-YYYY.
+            - paciente_id, medico_id, status, tipo (optional): equality filters.
+
+    Returns:
+        Response: A JSON response containing:
+            - success (bool): Indicates if the job was accepted.
+            - data (dict): The export job, including its status and progress.
+        HTTP Status Codes:
+            - 202: If the export job is scheduled.
+            - 400: If the parameters are invalid.
+    """
+    try:
+        data = request.get_json(silent=True)
+        exportacao = exportacao_controller.criar_exportacao(data)
+        return jsonify({
+            "success": True,
+            "data": exportacao.to_dict()
+        }), 202
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)}), 400
+
+@bp.route("/<int:id>", methods=["GET"])
+@orcamento_queries(1)
+def status_exportacao(id):
+    """
+    Retrieve the status and progress of an export job.
+
+    Args:
+        id (int): Identifier of the export job.
+
+    Returns:
+        Response: A JSON response containing:
+            - success (bool): Indicates if the operation was successful.
+            - data (dict): The export job as a dictionary.
+        HTTP Status Codes:
+            - 200: If the export job is found.
+            - 404: If the export job does not exist.
+    """
+    try:
+        exportacao = exportacao_controller.exportacao_id(id)
+        return jsonify({
+            "success": True,
+            "data": exportacao.to_dict()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)}), 404
+
+@bp.route("/<int:id>/arquivo", methods=["GET"])
+@orcamento_queries(1)
+def baixar_exportacao(id):
+    """
+    Download the compressed file of a finished export job.
+
+    Supports HTTP Range requests, so interrupted downloads can be resumed.
+
+    Args:
+        id (int): Identifier of the export job.
+
+    Returns:
+        Response: The gzip file (200 or 206 for partial content).
+        HTTP Status Codes:
+            - 200/206: If the file is available.
+            - 409: If the export job is not finished or the file is missing.
+    """
+    try:
+        caminho = exportacao_controller.arquivo_exportacao(id)
+        return send_file(
+            caminho,
+            mimetype="application/gzip",
+            as_attachment=True,
+            download_name=os.path.basename(caminho),
+            conditional=True,
+        )
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)}), 409
@@ -0,0 +1,57 @@
+from flask import Blueprint, jsonify, request
+from app.controllers import lote_controller
+from app.services.nplusone_service import orcamento_queries
+
+bp = Blueprint("lote", __name__, url_prefix="/batch")
+
+@bp.route("", methods=["POST"])
+@orcamento_queries(0)  # ajustado em tempo de execução: soma dos orçamentos das rotas equivalentes
+def executar_lote():
+    """
+    Run several create/update/delete operations in a single transaction.
+
+    Request Body:
+        JSON object with:
+            - operacoes (list): ordered operations, each with:
+                - recurso (str): "pacientes", "medicos", "consultas" or "exames".
+                - operacao (str): "criar", "atualizar" or "deletar".
+                - dados (dict): same body as the equivalent POST/PUT route.
+                - id (int): record to update or delete.
+                - ref (str, optional): name for the record created by this operation; later
+                  operations use {"$ref": "<name>"} in place of its id.
+                - versao (int, optional): expected version, as the If-Match header of PUT.
+
+    Returns:
+        Response: A JSON response containing:
+            - success (bool): Indicates if the batch was committed.
+            - resultados (list): status, ref and data of each operation, in order.
+            - falha (dict): index, status and message of the operation that failed (plus erros
+              per field when its dados are invalid).
+        HTTP Status Codes:
+            - 200: If every operation succeeded (one commit).
+            - 400: If the batch is invalid or an operation failed (nothing is written).
+            - 409: If an operation would duplicate a unique value (CPF, CRM, ...).
+            - 412: If an operation's versao does not match the current version.
+            - 422: If an operation's dados fail validation (nothing is written).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        resultados = lote_controller.executar_lote(data.get("operacoes"))
+        return jsonify({
+            "success": True,
+            "resultados": resultados
+        }), 200
+    except lote_controller.OperacaoLoteError as e:
+        falha = {"indice": e.indice, "status": e.status, "message": str(e)}
+        if e.erros:
+            falha["erros"] = e.erros
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "falha": falha
+        }), e.status
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 500
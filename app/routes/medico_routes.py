@@ -1,15 +1,34 @@
 from flask import Blueprint, jsonify, request
 from app.controllers import medico_controller
+from app.services.busca_ids_service import ids_solicitados
+from app.services.concorrencia_service import RegistroDuplicadoError, VersaoDivergenteError, etag, versao_if_match
+from app.services.idempotencia_service import sem_idempotencia
+from app.services.limite_requisicoes_service import limite_requisicoes
+from app.services.nplusone_service import orcamento_queries
+from app.services.validacao_service import ValidacaoError
 
 bp = Blueprint("medicos", __name__, url_prefix="/medicos")
 
+def _medicos_por_ids(ids):
+    medicos, ausentes = medico_controller.medicos_por_ids(ids_solicitados(ids))
+    return jsonify({
+        "success": True,
+        "data": [p.to_dict() for p in medicos],
+        "count": len(medicos),
+        "ausentes": ausentes
+    }), 200
+
 @bp.route("/", methods=["GET"])
+@orcamento_queries(1)
 def get_medicos():
     """
     Função usada para criar uma rota do tipo GET para listar os medicos do sistema
     :return: retorna os medicos do banco de dados
     """
     try:
+        if "ids" in request.args:
+            return _medicos_por_ids(request.args["ids"])
+
         pacientes = medico_controller.listar_medicos()
         return jsonify({
             "success": True,
@@ -22,7 +41,25 @@ def get_medicos():
             "message": str(e)
         }), 400
 
+@bp.route("/lookup", methods=["POST"])
+@orcamento_queries(1)
+@sem_idempotencia
+def lookup_medicos():
+    """
+    Função usada para criar uma rota do tipo POST para buscar vários medicos pelos ids (listas longas demais para ?ids=)
+    :return: retorna os medicos na ordem pedida e os ids não encontrados
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        return _medicos_por_ids(data.get("ids"))
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+
 @bp.route("/<int:id>", methods=["GET"])
+@orcamento_queries(1)
 def get_medico(id):
     """
     Função usada para criar uma rota do tipo GET para detalhar um medico do sistema
@@ -34,7 +71,7 @@ def get_medico(id):
         return jsonify({
             "success": True,
             "data": medico.to_dict()
-        }), 200
+        }), 200, etag(medico)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -42,6 +79,7 @@ def get_medico(id):
         }), 404
 
 @bp.route("/", methods=["POST"])
+@orcamento_queries(1)
 def post_medico():
     """
     Função usada para criar uma rota do tipo PUT para atualizar os medicos do sistema
@@ -63,6 +101,17 @@ def post_medico():
             "data": paciente.to_dict()
         }), 201
 
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "erros": e.erros
+        }), 422
+    except RegistroDuplicadoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 409
     except Exception as e:
         return jsonify({
             "success": False,
@@ -70,6 +119,7 @@ def post_medico():
         }), 400
 
 @bp.route("/<int:id>", methods=["PUT"])
+@orcamento_queries(2)
 def put_medico(id):
     """
     Função usada para criar uma rota do tipo PUT para atualizar os medicos do sistema
@@ -85,13 +135,29 @@ def put_medico(id):
                 "message": "Dados não fornecidos"
             }), 400
 
-        paciente = medico_controller.atualizar_medico(id, data)
+        paciente = medico_controller.atualizar_medico(id, data, versao_if_match())
         return jsonify({
             "success": True,
             "message": "Medico atualizado com sucesso",
             "data": paciente.to_dict()
-        }), 200
+        }), 200, etag(paciente)
 
+    except VersaoDivergenteError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 412
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "erros": e.erros
+        }), 422
+    except RegistroDuplicadoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 409
     except Exception as e:
         return jsonify({
             "success": False,
@@ -99,6 +165,7 @@ def put_medico(id):
         }), 400
 
 @bp.route("/<int:id>", methods=["DELETE"])
+@orcamento_queries(3)
 def delete_medico(id):
     """
     Função usada para criar uma rota do tipo DELETE para remover os medicos do sistema
@@ -119,6 +186,8 @@ def delete_medico(id):
         }), 400
 
 @bp.route("/buscar", methods=["GET"])
+@orcamento_queries(1)
+@limite_requisicoes("RATE_LIMIT_BUSCA")
 def search_medico():
     """
     Função usada para criar uma rota do tipo GET para buscar medicos pelo nome
@@ -146,6 +215,7 @@ def search_medico():
 
 
 @bp.route("/buscar/cpf", methods=["GET"])
+@orcamento_queries(1)
 def search_medico_cpf():
     """
     Função usada para criar uma rota do tipo GET para buscar medicos pelo CPF
@@ -172,6 +242,7 @@ def search_medico_cpf():
         }), 404
 
 @bp.route("/buscar/crm", methods=["GET"])
+@orcamento_queries(1)
 def search_medico_crm():
     """
     Função usada para criar uma rota do tipo GET para buscar medicos pelo CRM
@@ -198,6 +269,8 @@ def search_medico_crm():
         }), 404
 
 @bp.route("/filtrar", methods=["GET"])
+@orcamento_queries(1)
+@limite_requisicoes("RATE_LIMIT_BUSCA")
 def filter_medicos():
     """
     Função usada para criar uma rota do tipo GET para filtrar medicos por especialidade
@@ -0,0 +1,21 @@
+from flask import Blueprint, Response
+from app.services import metricas_service
+from app.services.nplusone_service import orcamento_queries
+
+bp = Blueprint("metricas", __name__)
+
+@bp.route("/metrics", methods=["GET"])
+@orcamento_queries(0)
+def metrics():
+    """
+    Expose application metrics in the Prometheus text exposition format.
+
+    Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) the values of every worker are aggregated.
+
+    Returns:
+        Response: text/plain payload scrapeable by Prometheus-compatible collectors.
+        HTTP Status Codes:
+            - 200: Always.
+    """
+    payload, content_type = metricas_service.gerar_metricas()
+    return Response(payload, status=200, content_type=content_type)
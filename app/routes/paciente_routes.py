@@ -1,15 +1,34 @@
 from flask import Blueprint, jsonify, request
 from app.controllers import paciente_controller
+from app.services.busca_ids_service import ids_solicitados
+from app.services.concorrencia_service import RegistroDuplicadoError, VersaoDivergenteError, etag, versao_if_match
+from app.services.idempotencia_service import sem_idempotencia
+from app.services.limite_requisicoes_service import limite_requisicoes
+from app.services.nplusone_service import orcamento_queries
+from app.services.validacao_service import ValidacaoError
 
 bp = Blueprint("pacientes", __name__, url_prefix="/pacientes")
 
+def _pacientes_por_ids(ids):
+    pacientes, ausentes = paciente_controller.pacientes_por_ids(ids_solicitados(ids))
+    return jsonify({
+        "success": True,
+        "data": [p.to_dict() for p in pacientes],
+        "count": len(pacientes),
+        "ausentes": ausentes
+    }), 200
+
 @bp.route("/", methods=["GET"])
+@orcamento_queries(1)
 def get_pacientes():
     """
     Função usada para criar uma rota do tipo GET para listar os pacientes do sistema
     :return: retorna os pacientes do banco de dados
     """
     try:
+        if "ids" in request.args:
+            return _pacientes_por_ids(request.args["ids"])
+
         pacientes = paciente_controller.listar_pacientes()
         return jsonify({
             "success": True,
@@ -22,7 +41,25 @@ def get_pacientes():
             "message": str(e)
         }), 400
 
+@bp.route("/lookup", methods=["POST"])
+@orcamento_queries(1)
+@sem_idempotencia
+def lookup_pacientes():
+    """
+    Função usada para criar uma rota do tipo POST para buscar vários pacientes pelos ids (listas longas demais para ?ids=)
+    :return: retorna os pacientes na ordem pedida e os ids não encontrados
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        return _pacientes_por_ids(data.get("ids"))
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 400
+
 @bp.route("/<int:id>", methods=["GET"])
+@orcamento_queries(1)
 def get_paciente(id):
     """
     Função usada para criar uma rota do tipo GET para detalhar um paciente do sistema
@@ -34,6 +71,67 @@ def get_paciente(id):
         return jsonify({
             "success": True,
             "data": paciente.to_dict()
+        }), 200, etag(paciente)
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 404
+
+@bp.route("/<int:id>/prontuario", methods=["GET"])
+@orcamento_queries(3)
+def get_prontuario(id):
+    """
+    Função usada para criar uma rota do tipo GET para o prontuário do paciente
+    :param id: identificador do paciente
+    :return: retorna o paciente com suas consultas e exames, mais recentes primeiro
+    """
+    try:
+        paciente, consultas, exames = paciente_controller.prontuario_paciente(id)
+        return jsonify({
+            "success": True,
+            "data": {
+                **paciente.to_dict(),
+                "consultas": [c.to_dict() for c in consultas],
+                "exames": [e.to_dict() for e in exames]
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 404
+
+@bp.route("/<int:id>/duplicatas", methods=["GET"])
+@orcamento_queries(2)
+def get_duplicatas(id):
+    """
+    Função usada para criar uma rota do tipo GET para listar os prováveis cadastros duplicados de um paciente
+    :param id: identificador do paciente
+    :return: retorna os pacientes candidatos com a pontuação (0 a 1) e a similaridade de cada campo
+    """
+    limiar = request.args.get("limiar")
+    if limiar is not None:
+        try:
+            limiar = float(limiar)
+        except ValueError:
+            limiar = -1.0
+        if not 0 <= limiar <= 1:
+            return jsonify({
+                "success": False,
+                "message": "Parâmetro 'limiar' deve ser um número entre 0 e 1"
+            }), 400
+
+    try:
+        duplicatas = paciente_controller.duplicatas_paciente(id, limiar)
+        return jsonify({
+            "success": True,
+            "data": [{
+                "paciente": paciente.to_dict(),
+                "pontuacao": pontuacao,
+                "similaridades": similaridades
+            } for paciente, pontuacao, similaridades in duplicatas],
+            "count": len(duplicatas)
         }), 200
     except Exception as e:
         return jsonify({
@@ -42,6 +140,7 @@ def get_paciente(id):
         }), 404
 
 @bp.route("/", methods=["POST"])
+@orcamento_queries(1)
 def post_paciente():
     """
     Função usada para criar uma rota do tipo PUT para atualizar os pacientes do sistema
@@ -63,6 +162,17 @@ def post_paciente():
             "data": paciente.to_dict()
         }), 201
 
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "erros": e.erros
+        }), 422
+    except RegistroDuplicadoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 409
     except Exception as e:
         return jsonify({
             "success": False,
@@ -70,6 +180,7 @@ def post_paciente():
         }), 400
 
 @bp.route("/<int:id>", methods=["PUT"])
+@orcamento_queries(2)
 def put_paciente(id):
     """
     Função usada para criar uma rota do tipo PUT para atualizar os pacientes do sistema
@@ -85,13 +196,29 @@ def put_paciente(id):
                 "message": "Dados não fornecidos"
             }), 400
 
-        paciente = paciente_controller.atualizar_paciente(id, data)
+        paciente = paciente_controller.atualizar_paciente(id, data, versao_if_match())
         return jsonify({
             "success": True,
             "message": "Paciente atualizado com sucesso",
             "data": paciente.to_dict()
-        }), 200
+        }), 200, etag(paciente)
 
+    except VersaoDivergenteError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 412
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "erros": e.erros
+        }), 422
+    except RegistroDuplicadoError as e:
+        return jsonify({
+            "success": False,
+            "message": str(e)
+        }), 409
     except Exception as e:
         return jsonify({
             "success": False,
@@ -99,6 +226,7 @@ def put_paciente(id):
         }), 400
 
 @bp.route("/<int:id>", methods=["DELETE"])
+@orcamento_queries(4)
 def delete_paciente(id):
     """
     Função usada para criar uma rota do tipo DELETE para remover os pacientes do sistema
@@ -119,6 +247,8 @@ def delete_paciente(id):
         }), 400
 
 @bp.route("/buscar", methods=["GET"])
+@orcamento_queries(1)
+@limite_requisicoes("RATE_LIMIT_BUSCA")
 def search_paciente():
     """
     Função usada para criar uma rota do tipo GET para buscar pacientes pelo nome
@@ -146,6 +276,7 @@ def search_paciente():
 
 
 @bp.route("/buscar/cpf", methods=["GET"])
+@orcamento_queries(1)
 def search_paciente_cpf():
     """
     Função usada para criar uma rota do tipo GET para buscar pacientes pelo CPF
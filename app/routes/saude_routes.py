@@ -0,0 +1,41 @@
+from flask import Blueprint, current_app, jsonify
+from app.services import saude_service
+from app.services.nplusone_service import orcamento_queries
+
+bp = Blueprint("saude", __name__)
+
+@bp.route("/healthz", methods=["GET"])
+@orcamento_queries(0)
+def healthz():
+    """
+    Liveness probe: the process is up and serving requests. Never touches the database.
+
+    Returns:
+        Response: A JSON response containing:
+            - status (str): "ok".
+        HTTP Status Codes:
+            - 200: Always.
+    """
+    return jsonify({"status": "ok"}), 200
+
+@bp.route("/readyz", methods=["GET"])
+@orcamento_queries(0)
+def readyz():
+    """
+    Readiness probe: the database answers a pooled checkout within READINESS_TIMEOUT_SECONDS and
+    the applied migration matches the migrations directory. Results are cached for
+    READINESS_CACHE_SECONDS per worker.
+
+    Returns:
+        Response: A JSON response containing:
+            - status (str): "ok" or "indisponivel".
+            - verificacoes (dict): Result of each check (banco, migracoes).
+        HTTP Status Codes:
+            - 200: If the application is ready to receive traffic.
+            - 503: If the database is unreachable, slow or behind on migrations.
+    """
+    pronto, verificacoes = saude_service.prontidao(current_app._get_current_object())
+    return jsonify({
+        "status": "ok" if pronto else "indisponivel",
+        "verificacoes": verificacoes
+    }), 200 if pronto else 503
@@ -1,31 +1,65 @@
 from flask import Blueprint, jsonify, request
 from app.models.user import User
 from app.controllers import user_controller
+from app.services.busca_ids_service import IdsInvalidosError, ids_solicitados
+from app.services.concorrencia_service import RegistroDuplicadoError, VersaoDivergenteError, etag, versao_if_match
+from app.services.idempotencia_service import sem_idempotencia
+from app.services.nplusone_service import orcamento_queries
+from app.services.validacao_service import ValidacaoError
 
 bp = Blueprint("users", __name__, url_prefix="/users")
 
 
+def _users_por_ids(ids):
+    users, ausentes = user_controller.usuarios_por_ids(ids_solicitados(ids))
+    return jsonify({
+        "success": True,
+        "data": [u.to_dict() for u in users],
+        "count": len(users),
+        "ausentes": ausentes
+    }), 200
+
 @bp.route("/", methods=["GET"])
+@orcamento_queries(1)
 def get_users():
     try:
+        if "ids" in request.args:
+            return _users_por_ids(request.args["ids"])
+
         users = user_controller.listar_usuarios()
         return jsonify({
             "success": True,
             "data": [u.to_dict() for u in users],
             "count": len(users)
         }), 200
+    except IdsInvalidosError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/lookup", methods=["POST"])
+@orcamento_queries(1)
+@sem_idempotencia
+def lookup_users():
+    try:
+        data = request.get_json(silent=True) or {}
+        return _users_por_ids(data.get("ids"))
+    except IdsInvalidosError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @bp.route("/<int:id>", methods=["GET"])
+@orcamento_queries(1)
 def get_user(id):
     try:
         user = user_controller.usuario_id(id)
         return jsonify({
             "success": True,
             "data": user.to_dict()
-        }), 200
+        }), 200, etag(user)
     except Exception as e:
         if "não encontrado" in str(e).lower() or "not found" in str(e).lower():
             return jsonify({
@@ -37,6 +71,7 @@ def get_user(id):
             "error": str(e)
         }), 500
 @bp.route("/", methods=["POST"])
+@orcamento_queries(1)
 def post_user():
     try:
         data = request.get_json()
@@ -46,20 +81,20 @@ def post_user():
                 "error": "No data provided"
             }), 400
 
-        # Validação básica
-        required_fields = ['username', 'email', 'password']
-        for field in required_fields:
-            if field not in data or not data[field]:
-                return jsonify({
-                    "success": False,
-                    "error": f"Field '{field}' is required"
-                }), 400
-
         user = user_controller.criar_usuario(data)
         return jsonify({
             "success": True,
             "data": user.to_dict()
         }), 201
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "erros": e.erros}), 422
+    except RegistroDuplicadoError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)}), 409
     except Exception as e:
         return jsonify({
             "success": False,
@@ -68,6 +103,7 @@ def post_user():
 
 
 @bp.route("/<int:id>", methods=["PUT"])
+@orcamento_queries(2)
 def put_user(id):
     try:
         data = request.get_json()
@@ -76,17 +112,31 @@ def put_user(id):
                 "success": False,
                 "error": "No data provided"}), 400
 
-        user = user_controller.atualizar_usuario(id, data)
+        user = user_controller.atualizar_usuario(id, data, versao_if_match())
         return jsonify({
             "success": True,
             "data": user.to_dict()
-        }), 200
+        }), 200, etag(user)
+    except ValidacaoError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "erros": e.erros}), 422
+    except VersaoDivergenteError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)}), 412
+    except RegistroDuplicadoError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)}), 409
     except Exception as e:
         return jsonify({
             "success": False,
             "error": str(e)}), 500
 
 @bp.route("/<int:id>", methods=["DELETE"])
+@orcamento_queries(2)
 def delete_user(id):
     try:
         user_controller.deletar_usuario(id)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.alteracao import Alteracao, SequenciaAlteracoes
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+
+# Modelos publicados no feed de alterações -> nome do recurso no feed
+RECURSOS_FEED = {
+    Paciente: "pacientes",
+    Medico: "medicos",
+}
+MODELOS_FEED = {recurso: modelo for modelo, recurso in RECURSOS_FEED.items()}
+
+# INSERT ... ON CONFLICT DO NOTHING de cada dialeto suportado
+_INSERT_SE_AUSENTE = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+_alteracoes = Alteracao.__table__
+_sequencia = SequenciaAlteracoes.__table__
+
+
+class CursorExpiradoError(Exception):
+    """
+    Raised when a cursor is older than the last tombstone compaction: the client may have missed deletions.
+    """
+
+
+def reservar_sequencias(conexao, quantidade):
+    """
+    function to take the next sequences of the change feed
+    The UPDATE locks the counter row until the transaction ends, so a higher sequence is never
+    committed before a lower one and a cursor never skips a change that commits later.
+    The price is throughput: writes of pacientes and médicos are serialized on that row from their
+    first flush to their commit (on SQLite every write already is). A long transaction, such as a
+    /batch with many operations, holds every other paciente/médico writer for its whole duration.
+    :param conexao: connection of the writing transaction
+    :param quantidade: how many sequences to take
+    :return: first sequence taken
+    """
+    stmt = (update(_sequencia).where(_sequencia.c.id == 1)
+            .values(valor=_sequencia.c.valor + quantidade).returning(_sequencia.c.valor)
+            .execution_options(fora_do_orcamento=True))
+    ultimo = conexao.execute(stmt).scalar()
+    if ultimo is None:
+        # Banco criado sem o after_create de sequencia_alteracoes (ex.: tabela criada à mão). Dois
+        # escritores podem chegar aqui juntos: o INSERT de quem perde não faz nada e ambos repetem o UPDATE
+        inserir = _INSERT_SE_AUSENTE.get(conexao.dialect.name)
+        criar = inserir(_sequencia).on_conflict_do_nothing() if inserir else insert(_sequencia)
+        conexao.execute(criar.values(id=1, valor=0, minimo=0).execution_options(fora_do_orcamento=True))
+        ultimo = conexao.execute(stmt).scalar()
+    return ultimo - quantidade + 1
+
+
+def registrar_alteracoes(conexao, alteracoes):
+    """
+    function to publish changes in the feed, replacing the previous entry of each record
+    :param conexao: connection of the writing transaction
+    :param alteracoes: dictionary (recurso, registro_id) -> operacao (upsert or delete)
+    :return: None
+    """
+    inicio = reservar_sequencias(conexao, len(alteracoes))
+    agora = datetime.now(timezone.utc)
+    chaves = list(alteracoes)
+    conexao.execute(
+        delete(_alteracoes)
+        .where(tuple_(_alteracoes.c.recurso, _alteracoes.c.registro_id).in_(chaves))
+        .execution_options(fora_do_orcamento=True)
+    )
+    conexao.execute(
+        insert(_alteracoes).execution_options(fora_do_orcamento=True),
+        [{"seq": inicio + indice, "recurso": recurso, "registro_id": registro_id,
+          "operacao": alteracoes[recurso, registro_id], "alterado_em": agora}
+         for indice, (recurso, registro_id) in enumerate(chaves)],
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _publicar_alteracoes(session, flush_context):
+    """
+    SQLAlchemy hook: publishes the pacientes/médicos written by the flush in the change feed, in the
+    same transaction.
+    """
+    if not has_app_context() or not current_app.config.get("CHANGES_ENABLED", True):
+        return
+    alteracoes = {}
+    alterados = [objeto for objeto in session.dirty if session.is_modified(objeto)]
+    for operacao, objetos in (("upsert", session.new), ("upsert", alterados), ("delete", session.deleted)):
+        for objeto in objetos:
+            recurso = RECURSOS_FEED.get(type(objeto))
+            if recurso is not None:
+                alteracoes[recurso, objeto.id] = operacao
+    if alteracoes:
+        registrar_alteracoes(session.connection(), alteracoes)
+
+
+def compactar_tombstones(retencao_dias):
+    """
+    function to remove tombstones older than the retention period
+    Cursors older than the newest removed tombstone are then rejected (CursorExpiradoError): those
+    clients must sync again from since=0.
+    :param retencao_dias: days a deletion stays in the feed
+    :return: number of tombstones removed
+    """
+    limite = datetime.now(timezone.utc) - timedelta(days=retencao_dias)
+    with db.engine.begin() as conexao:
+        velhos = (_alteracoes.c.operacao == "delete", _alteracoes.c.alterado_em < limite)
+        maior = conexao.execute(select(func.max(_alteracoes.c.seq)).where(*velhos)).scalar()
+        if maior is None:
+            return 0
+        removidos = conexao.execute(delete(_alteracoes).where(*velhos, _alteracoes.c.seq <= maior)).rowcount
+        conexao.execute(update(_sequencia).where(_sequencia.c.id == 1, _sequencia.c.minimo < maior)
+                        .values(minimo=maior))
+    return removidos
+
+
+def popular_alteracoes(tamanho_lote=1000):
+    """
+    function to publish in the feed the records that existed before it (one upsert per record)
+    :param tamanho_lote: records per transaction
+    :return: number of records published
+    """
+    total = 0
+    for modelo, recurso in RECURSOS_FEED.items():
+        tabela = modelo.__table__
+        while True:
+            with db.engine.begin() as conexao:
+                publicados = select(_alteracoes.c.registro_id).where(_alteracoes.c.recurso == recurso)
+                ids = conexao.execute(
+                    select(tabela.c.id).where(tabela.c.id.not_in(publicados)).order_by(tabela.c.id).limit(tamanho_lote)
+                ).scalars().all()
+                if not ids:
+                    break
+                registrar_alteracoes(conexao, {(recurso, registro_id): "upsert" for registro_id in ids})
+                total += len(ids)
+    return total
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy.engine import make_url
+
+# Driver assíncrono equivalente a cada dialeto suportado
+DRIVERS_ASSINCRONOS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def url_assincrona(url):
+    """
+    function to translate the sync database URL into its asyncio driver (aiosqlite / asyncpg)
+    :param url: SQLAlchemy URL (string)
+    :return: URL string with the async driver
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    convertida = make_url(url)
+    dialeto = convertida.get_backend_name()
+    if dialeto not in DRIVERS_ASSINCRONOS:
+        raise Exception(f"Banco sem driver assíncrono configurado: {dialeto}")
+    return convertida.set(drivername=DRIVERS_ASSINCRONOS[dialeto]).render_as_string(hide_password=False)
+
+
+def criar_engine_assincrona(app):
+    """
+    function to create the AsyncEngine and session factory used by the async read path
+    Must be called inside the event loop that will use it: asyncio connections are bound to their loop.
+    :param app: flask application (configuration source)
+    :return: tuple (AsyncEngine, async_sessionmaker)
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.extensions import db
+
+    url = app.config.get("ASYNC_DATABASE_URL")
+    if not url:
+        # A URL efetiva do engine síncrono, não a configurada: o Flask-SQLAlchemy põe caminhos relativos
+        # do SQLite dentro de instance/, e os dois modos precisam ler o mesmo arquivo
+        with app.app_context():
+            url = url_assincrona(db.engine.url.render_as_string(hide_password=False))
+    engine = create_async_engine(
+        url,
+        pool_size=app.config["ASYNC_DB_POOL_SIZE"],
+        max_overflow=app.config["ASYNC_DB_MAX_OVERFLOW"],
+        pool_pre_ping=True,
+    )
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_jwt_extended import decode_token
+from sqlalchemy import delete, event, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.auditoria import OutboxAuditoria, RegistroAuditoria
+from app.models.consulta import Consulta
+from app.models.exame import Exame
+from app.models.medico import Medico
+from app.models.paciente import Paciente
+
+logger = logging.getLogger("curasys.auditoria")
+
+# Modelos auditados -> nome do recurso nos registros de auditoria
+RECURSOS_AUDITADOS = {
+    Paciente: "pacientes",
+    Medico: "medicos",
+    Consulta: "consultas",
+    Exame: "exames",
+}
+
+_outbox = OutboxAuditoria.__table__
+_auditoria = RegistroAuditoria.__table__
+
+
+class OutboxConcorrenteError(Exception):
+    """
+    Raised when another process moved part of the outbox rows of a batch first; the batch is rolled back.
+    """
+
+
+def valor_json(valor):
+    """
+    function to convert a column value into a JSON friendly value
+    :param valor: raw column value
+    :return: serializable value
+    """
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def usuario_atual():
+    """
+    function to identify who is changing data: the JWT identity of the request
+    :return: identity string, or None (anonymous request, CLI, background job)
+    """
+    if not has_request_context():
+        return None
+    if "_usuario_auditoria" not in g:
+        g._usuario_auditoria = None
+        authorization = request.headers.get("Authorization", "")
+        if authorization.startswith("Bearer "):
+            try:
+                g._usuario_auditoria = str(decode_token(authorization[7:])["sub"])
+            except Exception:
+                pass
+    return g._usuario_auditoria
+
+
+def alteracoes(objeto, operacao):
+    """
+    function to read the old and new column values of an object being flushed
+    :param objeto: model instance
+    :param operacao: insert, update or delete
+    :return: dictionary campo -> {"antes", "depois"} (only changed columns on update)
+    """
+    estado = inspect(objeto)
+    resultado = {}
+    for atributo in estado.mapper.column_attrs:
+        if atributo.columns[0].info.get("auditar") is False:
+            continue
+        if operacao == "update":
+            historico = estado.attrs[atributo.key].history
+            if not historico.has_changes():
+                continue
+            antes = historico.deleted[0] if historico.deleted else None
+            depois = historico.added[0] if historico.added else None
+        elif operacao == "insert":
+            antes, depois = None, estado.dict.get(atributo.key)
+        else:
+            antes, depois = estado.dict.get(atributo.key), None
+        resultado[atributo.key] = {"antes": valor_json(antes), "depois": valor_json(depois)}
+    return resultado
+
+
+@event.listens_for(Session, "after_flush")
+def _capturar_alteracoes(session, flush_context):
+    """
+    SQLAlchemy hook: writes the audit records of the flush to the outbox, in the same transaction
+    (a single INSERT per flush, whatever the number of changed rows).
+    """
+    if not has_app_context() or "auditoria" not in current_app.extensions:
+        return
+    agora = datetime.now(timezone.utc)
+    base = {
+        "usuario": usuario_atual(),
+        "ip": request.remote_addr if has_request_context() else None,
+        "alterado_em": agora.isoformat(),
+    }
+    registros = []
+    for operacao, objetos in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for objeto in objetos:
+            recurso = RECURSOS_AUDITADOS.get(type(objeto))
+            if recurso is None:
+                continue
+            mudancas = alteracoes(objeto, operacao)
+            if mudancas:
+                registros.append({"recurso": recurso, "registro_id": objeto.id, "operacao": operacao,
+                                  "alteracoes": mudancas, **base})
+    if not registros:
+        return
+
+    stmt = insert(_outbox).values(registros=registros, criado_em=agora).execution_options(fora_do_orcamento=True)
+    outbox_id = session.connection().execute(stmt).inserted_primary_key[0]
+    session.info.setdefault("auditoria_pendente", []).append((outbox_id, len(registros)))
+
+
+@event.listens_for(Session, "after_commit")
+def _enfileirar_auditoria(session):
+    """
+    SQLAlchemy hook: hands the committed audit records to the background flush.
+    """
+    pendentes = session.info.pop("auditoria_pendente", None)
+    if pendentes and has_app_context() and "auditoria" in current_app.extensions:
+        current_app.extensions["auditoria"].enfileirar(pendentes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_auditoria(session):
+    """
+    SQLAlchemy hook: the outbox rows of a rolled back transaction are gone with it.
+    """
+    session.info.pop("auditoria_pendente", None)
+
+
+def _linha_auditoria(registro):
+    """
+    function to convert an outbox record into an auditoria row
+    :param registro: record as stored in the outbox
+    :return: dictionary of auditoria columns
+    """
+    return {**registro, "alterado_em": datetime.fromisoformat(registro["alterado_em"])}
+
+
+def _mover(conexao, registros_por_id):
+    """
+    function to delete outbox rows and insert their records into auditoria (one DELETE, one INSERT)
+    :param conexao: connection inside a transaction
+    :param registros_por_id: dictionary outbox id -> list of records
+    :return: number of audit records written
+    """
+    removidas = conexao.execute(delete(_outbox).where(_outbox.c.id.in_(list(registros_por_id)))).rowcount
+    if removidas != len(registros_por_id):
+        raise OutboxConcorrenteError(f"{len(registros_por_id) - removidas} linhas do outbox já movidas")
+    linhas = [_linha_auditoria(registro) for registros in registros_por_id.values() for registro in registros]
+    conexao.execute(insert(_auditoria), linhas)
+    return len(linhas)
+
+
+def gravar_lote(outbox_ids):
+    """
+    function to move a batch of committed outbox rows to auditoria
+    The records are read back from the outbox rather than taken from memory: a rolled back id may be
+    reused by a later insert (SQLite), and rows moved by another process or not visible yet (the outer
+    transaction of a POST /batch still open) are simply skipped and left for drenar_outbox.
+    :param outbox_ids: outbox ids committed by this process
+    :return: number of audit records written
+    """
+    try:
+        with db.engine.begin() as conexao:
+            linhas = conexao.execute(
+                select(_outbox.c.id, _outbox.c.registros).where(_outbox.c.id.in_(outbox_ids))).all()
+            if not linhas:
+                return 0
+            return _mover(conexao, dict(linhas))
+    except OutboxConcorrenteError:
+        return 0
+
+
+def drenar_outbox(carencia_segundos, tamanho_lote):
+    """
+    function to move outbox rows older than the grace period to auditoria, in batches
+    Covers records whose process died before the background flush (the outbox was committed with the
+    change, so nothing is lost).
+    :param carencia_segundos: only rows older than this are moved (0 moves everything)
+    :param tamanho_lote: outbox rows per transaction
+    :return: number of audit records written
+    """
+    total = 0
+    limite = datetime.now(timezone.utc) - timedelta(seconds=carencia_segundos)
+    while True:
+        with db.engine.begin() as conexao:
+            linhas = conexao.execute(
+                select(_outbox.c.id, _outbox.c.registros)
+                .where(_outbox.c.criado_em <= limite)
+                .order_by(_outbox.c.id)
+                .limit(tamanho_lote)
+            ).all()
+            if not linhas:
+                return total
+            total += _mover(conexao, dict(linhas))
+
+
+class FilaAuditoria:
+    """
+    Per-process buffer of committed outbox rows. A background thread moves their records to auditoria
+    in batches of AUDIT_BATCH_SIZE records (or every AUDIT_FLUSH_INTERVAL_SECONDS) and drains
+    outbox rows older than AUDIT_OUTBOX_GRACE_SECONDS.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._fila = None
+        self._pid = None
+
+    def enfileirar(self, pendentes):
+        """
+        function to buffer committed outbox rows for the background flush
+        :param pendentes: list of (outbox id, number of records)
+        :return: None
+        """
+        self._garantir_thread()
+        for item in pendentes:
+            self._fila.put(item)
+
+    def _garantir_thread(self):
+        # Uma thread por processo, iniciada sob demanda: threads não atravessam o fork dos workers
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._fila = queue.Queue()
+                threading.Thread(target=self._executar, name="auditoria", daemon=True).start()
+                atexit.register(self.descarregar)
+                self._pid = os.getpid()
+
+    def _coletar(self):
+        """
+        function to wait for the next batch of the buffer
+        :return: list of (outbox id, number of records), possibly empty
+        """
+        intervalo = self.app.config["AUDIT_FLUSH_INTERVAL_SECONDS"]
+        tamanho = self.app.config["AUDIT_BATCH_SIZE"]
+        try:
+            lote = [self._fila.get(timeout=intervalo)]
+        except queue.Empty:
+            return []
+        quantidade = lote[0][1]
+        prazo = time.monotonic() + intervalo
+        while quantidade < tamanho:
+            try:
+                item = self._fila.get(timeout=max(0.0, prazo - time.monotonic()))
+            except queue.Empty:
+                break
+            lote.append(item)
+            quantidade += item[1]
+        return lote
+
+    def _executar(self):
+        proxima_drenagem = time.monotonic()
+        while True:
+            lote = self._coletar()
+            try:
+                with self.app.app_context():
+                    if lote:
+                        gravar_lote([outbox_id for outbox_id, _ in lote])
+                    if time.monotonic() >= proxima_drenagem:
+                        carencia = self.app.config["AUDIT_OUTBOX_GRACE_SECONDS"]
+                        drenar_outbox(carencia, self.app.config["AUDIT_BATCH_SIZE"])
+                        proxima_drenagem = time.monotonic() + carencia
+            except Exception as e:
+                # Os registros continuam no outbox: a próxima drenagem tenta de novo
+                logger.warning("Falha ao gravar auditoria em lote: %s", e)
+
+    def descarregar(self):
+        """
+        function to flush whatever is still buffered (process exit)
+        :return: number of audit records written
+        """
+        pendentes = []
+        while True:
+            try:
+                pendentes.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        if not pendentes:
+            return 0
+        try:
+            with self.app.app_context():
+                return gravar_lote([outbox_id for outbox_id, _ in pendentes])
+        except Exception as e:
+            logger.warning("Falha ao gravar auditoria na saída: %s", e)
+            return 0
+
+
+def init_auditoria(app):
+    """
+    function to enable the audit log of pacientes, médicos, consultas and exames
+    :param app: flask application
+    :return: None
+    """
+    if not app.config.get("AUDIT_ENABLED", True):
+        return
+    app.extensions["auditoria"] = FilaAuditoria(app)
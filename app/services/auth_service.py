@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+
+# Papéis aceitos em User.role; cadastros pela API (POST /users/) recebem "recepcao", o default da coluna
+PAPEIS = ("admin", "recepcao")
+
+
+def usuario_admin():
+    """
+    function to check if the current request carries a valid admin JWT (never raises)
+    :return: True if the token is valid and has role "admin"
+    """
+    try:
+        if not verify_jwt_in_request(optional=True):
+            return False
+    except Exception:
+        return False
+    return get_jwt().get("role") == "admin"
+
+
+def admin_obrigatorio(view):
+    """
+    decorator to restrict a route to admin JWTs (401 without token, 403 for other roles)
+    :param view: view function
+    :return: decorated view
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            verify_jwt_in_request()
+        except Exception as e:
+            return jsonify({
+                "success": False,
+                "error": f"Autenticação necessária: {str(e)}"
+            }), 401
+        if get_jwt().get("role") != "admin":
+            return jsonify({
+                "success": False,
+                "error": "Acesso restrito a administradores"
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from flask import current_app
+
+from app.services.nplusone_service import ajustar_orcamento
+
+
+class IdsInvalidosError(Exception):
+    pass
+
+
+def ids_solicitados(valor):
+    """
+    function to parse the requested ids (?ids=1,2,3 or a JSON list), keeping the order of first occurrence
+    :param valor: comma separated string or list
+    :return: list of unique int ids
+    """
+    if isinstance(valor, str):
+        valor = [parte.strip() for parte in valor.split(",") if parte.strip()]
+    if not isinstance(valor, list) or not valor:
+        raise IdsInvalidosError('Informe os ids: ?ids=1,2,3 ou {"ids": [1, 2, 3]}')
+    try:
+        ids = list(dict.fromkeys(int(item) for item in valor))
+    except (TypeError, ValueError):
+        raise IdsInvalidosError("ids devem ser números inteiros")
+
+    maximo = current_app.config["MULTIGET_MAX_IDS"]
+    if len(ids) > maximo:
+        raise IdsInvalidosError(f"Máximo de {maximo} ids por requisição")
+    return ids
+
+
+def buscar_por_ids(modelo, ids):
+    """
+    function to load several rows by primary key with IN queries of at most MULTIGET_CHUNK_SIZE ids
+    The ids are sorted before chunking, so each query reads a contiguous range of the primary key
+    index; the result goes back to the requested order afterwards.
+    :param modelo: model class with an id primary key
+    :param ids: list of unique ids, in the order the client asked for them
+    :return: (rows in the requested order, ids that do not exist)
+    """
+    tamanho = current_app.config["MULTIGET_CHUNK_SIZE"]
+    ordenados = sorted(ids)
+    lotes = [ordenados[inicio:inicio + tamanho] for inicio in range(0, len(ordenados), tamanho)]
+    # Um SELECT por lote: o mesmo formato de query se repete por construção, não é um N+1
+    ajustar_orcamento(len(lotes), len(lotes) + current_app.config.get("NPLUSONE_THRESHOLD", 3))
+
+    por_id = {}
+    for lote in lotes:
+        for registro in modelo.query.filter(modelo.id.in_(lote)):
+            por_id[registro.id] = registro
+    return [por_id[i] for i in ids if i in por_id], [i for i in ids if i not in por_id]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import re
+
+from flask import request
+
+# Coluna da restrição única violada, na mensagem do SQLite, do PostgreSQL ou do MySQL
+_COLUNA_DUPLICADA = re.compile(r"UNIQUE constraint failed: \w+\.(\w+)|Key \((\w+)\)=|for key '(?:\w+\.)?(\w+)'")
+
+
+class VersaoDivergenteError(Exception):
+    pass
+
+
+class RegistroDuplicadoError(Exception):
+    pass
+
+
+def etag(objeto):
+    """
+    function to build the ETag header of a versioned row (the value is its version_id_col)
+    :param objeto: model instance with a versao column
+    :return: headers dictionary, to be returned as the third item of the view tuple
+    """
+    return {"ETag": f'"{objeto.versao}"'}
+
+
+def versao_if_match():
+    """
+    function to read the version the client expects from the If-Match header
+    Absent or "*" means no precondition (last write wins, as before). An entity tag that is not a
+    version number can never match, so it is reported as a divergent version.
+    :return: set of acceptable versions, or None
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    versoes = set()
+    for tag in if_match.as_set():
+        try:
+            versoes.add(int(tag))
+        except ValueError:
+            continue
+    if not versoes:
+        raise VersaoDivergenteError("If-Match inválido: use o ETag retornado pelo recurso")
+    return versoes
+
+
+def verificar_versao(objeto, versao):
+    """
+    function to compare the loaded row with the version expected by the client
+    The loaded version is the one SQLAlchemy puts in the UPDATE's WHERE clause (version_id_col), so a
+    concurrent write between this check and the commit still fails with StaleDataError.
+    :param objeto: model instance with a versao column
+    :param versao: set of acceptable versions, or None for no precondition
+    :return: None
+    """
+    if versao is not None and objeto.versao not in versao:
+        raise VersaoDivergenteError(f"Registro alterado por outra requisição (versão atual {objeto.versao})")
+
+
+def registro_duplicado(erro, mensagens):
+    """
+    function to translate a unique constraint violation into RegistroDuplicadoError
+    Writes do not SELECT before inserting to check uniqueness: the unique index is the only check, it
+    costs no extra round trip and two concurrent requests cannot both pass it.
+    :param erro: IntegrityError raised by the flush
+    :param mensagens: dictionary column -> message for the client
+    :return: RegistroDuplicadoError, or None if the violation is not on one of those columns
+    """
+    encontrado = _COLUNA_DUPLICADA.search(str(erro.orig))
+    coluna = next((grupo for grupo in encontrado.groups() if grupo), None) if encontrado else None
+    if coluna not in mensagens:
+        return None
+    return RegistroDuplicadoError(mensagens[coluna])
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+import re
+import unicodedata
+from collections import namedtuple
+from difflib import SequenceMatcher
+from functools import lru_cache
+from itertools import groupby
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, case, event, or_, select, update
+
+from app.extensions import db
+from app.models.paciente import Paciente
+
+_pacientes = Paciente.__table__
+
+# Blocos: nome do bloco -> colunas que precisam coincidir. Dois pacientes só são comparados quando
+# dividem ao menos um bloco; cada bloco tem índice próprio (ver app/models/paciente.py)
+BLOCOS = {
+    "primeiro_nome_nascimento": ("fonetica_primeiro", "data_nascimento"),
+    "sobrenome_nascimento": ("fonetica_ultimo", "data_nascimento"),
+    "nome": ("fonetica_nome",),
+    "telefone": ("telefone_normalizado",),
+}
+
+# Peso de cada campo na pontuação; telefone e email só contam quando os dois pacientes têm o campo
+PESOS = {"nome": 0.4, "data_nascimento": 0.3, "cpf": 0.2, "telefone": 0.1, "email": 0.1}
+
+_PARTICULAS = frozenset({"D", "DA", "DAS", "DE", "DI", "DO", "DOS", "DU", "E"})
+_AGNOMES = frozenset({"FILHO", "FILHA", "JUNIOR", "NETO", "NETA", "SOBRINHO", "SEGUNDO"})
+_NAO_LETRAS = re.compile(r"[^A-Z ]+")
+_NAO_DIGITOS = re.compile(r"\D+")
+
+# Regras fonéticas do português, aplicadas em ordem sobre a palavra sem acentos e em maiúsculas.
+# Aproximam grafias que soam igual: Thiago/Tiago, Luiz/Luís, Souza/Sousa, Raphael/Rafael, Kátia/Cátia
+_REGRAS_FONETICAS = tuple((re.compile(padrao), troca) for padrao, troca in (
+    (r"PH", "F"),
+    (r"TH", "T"),
+    (r"LH", "LI"),
+    (r"NH", "NI"),
+    (r"[CS]H", "X"),
+    (r"SC(?=[EIY])", "S"),
+    (r"[CP](?=T)", ""),
+    (r"QU|Q", "K"),
+    (r"GU(?=[EIY])", "G"),
+    (r"C(?=[EIY])", "S"),
+    (r"C", "K"),
+    (r"G(?=[EIY])", "J"),
+    (r"Y", "I"),
+    (r"W", "V"),
+    (r"Z", "S"),
+    (r"H", ""),
+    (r"M(?=[^AEIOU]|$)", "N"),
+    (r"L(?=[^AEIOU]|$)", "U"),
+    (r"(.)\1+", r"\1"),
+))
+
+# Paciente reduzido ao que a comparação usa, normalizado uma única vez
+Ficha = namedtuple("Ficha", "id nome fonetica data_nascimento cpf telefone email")
+
+
+def normalizar_nome(nome):
+    """
+    function to put a name in comparable form: uppercase, no accents, only letters, no particles
+    :param nome: name as typed
+    :return: list of words
+    """
+    texto = unicodedata.normalize("NFKD", (nome or "").upper().replace("Ç", "S"))
+    texto = _NAO_LETRAS.sub(" ", texto.encode("ascii", "ignore").decode("ascii"))
+    return [palavra for palavra in texto.split() if palavra not in _PARTICULAS]
+
+
+@lru_cache(maxsize=65536)
+def fonetica(palavra):
+    """
+    function to compute the phonetic key of one normalized word (names repeat a lot, so it is memoized)
+    :param palavra: uppercase word without accents
+    :return: phonetic key
+    """
+    for regra, troca in _REGRAS_FONETICAS:
+        palavra = regra.sub(troca, palavra)
+    return palavra
+
+
+def normalizar_telefone(telefone):
+    """
+    function to reduce a phone to its last 8 digits (no country/area code, no mobile 9 prefix)
+    :param telefone: phone as typed
+    :return: 8 digits or None when the phone is too short
+    """
+    digitos = _NAO_DIGITOS.sub("", telefone or "")
+    return digitos[-8:] if len(digitos) >= 8 else None
+
+
+def chaves_paciente(nome, telefone):
+    """
+    function to compute the blocking keys stored in pacientes
+    :param nome: patient name
+    :param telefone: patient phone
+    :return: dictionary column -> value
+    """
+    palavras = [fonetica(palavra) for palavra in normalizar_nome(nome)]
+    sobrenomes = [p for original, p in zip(normalizar_nome(nome), palavras) if original not in _AGNOMES]
+    return {
+        "fonetica_nome": " ".join(palavras)[:150] or None,
+        "fonetica_primeiro": palavras[0][:40] if palavras else None,
+        "fonetica_ultimo": sobrenomes[-1][:40] if len(sobrenomes) > 1 else None,
+        "telefone_normalizado": normalizar_telefone(telefone),
+    }
+
+
+@event.listens_for(Paciente, "before_insert")
+@event.listens_for(Paciente, "before_update")
+def _atualizar_chaves(mapper, conexao, paciente):
+    """
+    SQLAlchemy hook: keeps the blocking keys in the same INSERT/UPDATE as the patient (no extra statement).
+    """
+    for coluna, valor in chaves_paciente(paciente.nome, paciente.telefone).items():
+        if getattr(paciente, coluna) != valor:
+            setattr(paciente, coluna, valor)
+
+
+def ficha(registro):
+    """
+    function to normalize a patient (model or row) once for the comparisons
+    :param registro: object with id, nome, data_nascimento, cpf, telefone and email
+    :return: Ficha
+    """
+    palavras = normalizar_nome(registro.nome)
+    return Ficha(
+        id=registro.id,
+        nome=" ".join(palavras),
+        fonetica=" ".join(fonetica(palavra) for palavra in palavras),
+        data_nascimento=registro.data_nascimento,
+        cpf=registro.cpf,
+        telefone=normalizar_telefone(registro.telefone),
+        email=registro.email.strip().lower() if registro.email else None,
+    )
+
+
+def _similaridade_nome(a, b):
+    if a.fonetica and a.fonetica == b.fonetica:
+        return 1.0
+    return max(SequenceMatcher(None, a.nome, b.nome, autojunk=False).ratio(),
+               SequenceMatcher(None, a.fonetica, b.fonetica, autojunk=False).ratio())
+
+
+def _similaridade_data(a, b):
+    if a == b:
+        return 1.0
+    if a.year == b.year and a.day == b.month and a.month == b.day:
+        return 0.8  # dia e mês trocados
+    iguais = (a.day == b.day) + (a.month == b.month) + (a.year == b.year)
+    return 0.5 if iguais == 2 else 0.0
+
+
+def _similaridade_cpf(a, b):
+    if a == b:
+        return 1.0
+    diferencas = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+    if len(a) == len(b) and (len(diferencas) == 1 or (
+            len(diferencas) == 2 and diferencas[1] == diferencas[0] + 1
+            and a[diferencas[0]] == b[diferencas[1]] and a[diferencas[1]] == b[diferencas[0]])):
+        return 0.8  # um dígito errado ou dois vizinhos trocados
+    return 0.0
+
+
+def pontuar(a, b, limiar=0.0):
+    """
+    function to score how likely two patients are the same person
+    The name (the costly comparison) is left for last and skipped when not even an identical name
+    would bring the pair to limiar.
+    :param a: Ficha
+    :param b: Ficha
+    :param limiar: minimum score of interest
+    :return: (score between 0 and 1, dictionary campo -> similarity), or None below limiar
+    """
+    similaridades = {
+        "data_nascimento": _similaridade_data(a.data_nascimento, b.data_nascimento),
+        "cpf": _similaridade_cpf(a.cpf, b.cpf),
+    }
+    if a.telefone and b.telefone:
+        similaridades["telefone"] = float(a.telefone == b.telefone)
+    if a.email and b.email:
+        similaridades["email"] = float(a.email == b.email)
+    soma = sum(PESOS[campo] * valor for campo, valor in similaridades.items())
+    pesos = PESOS["nome"] + sum(PESOS[campo] for campo in similaridades)
+    if (soma + PESOS["nome"]) / pesos < limiar:
+        return None
+
+    similaridades["nome"] = _similaridade_nome(a, b)
+    pontuacao = (soma + PESOS["nome"] * similaridades["nome"]) / pesos
+    if pontuacao < limiar:
+        return None
+    return round(pontuacao, 3), {campo: round(valor, 2) for campo, valor in similaridades.items()}
+
+
+def duplicatas(paciente, limiar=None):
+    """
+    function to find the probable duplicates of one patient (one indexed query over its blocks)
+    Only DEDUP_MAX_CANDIDATES candidates are scored: those sharing the most blocks with the patient come
+    first, so a large block (a common phone or name) cannot push the strongest matches out of the cap.
+    :param paciente: Paciente
+    :param limiar: minimum score (default DEDUP_MIN_SCORE)
+    :return: list of (Paciente, score, similarities), best first
+    """
+    if limiar is None:
+        limiar = current_app.config["DEDUP_MIN_SCORE"]
+    valores = {**chaves_paciente(paciente.nome, paciente.telefone), "data_nascimento": paciente.data_nascimento}
+    condicoes = [and_(*(getattr(Paciente, coluna) == valores[coluna] for coluna in colunas))
+                 for colunas in BLOCOS.values() if all(valores[coluna] for coluna in colunas)]
+    if not condicoes:
+        return []
+
+    blocos_em_comum = sum(case((condicao, 1), else_=0) for condicao in condicoes)
+    candidatos = (Paciente.query
+                  .filter(Paciente.id != paciente.id, or_(*condicoes))
+                  .order_by(blocos_em_comum.desc(), Paciente.id)
+                  .limit(current_app.config["DEDUP_MAX_CANDIDATES"])
+                  .all())
+    referencia = ficha(paciente)
+    resultado = []
+    for candidato in candidatos:
+        par = pontuar(referencia, ficha(candidato), limiar)
+        if par:
+            resultado.append((candidato, *par))
+    resultado.sort(key=lambda item: (-item[1], item[0].id))
+    return resultado
+
+
+def varrer_duplicatas(limiar, tamanho_maximo_bloco, tamanho_lote=1000, estatisticas=None):
+    """
+    function to scan every block for duplicate pairs, streaming each block ordered by its index
+    Pairs are only scored inside a block, so the cost grows with the block sizes, not with n².
+    :param limiar: minimum score of a reported pair
+    :param tamanho_maximo_bloco: blocks larger than this are skipped (too common to be informative)
+    :param tamanho_lote: rows fetched per round trip
+    :param estatisticas: optional dict filled with blocos, blocos_ignorados, comparacoes and pares
+    :return: generator of dicts {paciente_id, duplicata_id, pontuacao, similaridades, bloco}
+    """
+    if estatisticas is None:
+        estatisticas = {}
+    for chave in ("blocos", "blocos_ignorados", "comparacoes", "pares"):
+        estatisticas.setdefault(chave, 0)
+
+    colunas_ficha = [_pacientes.c[c] for c in ("id", "nome", "cpf", "telefone", "email",
+                                               *dict.fromkeys(c for colunas in BLOCOS.values() for c in colunas))]
+    reportados = set()
+    for nome_bloco, colunas in BLOCOS.items():
+        chave = [_pacientes.c[coluna] for coluna in colunas]
+        consulta = (select(*colunas_ficha)
+                    .where(*(coluna.is_not(None) for coluna in chave))
+                    .order_by(*chave, _pacientes.c.id))
+        with db.engine.connect() as conexao:
+            linhas = conexao.execution_options(yield_per=tamanho_lote).execute(consulta)
+            for _, grupo in groupby(linhas, key=lambda linha: tuple(getattr(linha, c) for c in colunas)):
+                bloco = []
+                for linha in grupo:
+                    if len(bloco) > tamanho_maximo_bloco:
+                        continue
+                    bloco.append(linha)
+                if len(bloco) < 2:
+                    continue
+                if len(bloco) > tamanho_maximo_bloco:
+                    estatisticas["blocos_ignorados"] += 1
+                    continue
+                estatisticas["blocos"] += 1
+                fichas = [ficha(linha) for linha in bloco]
+                for i, a in enumerate(fichas):
+                    for b in fichas[i + 1:]:
+                        if (a.id, b.id) in reportados:
+                            continue
+                        estatisticas["comparacoes"] += 1
+                        par = pontuar(a, b, limiar)
+                        if par:
+                            reportados.add((a.id, b.id))
+                            estatisticas["pares"] += 1
+                            yield {"paciente_id": a.id, "duplicata_id": b.id, "pontuacao": par[0],
+                                   "similaridades": par[1], "bloco": nome_bloco}
+
+
+def preencher_chaves(tamanho_lote=1000, recalcular=False):
+    """
+    function to fill the blocking keys of patients written without the ORM (bulk loads, old rows)
+    :param tamanho_lote: patients per transaction
+    :param recalcular: True recomputes every patient (after the phonetic rules change)
+    :return: number of patients updated
+    """
+    atualizacao = update(_pacientes).where(_pacientes.c.id == bindparam("_id"))
+    total, ultimo_id = 0, 0
+    while True:
+        with db.engine.begin() as conexao:
+            consulta = select(_pacientes.c.id, _pacientes.c.nome, _pacientes.c.telefone).where(
+                _pacientes.c.id > ultimo_id)
+            if not recalcular:
+                consulta = consulta.where(_pacientes.c.fonetica_nome.is_(None))
+            linhas = conexao.execute(consulta.order_by(_pacientes.c.id).limit(tamanho_lote)).all()
+            if not linhas:
+                return total
+            conexao.execute(atualizacao, [{"_id": linha.id, **chaves_paciente(linha.nome, linha.telefone)}
+                                          for linha in linhas])
+            total += len(linhas)
+            ultimo_id = linhas[-1].id
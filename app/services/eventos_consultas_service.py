@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import queue
+import select as select_io
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.consulta import Consulta
+from app.models.evento_consulta import EventoConsulta
+from app.services.alteracoes_service import reservar_sequencias
+from app.services.auditoria_service import valor_json
+
+logger = logging.getLogger("curasys.eventos_consultas")
+
+CANAL = "curasys_consultas_eventos"
+# Reconexão sugerida ao EventSource do navegador (ms)
+RETRY_MS = 3000
+
+_eventos = EventoConsulta.__table__
+
+
+def dados_consulta(objeto):
+    """
+    function to read the column values of a consulta just flushed, without loading anything
+    Columns filled by the database on insert (server_default) are already loaded: Consulta uses
+    eager_defaults, so they are fetched during the flush instead of being left expired.
+    :param objeto: Consulta instance
+    :return: dictionary with the same keys as Consulta.to_dict
+    """
+    estado = inspect(objeto)
+    return {atributo.key: valor_json(estado.dict.get(atributo.key)) for atributo in estado.mapper.column_attrs}
+
+
+def medico_anterior(objeto):
+    """
+    function to find the doctor a consulta was moved away from in the flush
+    The attribute history is still available in after_flush.
+    :param objeto: Consulta instance
+    :return: previous medico_id, or None when it did not change
+    """
+    anteriores = [valor for valor in inspect(objeto).attrs.medico_id.history.deleted if valor is not None]
+    if anteriores and anteriores[0] != objeto.medico_id:
+        return anteriores[0]
+    return None
+
+
+def do_medico(medico_id):
+    """
+    function to build the filter of the events a doctor's stream receives
+    :param medico_id: doctor identifier
+    :return: SQL expression
+    """
+    return or_(_eventos.c.medico_id == medico_id, _eventos.c.medico_anterior_id == medico_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_eventos(session, flush_context):
+    """
+    SQLAlchemy hook: stores the consulta events of the flush in the same transaction. On PostgreSQL a
+    NOTIFY goes with them: it is delivered to the listeners only if and when the transaction commits.
+    """
+    if not has_app_context() or "eventos_consultas" not in current_app.extensions:
+        return
+    alteradas = [objeto for objeto in session.dirty if isinstance(objeto, Consulta) and session.is_modified(objeto)]
+    eventos = [
+        (tipo, objeto)
+        for tipo, objetos in (("criada", session.new), ("atualizada", alteradas), ("removida", session.deleted))
+        for objeto in objetos if isinstance(objeto, Consulta)
+    ]
+    if not eventos:
+        return
+
+    conexao = session.connection()
+    inicio = reservar_sequencias(conexao, len(eventos))
+    agora = datetime.now(timezone.utc)
+    conexao.execute(
+        insert(_eventos).execution_options(fora_do_orcamento=True),
+        [{"seq": inicio + indice, "consulta_id": objeto.id, "medico_id": objeto.medico_id,
+          "medico_anterior_id": medico_anterior(objeto) if tipo == "atualizada" else None, "tipo": tipo,
+          "dados": dados_consulta(objeto), "criado_em": agora} for indice, (tipo, objeto) in enumerate(eventos)],
+    )
+    if conexao.dialect.name == "postgresql":
+        conexao.execute(select(func.pg_notify(CANAL, str(inicio + len(eventos) - 1)))
+                        .execution_options(fora_do_orcamento=True))
+    else:
+        session.info["eventos_consultas"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _avisar_commit(session):
+    """
+    SQLAlchemy hook: wakes up the listeners of every worker of the host (databases without NOTIFY).
+    """
+    if session.info.pop("eventos_consultas", False) and has_app_context() \
+            and "eventos_consultas" in current_app.extensions:
+        current_app.extensions["eventos_consultas"].sinalizar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_aviso(session):
+    session.info.pop("eventos_consultas", None)
+
+
+def formatar_evento(linha):
+    """
+    function to render an event in the text/event-stream format
+    :param linha: eventos_consultas row (mapping)
+    :return: SSE message
+    """
+    dados = json.dumps({"tipo": linha["tipo"], "consulta": linha["dados"]}, separators=(",", ":"))
+    return f"id: {linha['seq']}\nevent: consulta.{linha['tipo']}\ndata: {dados}\n\n"
+
+
+def eventos_desde(cursor, medico_id, limite):
+    """
+    function to read the stored events after a cursor (resume via Last-Event-ID)
+    :param cursor: last event id the client has seen
+    :param medico_id: only events of this doctor (None: every doctor)
+    :param limite: maximum number of events
+    :return: list of (seq, SSE message)
+    """
+    stmt = select(_eventos).where(_eventos.c.seq > cursor).order_by(_eventos.c.seq).limit(limite)
+    if medico_id is not None:
+        stmt = stmt.where(do_medico(medico_id))
+    with db.engine.connect() as conexao:
+        return [(linha["seq"], formatar_evento(linha)) for linha in conexao.execute(stmt).mappings()]
+
+
+def ultimo_evento():
+    """
+    function to get the id of the newest stored event
+    :return: sequence (0 when there is none)
+    """
+    with db.engine.connect() as conexao:
+        return conexao.execute(select(func.max(_eventos.c.seq))).scalar() or 0
+
+
+class ParametrosEventosError(Exception):
+    pass
+
+
+def ler_parametros(medico_id, ultimo_id):
+    """
+    function to parse the stream parameters (query string and Last-Event-ID header)
+    :param medico_id: medico_id argument, or None
+    :param ultimo_id: Last-Event-ID header (or last_event_id argument), or None
+    :return: (medico_id, ultimo_id) as int or None
+    """
+    try:
+        return (int(medico_id) if medico_id else None), (int(ultimo_id) if ultimo_id else None)
+    except ValueError:
+        raise ParametrosEventosError("medico_id e Last-Event-ID devem ser números inteiros")
+
+
+class Assinatura:
+    """
+    One open stream: receives (seq, SSE message) of its doctor through entregar, from the central's thread.
+    """
+
+    def __init__(self, medico_id, entregar):
+        self.medico_id = medico_id
+        self.entregar = entregar
+
+
+class CentralEventos:
+    """
+    Per-process fan-out of consulta events. One background thread waits for commits (LISTEN on
+    PostgreSQL; the mtime of a file in /dev/shm, touched after each commit, elsewhere), reads the new
+    events once and hands them to every open stream of the process, whatever their number.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        diretorio = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        self.arquivo = app.config.get("SSE_NOTIFY_PATH") or os.path.join(diretorio, "curasys-consultas-eventos")
+        self._lock = threading.Lock()
+        self._assinaturas = set()
+        self._ultimo = None
+        self._pid = None
+
+    def sinalizar(self):
+        """
+        function to tell the listeners of every worker of the host that events were committed
+        :return: None
+        """
+        with open(self.arquivo, "a"):
+            os.utime(self.arquivo)
+
+    def assinar(self, medico_id, entregar):
+        """
+        function to register an open stream (it gets the events committed from now on)
+        :param medico_id: only events of this doctor (None: every doctor)
+        :param entregar: callable receiving (seq, SSE message), called from the central's thread
+        :return: Assinatura
+        """
+        self._garantir_thread()
+        assinatura = Assinatura(medico_id, entregar)
+        atual = ultimo_evento()
+        with self._lock:
+            if self._ultimo is None:
+                self._ultimo = atual
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        """
+        function to unregister a closed stream
+        :param assinatura: Assinatura returned by assinar
+        :return: None
+        """
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+            if not self._assinaturas:
+                # Sem streams abertos não há o que ler; o próximo assinante define o ponto de partida
+                self._ultimo = None
+
+    def _garantir_thread(self):
+        # Uma thread por processo, iniciada sob demanda: threads não atravessam o fork dos workers
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._executar, name="eventos-consultas", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _distribuir(self):
+        """
+        function to read the events committed since the last read and deliver them to the open streams
+        :return: None
+        """
+        with self._lock:
+            ultimo, assinaturas = self._ultimo, list(self._assinaturas)
+        if ultimo is None:
+            return
+        with db.engine.connect() as conexao:
+            linhas = conexao.execute(
+                select(_eventos).where(_eventos.c.seq > ultimo).order_by(_eventos.c.seq).limit(1000)).mappings().all()
+        for linha in linhas:
+            mensagem = (linha["seq"], formatar_evento(linha))
+            for assinatura in assinaturas:
+                if assinatura.medico_id in (None, linha["medico_id"], linha["medico_anterior_id"]):
+                    assinatura.entregar(mensagem)
+        if linhas:
+            with self._lock:
+                if self._ultimo is not None:
+                    self._ultimo = max(self._ultimo, linhas[-1]["seq"])
+
+    def _limpar(self):
+        """
+        function to remove events older than SSE_EVENT_RETENTION_MINUTES (the resume window)
+        :return: None
+        """
+        limite = datetime.now(timezone.utc) - timedelta(minutes=self.app.config["SSE_EVENT_RETENTION_MINUTES"])
+        with db.engine.begin() as conexao:
+            conexao.execute(delete(_eventos).where(_eventos.c.criado_em < limite))
+
+    def _escutar_postgres(self):
+        """
+        function to wait for NOTIFY on a dedicated connection (detached from the pool)
+        :return: None
+        """
+        conexao = db.engine.raw_connection()
+        conexao.detach()
+        try:
+            driver = conexao.driver_connection
+            driver.autocommit = True
+            with driver.cursor() as cursor:
+                cursor.execute(f"LISTEN {CANAL}")
+            proxima_limpeza = time.monotonic()
+            while True:
+                prontos, _, _ = select_io.select([driver], [], [], self.app.config["SSE_FALLBACK_POLL_SECONDS"])
+                if prontos:
+                    driver.poll()
+                    driver.notifies.clear()
+                self._distribuir()
+                if time.monotonic() >= proxima_limpeza:
+                    self._limpar()
+                    proxima_limpeza = time.monotonic() + 60
+        finally:
+            conexao.close()
+
+    def _observar_arquivo(self):
+        """
+        function to wait for commits by watching the mtime of the notification file
+        A stat every SSE_POLL_INTERVAL_SECONDS costs no database query; the database is read only when
+        the file changed, or every SSE_FALLBACK_POLL_SECONDS as a safety net.
+        :return: None
+        """
+        visto = None
+        proxima_leitura = proxima_limpeza = time.monotonic()
+        while True:
+            try:
+                mtime = os.stat(self.arquivo).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            agora = time.monotonic()
+            # O mtime é lido antes dos eventos: um commit durante a leitura muda o arquivo de novo
+            if mtime != visto or agora >= proxima_leitura:
+                visto = mtime
+                self._distribuir()
+                proxima_leitura = agora + self.app.config["SSE_FALLBACK_POLL_SECONDS"]
+            if agora >= proxima_limpeza:
+                self._limpar()
+                proxima_limpeza = agora + 60
+            time.sleep(self.app.config["SSE_POLL_INTERVAL_SECONDS"])
+
+    def _executar(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    if db.engine.dialect.name == "postgresql":
+                        self._escutar_postgres()
+                    else:
+                        self._observar_arquivo()
+            except Exception as e:
+                logger.warning("Falha ao aguardar eventos de consultas: %s", e)
+                time.sleep(1)
+
+
+def abrir_fluxo(central, medico_id, ultimo_id, entregar):
+    """
+    function to open a stream: subscribes it and reads what a reconnecting client has missed
+    The subscription comes first and the history is read afterwards, so no event falls in between: one
+    committed meanwhile arrives twice and the copy is dropped by its seq.
+    :param central: CentralEventos of the application
+    :param medico_id: only events of this doctor (None: every doctor)
+    :param ultimo_id: Last-Event-ID sent by a reconnecting client, or None
+    :param entregar: callable receiving (seq, SSE message) of new events
+    :return: (Assinatura, cursor, first SSE messages)
+    """
+    cursor = ultimo_id if ultimo_id is not None else ultimo_evento()
+    assinatura = central.assinar(medico_id, entregar)
+    mensagens = [f"retry: {RETRY_MS}\n\n"]
+    try:
+        maximo = central.app.config["SSE_REPLAY_MAX"]
+        pendentes = eventos_desde(cursor, medico_id, maximo + 1)
+        if len(pendentes) > maximo:
+            # Desconectado por tempo demais: o cliente recarrega a agenda e segue dos eventos novos
+            mensagens.append("event: reset\ndata: {}\n\n")
+            return assinatura, ultimo_evento(), mensagens
+        for seq, mensagem in pendentes:
+            cursor = seq
+            mensagens.append(mensagem)
+        return assinatura, cursor, mensagens
+    except Exception:
+        central.cancelar(assinatura)
+        raise
+
+
+def fluxo_eventos(central, medico_id, ultimo_id):
+    """
+    function to stream consulta events to one client (WSGI: the stream holds a worker thread while open;
+    asgi:app serves the same stream with a coroutine, see app/asgi.py)
+    :param central: CentralEventos of the application
+    :param medico_id: only events of this doctor (None: every doctor)
+    :param ultimo_id: Last-Event-ID sent by a reconnecting client, or None
+    :return: generator of SSE messages
+    """
+    fila = queue.Queue()
+    assinatura, cursor, mensagens = abrir_fluxo(central, medico_id, ultimo_id, fila.put)
+    try:
+        yield from mensagens
+        while True:
+            try:
+                seq, mensagem = fila.get(timeout=central.app.config["SSE_HEARTBEAT_SECONDS"])
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            if seq > cursor:
+                cursor = seq
+                yield mensagem
+    finally:
+        central.cancelar(assinatura)
+
+
+def init_eventos_consultas(app):
+    """
+    function to enable the consulta event stream (GET /consultas/eventos)
+    :param app: flask application
+    :return: None
+    """
+    if not app.config.get("SSE_ENABLED", True):
+        return
+    app.extensions["eventos_consultas"] = CentralEventos(app)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import csv
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, time, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import select, func, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.extensions import db
+from app.models.consulta import Consulta
+from app.models.exame import Exame
+from app.models.exportacao import Exportacao
+
+_executor = None
+
+# Tabela, coluna de data usada no intervalo e filtros de igualdade aceitos por recurso
+RECURSOS = {
+    "consultas": {
+        "modelo": Consulta,
+        "coluna_data": "data_consulta",
+        "filtros": {"paciente_id": "paciente_id", "medico_id": "medico_id", "status": "status"},
+    },
+    "exames": {
+        "modelo": Exame,
+        "coluna_data": "criado_em",
+        "filtros": {"paciente_id": "id_paciente", "tipo": "tipo"},
+    },
+}
+
+EXTENSOES = {"csv": "csv.gz", "ndjson": "ndjson.gz"}
+
+# Status de um job que ainda deveria estar andando em algum worker
+STATUS_ATIVOS = ('pendente', 'processando')
+ERRO_INTERROMPIDA = "Exportação interrompida: o worker que a executava foi encerrado. Solicite novamente."
+
+
+def _get_executor(app):
+    """
+    function to get the shared export thread pool
+    :param app: flask application
+    :return: executor
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=app.config["EXPORT_MAX_WORKERS"],
+                                       thread_name_prefix="exportacao")
+    return _executor
+
+
+def montar_consulta(recurso, filtros):
+    """
+    function to build the export SELECT for a resource
+    :param recurso: resource name (consultas or exames)
+    :param filtros: already validated filters
+    :return: tuple with the statement and the matching COUNT statement
+    """
+    definicao = RECURSOS[recurso]
+    tabela = definicao["modelo"].__table__
+    coluna_data = tabela.c[definicao["coluna_data"]]
+
+    condicoes = []
+    if filtros.get("data_inicio"):
+        condicoes.append(coluna_data >= datetime.fromisoformat(filtros["data_inicio"]))
+    if filtros.get("data_fim"):
+        # data_fim é inclusiva: compara com o início do dia seguinte
+        condicoes.append(coluna_data < datetime.fromisoformat(filtros["data_fim"]) + timedelta(days=1))
+    for filtro, coluna in definicao["filtros"].items():
+        if filtros.get(filtro) is not None:
+            condicoes.append(tabela.c[coluna] == filtros[filtro])
+
+    stmt = select(tabela).where(*condicoes).order_by(tabela.c.id)
+    stmt_count = select(func.count()).select_from(tabela).where(*condicoes)
+    return stmt, stmt_count
+
+
+def _serializar(valor):
+    """
+    function to convert a column value into a CSV/JSON friendly value
+    :param valor: raw column value
+    :return: serializable value
+    """
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def iniciar_exportacao(app, exportacao_id):
+    """
+    function to schedule an export job outside the request path
+    :param app: flask application
+    :param exportacao_id: export identifier
+    :return: future of the job
+    """
+    return _get_executor(app).submit(executar_exportacao, app, exportacao_id)
+
+
+def executar_exportacao(app, exportacao_id):
+    """
+    function to run an export job, streaming rows into a compressed file
+    :param app: flask application
+    :param exportacao_id: export identifier
+    :return: None
+    """
+    with app.app_context():
+        # Reivindica o job: só roda se ainda estiver pendente (não foi dado como interrompido na fila)
+        reivindicada = db.session.execute(
+            update(Exportacao)
+            .where(Exportacao.id == exportacao_id, Exportacao.status == 'pendente')
+            .values(status='processando')
+        ).rowcount
+        db.session.commit()
+        if not reivindicada:
+            return
+        exportacao = db.session.get(Exportacao, exportacao_id)
+
+        os.makedirs(app.config["EXPORT_DIR"], exist_ok=True)
+        destino = os.path.join(app.config["EXPORT_DIR"],
+                               f"exportacao_{exportacao.id}.{EXTENSOES[exportacao.formato]}")
+        parcial = destino + ".parcial"
+        tamanho_lote = app.config["EXPORT_BATCH_SIZE"]
+
+        try:
+            stmt, stmt_count = montar_consulta(exportacao.recurso, exportacao.filtros or {})
+            exportacao.total_linhas = db.session.execute(stmt_count).scalar()
+            db.session.commit()
+
+            linhas = 0
+            # Conexão dedicada: o cursor no servidor não pode ser fechado pelos commits de progresso
+            with db.engine.connect() as conn, gzip.open(parcial, "wt", encoding="utf-8", newline="") as arquivo:
+                resultado = conn.execution_options(stream_results=True, yield_per=tamanho_lote).execute(stmt)
+                colunas = list(resultado.keys())
+                escritor = None
+                if exportacao.formato == 'csv':
+                    escritor = csv.writer(arquivo)
+                    escritor.writerow(colunas)
+
+                for lote in resultado.partitions():
+                    for linha in lote:
+                        valores = [_serializar(v) for v in linha]
+                        if escritor:
+                            escritor.writerow(valores)
+                        else:
+                            arquivo.write(json.dumps(dict(zip(colunas, valores)), ensure_ascii=False))
+                            arquivo.write("\n")
+                    linhas += len(lote)
+                    exportacao.linhas_exportadas = linhas
+                    db.session.commit()
+
+            os.replace(parcial, destino)
+            exportacao.arquivo = destino
+            exportacao.linhas_exportadas = linhas
+            exportacao.status = 'concluida'
+            exportacao.concluido_em = datetime.now(timezone.utc)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            exportacao.status = 'erro'
+            exportacao.erro = str(e)
+            db.session.commit()
+
+
+def _limite_heartbeat(limite_segundos):
+    return datetime.now(timezone.utc) - timedelta(seconds=limite_segundos)
+
+
+def interrompida(exportacao, limite_segundos):
+    """
+    function to tell whether a job stopped making progress (its worker was restarted or recycled)
+    :param exportacao: export job
+    :param limite_segundos: seconds without a heartbeat after which the job is considered dead
+    :return: True when the job is pending/processing and its heartbeat is older than the limit
+    """
+    if exportacao.status not in STATUS_ATIVOS or exportacao.atualizado_em is None:
+        return False
+    atualizado_em = exportacao.atualizado_em
+    if atualizado_em.tzinfo is None:
+        atualizado_em = atualizado_em.replace(tzinfo=timezone.utc)  # SQLite devolve UTC sem fuso
+    return atualizado_em < _limite_heartbeat(limite_segundos)
+
+
+def marcar_interrompida(exportacao, limite_segundos):
+    """
+    function to mark an orphaned job as failed, so clients stop polling it and can request it again
+    The staleness is checked again in the UPDATE: a job whose heartbeat moved meanwhile keeps its status.
+    :param exportacao: export job already checked with interrompida()
+    :param limite_segundos: seconds without a heartbeat after which the job is considered dead
+    :return: True when the job was marked
+    """
+    marcada = db.session.execute(
+        update(Exportacao)
+        .where(Exportacao.id == exportacao.id,
+               Exportacao.status.in_(STATUS_ATIVOS),
+               Exportacao.atualizado_em < _limite_heartbeat(limite_segundos))
+        .values(status='erro', erro=ERRO_INTERROMPIDA)
+        .execution_options(fora_do_orcamento=True, synchronize_session=False)
+    ).rowcount
+    if marcada:
+        set_committed_value(exportacao, "status", 'erro')
+        set_committed_value(exportacao, "erro", ERRO_INTERROMPIDA)
+    return bool(marcada)
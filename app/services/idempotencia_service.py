@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Response, current_app, g, jsonify, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.idempotencia import ChaveIdempotencia
+from app.services.metricas_service import registrar_cache
+
+CABECALHO = "Idempotency-Key"
+METODOS = ("POST", "PUT")
+TAMANHO_MAXIMO_CHAVE = 255
+
+_tabela = ChaveIdempotencia.__table__
+
+
+def sem_idempotencia(view):
+    """
+    decorator to opt a write route out of Idempotency-Key handling (e.g. login: tokens must not be stored)
+    :param view: view function
+    :return: decorated view
+    """
+    view.sem_idempotencia = True
+    return view
+
+
+def _agora():
+    return datetime.now(timezone.utc)
+
+
+def _conexao():
+    # Conexão própria, fora da sessão da requisição: a reserva precisa ser visível para outras
+    # requisições antes de o controller rodar, e não entra no orçamento de queries da rota
+    return db.engine.connect().execution_options(fora_do_orcamento=True)
+
+
+def impressao_digital():
+    """
+    function to fingerprint the request (method, path, query string and body)
+    Reusing a key with a different request is a client error, not a replay.
+    :return: sha256 hex digest
+    """
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n".encode("utf-8"))
+    if request.mimetype in ("multipart/form-data", "application/x-www-form-urlencoded"):
+        for campo, valor in sorted(request.form.items(multi=True)):
+            digest.update(f"{campo}={valor}\n".encode("utf-8"))
+        for campo, arquivo in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"{campo}:{arquivo.filename}\n".encode("utf-8"))
+            digest.update(arquivo.stream.read())
+            arquivo.stream.seek(0)
+    else:
+        digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def reservar_chave(chave, hash_requisicao, arrendamento):
+    """
+    function to claim an idempotency key; the primary key makes concurrent claims mutually exclusive
+    The claim only lasts the lease: if its worker dies before concluir_chave, the key becomes free again
+    when the lease expires instead of answering 409 until the replay TTL ends.
+    :param chave: Idempotency-Key value
+    :param hash_requisicao: request fingerprint
+    :param arrendamento: timedelta the in-flight claim lasts (IDEMPOTENCY_LEASE_SECONDS)
+    :return: tuple (reserva, existente): reserva identifies the claim (pass it to concluir_chave and
+             liberar_chave) or is None when the key is taken; existente is the current row when the key
+             is taken, or None if that row disappeared meanwhile (the caller should simply try again)
+    """
+    agora = _agora()
+    with _conexao() as conexao:
+        try:
+            with conexao.begin():
+                conexao.execute(delete(_tabela).where(_tabela.c.chave == chave, _tabela.c.expira_em <= agora))
+                conexao.execute(insert(_tabela).values(chave=chave, hash_requisicao=hash_requisicao, status="processando",
+                                                       criado_em=agora, expira_em=agora + arrendamento))
+            return (chave, agora), None
+        except IntegrityError:
+            return None, conexao.execute(select(_tabela).where(_tabela.c.chave == chave)).mappings().first()
+
+
+def _da_reserva(reserva):
+    # A mesma chave pode ter sido retomada por outra requisição depois de o arrendamento expirar
+    chave, criado_em = reserva
+    return (_tabela.c.chave == chave, _tabela.c.criado_em == criado_em, _tabela.c.status == "processando")
+
+
+def concluir_chave(reserva, response, ttl):
+    """
+    function to store the response of a claimed key so retries replay it
+    :param reserva: claim returned by reservar_chave
+    :param response: flask response
+    :param ttl: timedelta the stored response stays valid (IDEMPOTENCY_TTL_HOURS)
+    :return: True if the claim was still ours and the response was stored
+    """
+    with _conexao() as conexao, conexao.begin():
+        return conexao.execute(update(_tabela).where(*_da_reserva(reserva)).values(
+            status="concluida", status_resposta=response.status_code, expira_em=_agora() + ttl,
+            corpo_resposta=response.get_data(), content_type=response.content_type)).rowcount == 1
+
+
+def liberar_chave(reserva):
+    """
+    function to drop a claim whose request failed, so the client can retry it
+    :param reserva: claim returned by reservar_chave
+    :return: None
+    """
+    with _conexao() as conexao, conexao.begin():
+        conexao.execute(delete(_tabela).where(*_da_reserva(reserva)))
+
+
+def limpar_chaves_expiradas():
+    """
+    function to delete expired idempotency keys
+    :return: number of deleted keys
+    """
+    with _conexao() as conexao, conexao.begin():
+        return conexao.execute(delete(_tabela).where(_tabela.c.expira_em <= _agora())).rowcount
+
+
+def _erro(status, mensagem, **cabecalhos):
+    response = jsonify({"success": False, "error": mensagem})
+    response.status_code = status
+    response.headers.update(cabecalhos)
+    return response
+
+
+def _antes_requisicao():
+    """
+    before_request hook: claims the Idempotency-Key, replays a stored response, or waits for the
+    request that currently holds the key (same key in flight = serialized).
+    """
+    chave = request.headers.get(CABECALHO)
+    if not chave or request.method not in METODOS:
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None or getattr(view, "sem_idempotencia", False):
+        return None
+    if len(chave) > TAMANHO_MAXIMO_CHAVE:
+        return _erro(400, f"{CABECALHO} deve ter no máximo {TAMANHO_MAXIMO_CHAVE} caracteres")
+
+    hash_requisicao = impressao_digital()
+    arrendamento = timedelta(seconds=current_app.config["IDEMPOTENCY_LEASE_SECONDS"])
+    limite = time.monotonic() + current_app.config["IDEMPOTENCY_WAIT_SECONDS"]
+    espera = 0.02
+    while True:
+        reserva, existente = reservar_chave(chave, hash_requisicao, arrendamento)
+        if reserva is not None:
+            registrar_cache("idempotencia", False)
+            g._reserva_idempotencia = reserva
+            return None
+        if existente is None:
+            continue
+        if existente["hash_requisicao"] != hash_requisicao:
+            return _erro(422, f"{CABECALHO} já utilizada com uma requisição diferente")
+        if existente["status"] == "concluida":
+            response = Response(existente["corpo_resposta"], status=existente["status_resposta"],
+                                content_type=existente["content_type"])
+            response.headers["Idempotent-Replayed"] = "true"
+            registrar_cache("idempotencia", True)
+            return response
+        if time.monotonic() >= limite:
+            return _erro(409, "Requisição com esta chave ainda em processamento", **{"Retry-After": "1"})
+        time.sleep(espera)
+        espera = min(espera * 2, 0.5)
+
+
+def _depois_requisicao(response):
+    """
+    after_request hook: stores 2xx/4xx responses; 5xx releases the key so a retry runs again.
+    :param response: flask response
+    :return: response
+    """
+    reserva = g.pop("_reserva_idempotencia", None)
+    if reserva is None:
+        return response
+    if response.status_code >= 500 or response.direct_passthrough:
+        liberar_chave(reserva)
+    else:
+        concluir_chave(reserva, response, timedelta(hours=current_app.config["IDEMPOTENCY_TTL_HOURS"]))
+    return response
+
+
+def _encerrar_requisicao(erro):
+    """
+    teardown hook: an unhandled exception never reaches after_request, release the claim.
+    """
+    reserva = g.pop("_reserva_idempotencia", None)
+    if reserva is not None:
+        liberar_chave(reserva)
+
+
+def init_idempotencia(app):
+    """
+    function to enable Idempotency-Key handling on POST and PUT routes
+    :param app: flask application
+    :return: None
+    """
+    app.before_request(_antes_requisicao)
+    app.after_request(_depois_requisicao)
+    app.teardown_request(_encerrar_requisicao)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("curasys.performance")
+
+# Funções chamadas com (conn, statement, parameters, duracao) após cada statement SQL
+_observadores_query = []
+
+
+class MetricasRequisicao:
+    """
+    Per-request counters filled by the SQLAlchemy cursor events and the JSON provider.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.queries = 0
+        self.db_segundos = 0.0
+        self.serializacao_segundos = 0.0
+
+    def registrar_query(self, statement, duracao):
+        """
+        function to account one executed SQL statement
+        :param statement: SQL text sent to the driver
+        :param duracao: execution time in seconds
+        :return: None
+        """
+        self.queries += 1
+        self.db_segundos += duracao
+
+
+def registrar_observador_query(observador):
+    """
+    function to subscribe to the duration of every SQL statement (e.g. slow query log)
+    :param observador: callable(conn, statement, parameters, duracao)
+    :return: the observer, so it can be used as a decorator
+    """
+    if observador not in _observadores_query:
+        _observadores_query.append(observador)
+    _ouvir_statements()
+    return observador
+
+
+def metricas_atuais():
+    """
+    function to get the metrics of the current request
+    :return: MetricasRequisicao or None outside a request
+    """
+    if not has_request_context():
+        return None
+    return g.get("_metricas")
+
+
+def _antes_cursor(conn, cursor, statement, parameters, context, executemany):
+    """
+    SQLAlchemy hook: marks the start of a statement on the connection.
+    """
+    conn.info.setdefault("_inicio_queries", []).append(time.perf_counter())
+
+
+def _depois_cursor(conn, cursor, statement, parameters, context, executemany):
+    """
+    SQLAlchemy hook: accounts the statement duration into the current request.
+    """
+    inicios = conn.info.get("_inicio_queries")
+    if not inicios:
+        return
+    duracao = time.perf_counter() - inicios.pop()
+    metricas = metricas_atuais()
+    if metricas is not None:
+        metricas.registrar_query(statement, duracao)
+    for observador in _observadores_query:
+        observador(conn, statement, parameters, duracao)
+
+
+def _ouvir_statements():
+    """
+    function to install the cursor hooks once, only when instrumentation or an observer needs them
+    (with everything disabled no SQL statement pays for the timing)
+    :return: None
+    """
+    if not event.contains(Engine, "before_cursor_execute", _antes_cursor):
+        event.listen(Engine, "before_cursor_execute", _antes_cursor)
+        event.listen(Engine, "after_cursor_execute", _depois_cursor)
+
+
+class JSONProviderInstrumentado(DefaultJSONProvider):
+    """
+    JSON provider that accounts the time spent serializing responses (jsonify).
+    """
+
+    def dumps(self, obj, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            metricas = metricas_atuais()
+            if metricas is not None:
+                metricas.serializacao_segundos += time.perf_counter() - inicio
+
+
+def _iniciar_metricas():
+    """
+    before_request hook: starts the request metrics.
+    """
+    g._metricas = MetricasRequisicao()
+
+
+def _registrar_metricas(response):
+    """
+    after_request hook: emits the Server-Timing header and, if enabled, the structured log line.
+    :param response: flask response
+    :return: response with the Server-Timing header
+    """
+    metricas = g.pop("_metricas", None)
+    if metricas is None:
+        return response
+
+    total_ms = (time.perf_counter() - metricas.inicio) * 1000
+    db_ms = metricas.db_segundos * 1000
+    serializacao_ms = metricas.serializacao_segundos * 1000
+    app_ms = max(total_ms - db_ms - serializacao_ms, 0.0)
+
+    response.headers["Server-Timing"] = ", ".join([
+        f'db;dur={db_ms:.2f};desc="{metricas.queries} queries"',
+        f"ser;dur={serializacao_ms:.2f}",
+        f"app;dur={app_ms:.2f}",
+        f"total;dur={total_ms:.2f}",
+    ])
+
+    if not current_app.config.get("PERF_LOG_REQUESTS", False):
+        return response
+
+    logger.info(json.dumps({
+        "evento": "requisicao",
+        "blueprint": request.blueprint,
+        "endpoint": request.endpoint,
+        "metodo": request.method,
+        "caminho": request.path,
+        "status": response.status_code,
+        "queries": metricas.queries,
+        "db_ms": round(db_ms, 2),
+        "serializacao_ms": round(serializacao_ms, 2),
+        "app_ms": round(app_ms, 2),
+        "total_ms": round(total_ms, 2),
+    }, ensure_ascii=False))
+    return response
+
+
+def init_instrumentacao(app):
+    """
+    function to enable per-request performance instrumentation (Server-Timing, plus the structured log
+    line when PERF_LOG_REQUESTS is set)
+    :param app: flask application
+    :return: None
+    """
+    if not app.config.get("PERF_INSTRUMENTATION", True):
+        return
+
+    _ouvir_statements()
+    if app.config.get("PERF_LOG_REQUESTS", False) and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    app.json = JSONProviderInstrumentado(app)
+    app.before_request(_iniciar_metricas)
+    app.after_request(_registrar_metricas)
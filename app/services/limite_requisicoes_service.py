@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import importlib
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import decode_token
+
+logger = logging.getLogger("curasys.limite_requisicoes")
+
+
+def limite_requisicoes(config):
+    """
+    decorator to rate limit a route with a token bucket per client and route
+    :param config: config key holding the limit as "requests/seconds" (e.g. "10/60": bursts of 10,
+                   refilled at 10 requests per 60 seconds)
+    :return: decorated view
+    """
+    def decorator(view):
+        view.limite_requisicoes = config
+        return view
+    return decorator
+
+
+def _parse_limite(valor):
+    """
+    function to parse "requests/seconds" into the bucket capacity and refill rate
+    :param valor: limit string
+    :return: (capacidade, tokens per second)
+    """
+    requisicoes, segundos = valor.split("/")
+    return float(requisicoes), float(requisicoes) / float(segundos)
+
+
+def _reabastecer(tokens, atualizado_em, capacidade, taxa, agora):
+    """
+    function to refill a bucket for the elapsed time and take one token from it
+    :return: (permitido, tokens left)
+    """
+    tokens = min(capacidade, tokens + max(0.0, agora - atualizado_em) * taxa)
+    if tokens >= 1:
+        return True, tokens - 1
+    return False, tokens
+
+
+class BackendMemoria:
+    """
+    Buckets in a dictionary of the process: each gunicorn worker counts on its own (development/tests).
+    """
+
+    def __init__(self, app):
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, chave, capacidade, taxa):
+        """
+        function to take one token from the bucket of a key
+        :param chave: bucket key (route and client)
+        :param capacidade: bucket size (burst)
+        :param taxa: tokens added per second
+        :return: (permitido, tokens left)
+        """
+        agora = time.time()
+        with self._lock:
+            tokens, atualizado_em = self._baldes.get(chave, (capacidade, agora))
+            permitido, tokens = _reabastecer(tokens, atualizado_em, capacidade, taxa, agora)
+            self._baldes[chave] = (tokens, agora)
+        return permitido, tokens
+
+
+def caminho_padrao(app, nome="ratelimit"):
+    """
+    function to build the default file of a store shared by the workers of a deployment: one file per
+    instance path, so two deployments (or test runs) on the same host never share or exhaust each other's state
+    :param app: flask application
+    :param nome: store name (ratelimit: the buckets of this module)
+    :return: path in /dev/shm (or the temp dir when there is no /dev/shm)
+    """
+    diretorio = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    implantacao = hashlib.sha1(os.path.abspath(app.instance_path).encode()).hexdigest()[:12]
+    return os.path.join(diretorio, f"curasys-{nome}-{implantacao}.sqlite3")
+
+
+class BackendSQLite:
+    """
+    Buckets in a SQLite file shared by every worker of the deployment. By default the file lives in
+    /dev/shm, so it is shared memory in practice: no fsync, a few microseconds per request.
+    """
+
+    def __init__(self, app):
+        self.caminho = app.config.get("RATE_LIMIT_STORAGE_PATH") or caminho_padrao(app)
+        self._lock = threading.Lock()
+        self._conexao = None
+        self._pid = None
+
+    def _conectar(self):
+        # Uma conexão por processo, aberta sob demanda: nunca atravessa o fork dos workers
+        if self._pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=OFF")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS baldes (chave TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+                "atualizado_em REAL NOT NULL, cheio_em REAL NOT NULL) WITHOUT ROWID")
+            conexao.execute("CREATE INDEX IF NOT EXISTS ix_baldes_cheio_em ON baldes (cheio_em)")
+            self._conexao, self._pid = conexao, os.getpid()
+        return self._conexao
+
+    def consumir(self, chave, capacidade, taxa):
+        """
+        function to take one token from the bucket of a key (read-modify-write under BEGIN IMMEDIATE,
+        so concurrent workers never spend the same token)
+        :param chave: bucket key (route and client)
+        :param capacidade: bucket size (burst)
+        :param taxa: tokens added per second
+        :return: (permitido, tokens left)
+        """
+        with self._lock:
+            conexao = self._conectar()
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                agora = time.time()
+                linha = conexao.execute("SELECT tokens, atualizado_em FROM baldes WHERE chave = ?", (chave,)).fetchone()
+                permitido, tokens = _reabastecer(*(linha or (capacidade, agora)), capacidade, taxa, agora)
+                conexao.execute(
+                    "INSERT INTO baldes (chave, tokens, atualizado_em, cheio_em) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (chave) DO UPDATE SET tokens = excluded.tokens, "
+                    "atualizado_em = excluded.atualizado_em, cheio_em = excluded.cheio_em",
+                    (chave, tokens, agora, agora + (capacidade - tokens) / taxa))
+                # Balde cheio equivale a balde inexistente: de vez em quando remove os que já encheram
+                if random.random() < 0.001:
+                    conexao.execute("DELETE FROM baldes WHERE cheio_em < ?", (agora,))
+                conexao.execute("COMMIT")
+            except BaseException:
+                conexao.execute("ROLLBACK")
+                raise
+        return permitido, tokens
+
+
+BACKENDS = {
+    "sqlite": BackendSQLite,
+    "memoria": BackendMemoria,
+}
+
+
+def criar_backend(app):
+    """
+    function to build the bucket store named by RATE_LIMIT_BACKEND
+    "sqlite" and "memoria" are built in; "package.module:Class" loads an external backend (e.g. Redis,
+    to share limits between hosts), built with the app and exposing consumir(chave, capacidade, taxa).
+    :param app: flask application
+    :return: backend instance
+    """
+    nome = app.config.get("RATE_LIMIT_BACKEND", "sqlite")
+    if nome in BACKENDS:
+        return BACKENDS[nome](app)
+    modulo, _, classe = nome.partition(":")
+    return getattr(importlib.import_module(modulo), classe)(app)
+
+
+def identidade_cliente(authorization, ip):
+    """
+    function to identify the client of a request: the JWT user when the token is valid, otherwise the IP
+    (an invalid or forged token cannot move a client to someone else's bucket)
+    :param authorization: Authorization header
+    :param ip: client address
+    :return: identity string
+    """
+    if authorization and authorization.startswith("Bearer "):
+        try:
+            return f"usuario:{decode_token(authorization[7:])['sub']}"
+        except Exception:
+            pass
+    return f"ip:{ip}"
+
+
+def rota_limitada(app, endpoint):
+    """
+    function to check whether rate limiting applies to an endpoint
+    :param app: flask application
+    :param endpoint: flask endpoint of the route
+    :return: config key of the limit, or None
+    """
+    if "limite_requisicoes" not in app.extensions:
+        return None
+    return getattr(app.view_functions.get(endpoint), "limite_requisicoes", None)
+
+
+def tempo_de_espera(app, endpoint, identidade):
+    """
+    function to spend one token of the client on a rate limited route
+    :param app: flask application
+    :param endpoint: flask endpoint of the route (see rota_limitada)
+    :param identidade: client identity (see identidade_cliente)
+    :return: seconds until the next token (for Retry-After), or None when the request may proceed
+    """
+    capacidade, taxa = _parse_limite(app.config[rota_limitada(app, endpoint)])
+    try:
+        permitido, tokens = app.extensions["limite_requisicoes"].consumir(f"{endpoint}|{identidade}", capacidade, taxa)
+    except Exception as e:
+        # Limitador indisponível não pode derrubar a API: deixa passar e registra
+        logger.warning("Limitador de requisições indisponível: %s", e)
+        return None
+    return None if permitido else (1 - tokens) / taxa
+
+
+def resposta_limitada(espera):
+    """
+    function to build the 429 response body and headers
+    :param espera: seconds until the next token
+    :return: (body dictionary, headers dictionary)
+    """
+    segundos = max(1, math.ceil(espera))
+    return {
+        "success": False,
+        "error": f"Muitas requisições: tente novamente em {segundos} s"
+    }, {"Retry-After": str(segundos)}
+
+
+def _antes_requisicao():
+    """
+    before_request hook: answers 429 when the client's bucket for the route is empty.
+    """
+    if rota_limitada(current_app, request.endpoint) is None:
+        return None
+    espera = tempo_de_espera(current_app, request.endpoint,
+                             identidade_cliente(request.headers.get("Authorization"), request.remote_addr))
+    if espera is None:
+        return None
+    corpo, cabecalhos = resposta_limitada(espera)
+    return jsonify(corpo), 429, cabecalhos
+
+
+def init_limite_requisicoes(app):
+    """
+    function to enable rate limiting of the routes decorated with limite_requisicoes
+    :param app: flask application
+    :return: None
+    """
+    if not app.config.get("RATE_LIMIT_ENABLED", True):
+        return
+    app.extensions["limite_requisicoes"] = criar_backend(app)
+    app.before_request(_antes_requisicao)
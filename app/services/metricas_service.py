@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+from app.services.instrumentacao_service import metricas_atuais
+
+# Com PROMETHEUS_MULTIPROC_DIR definido (gunicorn, ver gunicorn.conf.py) cada worker grava
+# seus valores em arquivos mmap nesse diretório e o /metrics agrega todos os workers.
+MULTIPROCESSO = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUISICAO_DURACAO = Histogram(
+    "curasys_http_request_duration_seconds",
+    "Latência das requisições HTTP",
+    ["blueprint", "endpoint", "method", "status"],
+)
+DB_QUERIES = Counter(
+    "curasys_db_queries_total",
+    "Quantidade de statements SQL executados",
+    ["blueprint", "endpoint"],
+)
+DB_DURACAO = Counter(
+    "curasys_db_query_duration_seconds_total",
+    "Tempo total gasto em statements SQL",
+    ["blueprint", "endpoint"],
+)
+DB_QUERIES_POR_REQUISICAO = Histogram(
+    "curasys_db_queries_per_request",
+    "Quantidade de statements SQL por requisição",
+    ["blueprint", "endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, float("inf")),
+)
+POOL_CHECKOUTS = Counter(
+    "curasys_db_pool_checkouts_total",
+    "Conexões retiradas do pool do SQLAlchemy",
+)
+POOL_CONEXOES_EM_USO = Gauge(
+    "curasys_db_pool_connections_in_use",
+    "Conexões do pool atualmente em uso",
+    multiprocess_mode="livesum",
+)
+POOL_TEMPO_EM_USO = Histogram(
+    "curasys_db_pool_checkout_duration_seconds",
+    "Tempo entre checkout e checkin de uma conexão do pool",
+)
+CACHE_REQUISICOES = Counter(
+    "curasys_cache_requests_total",
+    "Consultas a caches internos por resultado (hit/miss)",
+    ["cache", "resultado"],
+)
+BCRYPT_DURACAO = Histogram(
+    "curasys_bcrypt_duration_seconds",
+    "Tempo gasto gerando ou verificando hashes bcrypt",
+    ["operacao"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, float("inf")),
+)
+LEITURAS_ROTEADAS = Counter(
+    "curasys_db_read_routing_total",
+    "Requisições de leitura por destino (réplica ou primário) e motivo",
+    ["destino", "motivo"],
+)
+
+
+def registrar_cache(cache, acerto):
+    """
+    function to account a cache lookup (used to compute hit ratios)
+    :param cache: cache name
+    :param acerto: True for a hit, False for a miss
+    :return: None
+    """
+    CACHE_REQUISICOES.labels(cache, "hit" if acerto else "miss").inc()
+
+
+def registrar_roteamento(destino, motivo):
+    """
+    function to account where a read-only request was routed
+    :param destino: replica bind name or "primario"
+    :param motivo: why (replica, escrita_recente, atraso, indisponivel)
+    :return: None
+    """
+    LEITURAS_ROTEADAS.labels(destino, motivo).inc()
+
+
+@event.listens_for(Pool, "checkout")
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    """
+    SQLAlchemy hook: a connection left the pool.
+    """
+    POOL_CHECKOUTS.inc()
+    POOL_CONEXOES_EM_USO.inc()
+    connection_record.info["_checkout_em"] = time.perf_counter()
+
+
+@event.listens_for(Pool, "checkin")
+def _pool_checkin(dbapi_connection, connection_record):
+    """
+    SQLAlchemy hook: a connection returned to the pool.
+    """
+    inicio = connection_record.info.pop("_checkout_em", None)
+    if inicio is not None:
+        POOL_CONEXOES_EM_USO.dec()
+        POOL_TEMPO_EM_USO.observe(time.perf_counter() - inicio)
+
+
+def gerar_metricas():
+    """
+    function to render every metric in the Prometheus text exposition format
+    :return: tuple with the payload and its content type
+    """
+    if MULTIPROCESSO:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _iniciar_requisicao():
+    """
+    before_request hook: marks the request start.
+    """
+    g._inicio_prometheus = time.perf_counter()
+
+
+def _observar_requisicao(response):
+    """
+    after_request hook: records latency and DB usage of the request.
+    :param response: flask response
+    :return: response
+    """
+    inicio = g.pop("_inicio_prometheus", None)
+    if inicio is None or request.endpoint is None:
+        return response
+
+    blueprint = request.blueprint or ""
+    REQUISICAO_DURACAO.labels(blueprint, request.endpoint, request.method, str(response.status_code)) \
+        .observe(time.perf_counter() - inicio)
+
+    metricas = metricas_atuais()
+    if metricas is not None:
+        DB_QUERIES.labels(blueprint, request.endpoint).inc(metricas.queries)
+        DB_DURACAO.labels(blueprint, request.endpoint).inc(metricas.db_segundos)
+        DB_QUERIES_POR_REQUISICAO.labels(blueprint, request.endpoint).observe(metricas.queries)
+    return response
+
+
+def init_metricas(app):
+    """
+    function to enable Prometheus request metrics (must run after init_instrumentacao)
+    :param app: flask application
+    :return: None
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_observar_requisicao)
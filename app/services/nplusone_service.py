@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import sys
+import sysconfig
+import traceback
+import warnings
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("curasys.nplusone")
+
+_ESPACOS = re.compile(r"\s+")
+_LISTA_IN = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+# Quadros de bibliotecas (stdlib, site-packages) não ajudam a localizar o N+1
+_PREFIXOS_BIBLIOTECAS = tuple({sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["purelib"],
+                               sysconfig.get_paths()["platlib"]})
+
+
+class ConsultasExcessivasError(AssertionError):
+    """
+    Raised (under pytest) when a request triggers an N+1 pattern or exceeds its query budget.
+    In "raise" mode it interrupts the offending statement itself, so the request never gets to commit.
+    """
+
+
+def orcamento_queries(maximo):
+    """
+    decorator to declare the maximum number of SQL statements a route may execute
+    :param maximo: query budget of the route
+    :return: decorated view
+    """
+    def decorator(view):
+        view.orcamento_queries = maximo
+        return view
+    return decorator
+
+
+def ajustar_orcamento(maximo, repeticoes):
+    """
+    function to set the query budget of the current request at runtime, for routes whose cost
+    depends on the payload (e.g. /batch runs one controller call per operation)
+    :param maximo: query budget of the request
+    :param repeticoes: how many times a query shape may repeat before it is reported as N+1
+    :return: None
+    """
+    if g.get("_formatos_queries") is not None:
+        g._orcamento_queries = maximo
+        g._limite_repeticoes = repeticoes
+
+
+def formato_query(statement):
+    """
+    function to normalize a SQL statement into its shape (literals and IN lists collapsed)
+    :param statement: SQL text
+    :return: normalized shape
+    """
+    formato = _LISTA_IN.sub("IN (?)", statement)
+    formato = _LITERAIS.sub("?", formato)
+    return _ESPACOS.sub(" ", formato).strip()
+
+
+def _pilha_app():
+    """
+    function to capture the call stack without library frames
+    :return: formatted stack
+    """
+    quadros = [
+        quadro for quadro in traceback.extract_stack()[:-1]
+        if not quadro.filename.startswith(_PREFIXOS_BIBLIOTECAS) and quadro.filename != __file__
+    ]
+    return "".join(traceback.format_list(quadros))
+
+
+def modo_deteccao(app):
+    """
+    function to resolve the detector mode: NPLUSONE_MODE, else "raise" under pytest, "warn" in debug, "off"
+    pytest is detected by its module, not by PYTEST_CURRENT_TEST: that variable only exists while a
+    test runs, not when a conftest builds the app at import or in a session fixture.
+    :param app: flask application
+    :return: detector mode
+    """
+    modo = app.config.get("NPLUSONE_MODE")
+    if modo:
+        return modo
+    if "pytest" in sys.modules:
+        return "raise"
+    if app.debug:
+        return "warn"
+    return "off"
+
+
+def _registrar_formato(conn, cursor, statement, parameters, context, executemany):
+    """
+    SQLAlchemy hook: counts the statement shape in the current request.
+    Connections or statements with execution_options(fora_do_orcamento=True) (infrastructure
+    bookkeeping such as idempotency keys or the audit outbox) are not charged to the route budget.
+    """
+    if not has_request_context() or context.execution_options.get("fora_do_orcamento"):
+        return
+    formatos = g.get("_formatos_queries")
+    if formatos is None:
+        return
+
+    formato = formato_query(statement)
+    formatos[formato] = formatos.get(formato, 0) + 1
+    g._total_queries += 1
+    repetida = formatos[formato] == g._limite_repeticoes
+    if repetida:
+        g._pilhas_repetidas[formato] = _pilha_app()
+
+    if current_app.config.get("_NPLUSONE_MODE") != "raise" or g.get("_violacao_queries"):
+        return
+    orcamento = g.get("_orcamento_queries")
+    if repetida or (orcamento is not None and g._total_queries > orcamento):
+        # Falha no próprio statement: a view ainda não fez commit. O after_request repete o erro
+        # caso a view o tenha engolido num "except Exception"
+        g._violacao_queries = "\n".join(_problemas(formatos, orcamento))
+        raise ConsultasExcessivasError(g._violacao_queries)
+
+
+def _iniciar_deteccao():
+    """
+    before_request hook: starts the per-request shape counters.
+    """
+    view = current_app.view_functions.get(request.endpoint)
+    g._formatos_queries = {}
+    g._pilhas_repetidas = {}
+    g._total_queries = 0
+    g._orcamento_queries = getattr(view, "orcamento_queries", None)
+    g._limite_repeticoes = current_app.config.get("NPLUSONE_THRESHOLD", 3)
+
+
+def _problemas(formatos, orcamento):
+    """
+    function to describe the repeated shapes and the budget overrun of the current request
+    :param formatos: dictionary shape -> executions
+    :param orcamento: query budget of the request (None when the route has none)
+    :return: list of messages
+    """
+    problemas = []
+    for formato, pilha in g._pilhas_repetidas.items():
+        problemas.append(
+            f"Possível N+1 em {request.endpoint}: query executada {formatos[formato]}x\n"
+            f"  {formato}\nOrigem:\n{pilha}"
+        )
+    total = sum(formatos.values())
+    if orcamento is not None and total > orcamento:
+        problemas.append(
+            f"Orçamento de queries excedido em {request.endpoint}: {total} queries (máximo {orcamento})"
+        )
+    return problemas
+
+
+def _verificar_deteccao(response):
+    """
+    after_request hook: reports repeated query shapes and query budget violations.
+    :param response: flask response
+    :return: response
+    """
+    formatos = g.pop("_formatos_queries", None)
+    if formatos is None:
+        return response
+
+    violacao = g.pop("_violacao_queries", None)
+    if violacao:
+        raise ConsultasExcessivasError(violacao)
+
+    problemas = _problemas(formatos, g.get("_orcamento_queries"))
+    if problemas:
+        mensagem = "\n".join(problemas)
+        if current_app.config["_NPLUSONE_MODE"] == "raise":
+            raise ConsultasExcessivasError(mensagem)
+        warnings.warn(mensagem)
+        logger.warning(mensagem)
+    return response
+
+
+def init_deteccao_nplusone(app):
+    """
+    function to enable the N+1 / query budget detector (warn in debug, fail under pytest)
+    :param app: flask application
+    :return: None
+    """
+    modo = modo_deteccao(app)
+    if modo == "off":
+        return
+
+    app.config["_NPLUSONE_MODE"] = modo
+    if not event.contains(Engine, "after_cursor_execute", _registrar_formato):
+        event.listen(Engine, "after_cursor_execute", _registrar_formato)
+    app.before_request(_iniciar_deteccao)
+    app.after_request(_verificar_deteccao)
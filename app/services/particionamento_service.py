@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+import re
+from datetime import date, datetime
+
+from sqlalchemy import Column, MetaData, Table, text
+
+from app.extensions import db
+from app.models.consulta import Consulta
+
+TABELA = Consulta.__tablename__
+TABELA_ARQUIVO = f"{TABELA}_arquivo"
+SCHEMA_ARQUIVO = "arquivo"
+PARTICAO = re.compile(rf"^{TABELA}_p(\d{{4}})_(\d{{2}})$")
+
+
+def is_postgres():
+    """
+    function to check if the current engine is PostgreSQL
+    :return: True for PostgreSQL
+    """
+    return db.engine.dialect.name == "postgresql"
+
+
+def _inicio_mes(valor):
+    """
+    function to truncate a date to the first day of its month
+    :param valor: date or datetime
+    :return: first day of the month
+    """
+    return date(valor.year, valor.month, 1)
+
+
+def _somar_meses(mes, quantidade):
+    """
+    function to shift a month by a number of months
+    :param mes: first day of the month
+    :param quantidade: months to add (may be negative)
+    :return: first day of the resulting month
+    """
+    indice = mes.year * 12 + (mes.month - 1) + quantidade
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nome_particao(mes):
+    """
+    function to build the partition name of a month
+    :param mes: first day of the month
+    :return: partition name (consultas_pYYYY_MM)
+    """
+    return f"{TABELA}_p{mes.year:04d}_{mes.month:02d}"
+
+
+def fora_das_migracoes(objeto, nome, tipo, refletido, comparado):
+    """
+    alembic include_object hook: keeps `flask db migrate` from dropping the tables created here at runtime
+    (monthly partitions, the DEFAULT partition and the SQLite archive), which are not in the models.
+    :return: False for those tables
+    """
+    if tipo == "table" and refletido and comparado is None:
+        return not (PARTICAO.match(nome) or nome in (f"{TABELA}_default", TABELA_ARQUIVO))
+    return True
+
+
+def tabela_particionada(conn):
+    """
+    function to check if consultas is already a partitioned table
+    :param conn: database connection
+    :return: True if consultas is partitioned
+    """
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :tabela AND pg_table_is_visible(c.oid)"
+    ), {"tabela": TABELA}).scalar())
+
+
+def listar_particoes(conn):
+    """
+    function to list the monthly partitions attached to consultas
+    :param conn: database connection
+    :return: list of (month, partition name) ordered by month
+    """
+    nomes = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :tabela"
+    ), {"tabela": TABELA}).scalars()
+    particoes = []
+    for nome in nomes:
+        encontrado = PARTICAO.match(nome)
+        if encontrado:
+            particoes.append((date(int(encontrado.group(1)), int(encontrado.group(2)), 1), nome))
+    return sorted(particoes)
+
+
+def _criar_particao(conn, mes):
+    """
+    function to create the partition of a month if it does not exist
+    PostgreSQL refuses to create it while the DEFAULT partition holds rows of that month. In that case the
+    default is detached, the month's rows are moved to the new partition and the default is reattached,
+    all inside the caller's transaction (the ACCESS EXCLUSIVE lock on consultas is held until it commits).
+    :param conn: database connection inside a transaction
+    :param mes: first day of the month
+    :return: None
+    """
+    nome = nome_particao(mes)
+    if conn.execute(text("SELECT to_regclass(:nome)"), {"nome": nome}).scalar() is not None:
+        return
+    intervalo = {"inicio": mes, "fim": _somar_meses(mes, 1)}
+    criar = text(
+        f"CREATE TABLE {nome} PARTITION OF {TABELA} "
+        f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{intervalo['fim'].isoformat()}')"
+    )
+    padrao = f"{TABELA}_default"
+    no_mes = "data_consulta >= :inicio AND data_consulta < :fim"
+    if conn.execute(text("SELECT to_regclass(:nome)"), {"nome": padrao}).scalar() is None or \
+            not conn.execute(text(f"SELECT 1 FROM {padrao} WHERE {no_mes} LIMIT 1"), intervalo).scalar():
+        conn.execute(criar)
+        return
+
+    conn.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {padrao}"))
+    conn.execute(criar)
+    conn.execute(text(f"INSERT INTO {nome} SELECT * FROM {padrao} WHERE {no_mes}"), intervalo)
+    conn.execute(text(f"DELETE FROM {padrao} WHERE {no_mes}"), intervalo)
+    conn.execute(text(f"ALTER TABLE {TABELA} ATTACH PARTITION {padrao} DEFAULT"))
+
+
+def _converter_tabela(conn):
+    """
+    function to rebuild consultas as a table partitioned by RANGE (data_consulta)
+    :param conn: database connection inside a transaction
+    :return: None
+    """
+    legado = f"{TABELA}_legado"
+    conn.execute(text(f"ALTER TABLE {TABELA} RENAME TO {legado}"))
+    # Os índices mantêm o nome ao renomear a tabela; libera os nomes para a nova tabela
+    for indice in Consulta.__table__.indexes:
+        conn.execute(text(f"ALTER INDEX IF EXISTS {indice.name} RENAME TO {indice.name}_legado"))
+    conn.execute(text(
+        f"CREATE TABLE {TABELA} (LIKE {legado} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE (data_consulta)"
+    ))
+    # A chave de particionamento precisa fazer parte da chave primária
+    conn.execute(text(f"ALTER TABLE {TABELA} ADD PRIMARY KEY (id, data_consulta)"))
+    conn.execute(text(f"ALTER TABLE {TABELA} ADD FOREIGN KEY (paciente_id) REFERENCES pacientes (id)"))
+    conn.execute(text(f"ALTER TABLE {TABELA} ADD FOREIGN KEY (medico_id) REFERENCES medicos (id)"))
+    for indice in Consulta.__table__.indexes:
+        colunas = ", ".join(coluna.name for coluna in indice.columns)
+        conn.execute(text(f"CREATE INDEX {indice.name} ON {TABELA} ({colunas})"))
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {TABELA}_default PARTITION OF {TABELA} DEFAULT"))
+
+    limites = conn.execute(text(f"SELECT min(data_consulta), max(data_consulta) FROM {legado}")).one()
+    if limites[0] is not None:
+        mes = _inicio_mes(limites[0])
+        while mes <= _inicio_mes(limites[1]):
+            _criar_particao(conn, mes)
+            mes = _somar_meses(mes, 1)
+
+    conn.execute(text(f"INSERT INTO {TABELA} SELECT * FROM {legado}"))
+    conn.execute(text(f"ALTER SEQUENCE IF EXISTS {TABELA}_id_seq OWNED BY {TABELA}.id"))
+    conn.execute(text(f"DROP TABLE {legado}"))
+
+
+def garantir_particoes(meses_a_frente=3, hoje=None):
+    """
+    function to make sure consultas is partitioned and has partitions for the coming months
+    :param meses_a_frente: how many months after the current one must already exist
+    :param hoje: reference date (defaults to today)
+    :return: list with the names of the partitions that exist after the call
+    """
+    if not is_postgres():
+        raise Exception("Particionamento nativo disponível apenas no PostgreSQL")
+
+    mes_atual = _inicio_mes(hoje or date.today())
+    with db.engine.begin() as conn:
+        if not tabela_particionada(conn):
+            _converter_tabela(conn)
+        for deslocamento in range(meses_a_frente + 1):
+            _criar_particao(conn, _somar_meses(mes_atual, deslocamento))
+        return [nome for _, nome in listar_particoes(conn)]
+
+
+def _tabela_arquivo_sqlite(conn):
+    """
+    function to create (if needed) the SQLite archive table
+    :param conn: database connection
+    :return: archive table
+    """
+    # Mesmas colunas de consultas, sem FKs nem os índices do caminho quente
+    tabela = Table(TABELA_ARQUIVO, MetaData(), *[
+        Column(coluna.name, coluna.type, primary_key=coluna.primary_key)
+        for coluna in Consulta.__table__.columns
+    ])
+    tabela.create(conn, checkfirst=True)
+    return tabela
+
+
+def arquivar_consultas(meses_retidos=12, hoje=None):
+    """
+    function to archive consultas older than the retention window
+    On PostgreSQL whole monthly partitions are detached and moved to the "arquivo" schema;
+    on SQLite rows are moved to the consultas_arquivo table.
+    :param meses_retidos: number of months (including the current one) kept in the hot table
+    :param hoje: reference date (defaults to today)
+    :return: dictionary describing what was archived
+    """
+    if meses_retidos < 1:
+        raise Exception("meses_retidos deve ser maior ou igual a 1")
+
+    limite = _somar_meses(_inicio_mes(hoje or date.today()), -(meses_retidos - 1))
+
+    with db.engine.begin() as conn:
+        if is_postgres():
+            if not tabela_particionada(conn):
+                raise Exception("Tabela consultas não está particionada. Execute 'flask consultas particionar'")
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA_ARQUIVO}"))
+            arquivadas = []
+            for mes, nome in listar_particoes(conn):
+                if mes >= limite:
+                    break
+                conn.execute(text(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}"))
+                conn.execute(text(f"ALTER TABLE {nome} SET SCHEMA {SCHEMA_ARQUIVO}"))
+                arquivadas.append(f"{SCHEMA_ARQUIVO}.{nome}")
+            return {"limite": limite.isoformat(), "particoes": arquivadas}
+
+        tabela = _tabela_arquivo_sqlite(conn)
+        origem = Consulta.__table__
+        corte = datetime(limite.year, limite.month, 1)
+        colunas = [c.name for c in origem.columns]
+        conn.execute(tabela.insert().from_select(colunas, origem.select().where(origem.c.data_consulta < corte)))
+        movidas = conn.execute(origem.delete().where(origem.c.data_consulta < corte)).rowcount
+        return {"limite": limite.isoformat(), "linhas": movidas, "tabela": TABELA_ARQUIVO}
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request
+
+from app.services.auth_service import usuario_admin
+
+MODOS = ("amostragem", "cprofile")
+EXTENSOES = {"amostragem": "collapsed", "cprofile": "pstats.txt"}
+_ID_PERFIL = re.compile(r"^[\w.-]+$")
+
+
+class AmostradorPilhas:
+    """
+    Sampling profiler: a background thread reads the stack of the profiled thread every
+    intervalo seconds and counts identical stacks in the collapsed format used by flame graphs.
+    """
+
+    def __init__(self, thread_id, intervalo):
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name="profiler-amostragem", daemon=True)
+
+    def iniciar(self):
+        """
+        function to start sampling
+        :return: None
+        """
+        self._thread.start()
+
+    def parar(self):
+        """
+        function to stop sampling and wait for the sampler thread
+        :return: None
+        """
+        self._parar.set()
+        self._thread.join()
+
+    def _amostrar(self):
+        """
+        sampler loop: walks the profiled thread's frames from leaf to root.
+        """
+        while not self._parar.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            quadros = []
+            while frame is not None:
+                codigo = frame.f_code
+                quadros.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                frame = frame.f_back
+            if quadros:
+                self.pilhas[";".join(reversed(quadros))] += 1
+            time.sleep(self.intervalo)
+
+    def collapsed(self):
+        """
+        function to render the samples in collapsed-stack format ("a;b;c count" per line)
+        :return: text
+        """
+        return "".join(f"{pilha} {quantidade}\n" for pilha, quantidade in self.pilhas.most_common())
+
+
+def modo_solicitado():
+    """
+    function to read the profiling mode asked by the request (?_profile= or X-Profile header)
+    :return: mode name or None
+    """
+    valor = request.args.get("_profile") or request.headers.get("X-Profile")
+    if not valor or valor.lower() in ("0", "false"):
+        return None
+    return "cprofile" if valor.lower() == "cprofile" else "amostragem"
+
+
+def _iniciar_perfil():
+    """
+    before_request hook: starts a profiler for admin requests that ask for one.
+    """
+    modo = modo_solicitado()
+    if modo is None or not usuario_admin():
+        return
+
+    if modo == "cprofile":
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+    else:
+        intervalo = current_app.config.get("PROFILE_SAMPLE_INTERVAL_MS", 1) / 1000
+        perfilador = AmostradorPilhas(threading.get_ident(), intervalo)
+        perfilador.iniciar()
+    g._perfil = (modo, perfilador, time.perf_counter())
+
+
+def _finalizar_perfil(response):
+    """
+    after_request hook: stops the profiler, stores the result and points to it in headers.
+    :param response: flask response
+    :return: response with X-Profile-Id
+    """
+    perfil = g.pop("_perfil", None)
+    if perfil is None:
+        return response
+
+    modo, perfilador, inicio = perfil
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if modo == "cprofile":
+        perfilador.disable()
+        saida = io.StringIO()
+        pstats.Stats(perfilador, stream=saida).sort_stats("cumulative").print_stats(60)
+        conteudo = saida.getvalue()
+    else:
+        perfilador.parar()
+        conteudo = perfilador.collapsed()
+
+    endpoint = (request.endpoint or "sem-endpoint").replace(".", "-")
+    perfil_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}"
+    diretorio = current_app.config["PROFILE_DIR"]
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, f"{perfil_id}.{EXTENSOES[modo]}"), "w", encoding="utf-8") as arquivo:
+        arquivo.write(conteudo)
+
+    response.headers["X-Profile-Id"] = perfil_id
+    response.headers["X-Profile-Duration-Ms"] = f"{duracao_ms:.2f}"
+    return response
+
+
+def listar_perfis():
+    """
+    function to list the stored profiles, most recent first
+    :return: list of dictionaries (id, modo, tamanho)
+    """
+    diretorio = current_app.config["PROFILE_DIR"]
+    if not os.path.isdir(diretorio):
+        return []
+    perfis = []
+    for nome in sorted(os.listdir(diretorio), reverse=True):
+        for modo, extensao in EXTENSOES.items():
+            if nome.endswith(f".{extensao}"):
+                perfis.append({
+                    "id": nome[:-len(extensao) - 1],
+                    "modo": modo,
+                    "tamanho_bytes": os.path.getsize(os.path.join(diretorio, nome)),
+                })
+    return perfis
+
+
+def caminho_perfil(perfil_id):
+    """
+    function to resolve the file of a stored profile
+    :param perfil_id: profile identifier (X-Profile-Id)
+    :return: absolute path
+    """
+    if not _ID_PERFIL.match(perfil_id):
+        raise Exception("Identificador de perfil inválido")
+    diretorio = current_app.config["PROFILE_DIR"]
+    for extensao in EXTENSOES.values():
+        caminho = os.path.join(diretorio, f"{perfil_id}.{extensao}")
+        if os.path.exists(caminho):
+            return caminho
+    raise Exception("Perfil não encontrado")
+
+
+def init_profiling(app):
+    """
+    function to enable on-demand request profiling for admin JWTs (?_profile=1 or X-Profile: 1)
+    :param app: flask application
+    :return: None
+    """
+    if not app.config.get("PROFILING_ENABLED", True):
+        return
+
+    app.before_request(_iniciar_perfil)
+    app.after_request(_finalizar_perfil)
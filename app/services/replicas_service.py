@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, request
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.services.limite_requisicoes_service import caminho_padrao, identidade_cliente
+from app.services.metricas_service import registrar_roteamento
+
+logger = logging.getLogger("curasys.replicas")
+
+COOKIE_PRIMARIO = "curasys_primario_ate"
+# Mesmo instante do cookie, para clientes de API que não guardam cookies e o devolvem no pedido seguinte
+CABECALHO_PRIMARIO = "X-Primario-Ate"
+METODOS_LEITURA = ("GET", "HEAD")
+
+# Atraso replicado em segundos: 0 quando a réplica já aplicou tudo o que recebeu (sem escrita
+# recente no primário, pg_last_xact_replay_timestamp() envelhece sem haver atraso real)
+SQL_ATRASO = {
+    "postgresql": "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                  "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END",
+}
+
+# Estado do processo: cada worker do gunicorn confere o atraso das réplicas por conta própria
+_lock = threading.Lock()
+_atrasos = {}
+
+
+def replicas(app):
+    """
+    function to list the bind names of the configured read replicas
+    :param app: flask application
+    :return: list of bind names
+    """
+    return [f"replica_{indice}" for indice in range(len(app.config["REPLICA_DATABASE_URLS"]))]
+
+
+def medir_atraso(engine, sql):
+    """
+    function to measure the replication lag of a replica
+    :param engine: replica engine
+    :param sql: query returning the lag in seconds, or None to use the dialect default
+    :return: lag in seconds (0 when the dialect has no way to tell, e.g. a SQLite copy)
+    """
+    sql = sql or SQL_ATRASO.get(engine.dialect.name)
+    if sql is None:
+        return 0.0
+    with engine.connect().execution_options(fora_do_orcamento=True) as conexao:
+        return float(conexao.execute(text(sql)).scalar() or 0)
+
+
+def atraso_replica(app, nome):
+    """
+    function to get the replication lag of a replica, cached for REPLICA_LAG_CHECK_SECONDS
+    :param app: flask application
+    :param nome: replica bind name
+    :return: lag in seconds, or None when the replica is unreachable
+    """
+    agora = time.monotonic()
+    atraso, verificado_em = _atrasos.get(nome, (None, float("-inf")))
+    if agora - verificado_em < app.config["REPLICA_LAG_CHECK_SECONDS"]:
+        return atraso
+    with _lock:
+        atraso, verificado_em = _atrasos.get(nome, (None, float("-inf")))
+        if agora - verificado_em < app.config["REPLICA_LAG_CHECK_SECONDS"]:
+            return atraso
+        try:
+            atraso = medir_atraso(db.engines[nome], app.config.get("REPLICA_LAG_SQL"))
+        except Exception as e:
+            logger.warning("Réplica %s indisponível: %s", nome, e)
+            atraso = None
+        _atrasos[nome] = (atraso, agora)
+    return atraso
+
+
+def escolher_replica(app):
+    """
+    function to pick a replica for a read-only request among those within REPLICA_MAX_LAG_SECONDS
+    :param app: flask application
+    :return: (bind name, or None for the primary; reason)
+    """
+    candidatas = []
+    motivo = "atraso"
+    for nome in replicas(app):
+        atraso = atraso_replica(app, nome)
+        if atraso is None:
+            motivo = "indisponivel"
+        elif atraso <= app.config["REPLICA_MAX_LAG_SECONDS"]:
+            candidatas.append(nome)
+    if not candidatas:
+        return None, motivo
+    return random.choice(candidatas), "replica"
+
+
+class JanelasPrimario:
+    """
+    Read-your-writes windows per client identity (JWT user, otherwise IP) in a SQLite file shared by
+    every worker of the host, in /dev/shm like the rate limit buckets: a client that keeps neither the
+    cookie nor the header still reads its own writes, whichever worker serves the next request.
+    """
+
+    def __init__(self, app):
+        self.caminho = app.config.get("REPLICA_STICKY_STORAGE_PATH") or caminho_padrao(app, "primario")
+        self._lock = threading.Lock()
+        self._conexao = None
+        self._pid = None
+
+    def _conectar(self):
+        # Uma conexão por processo, aberta sob demanda: nunca atravessa o fork dos workers
+        if self._pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=OFF")
+            conexao.execute("CREATE TABLE IF NOT EXISTS janelas (identidade TEXT PRIMARY KEY, ate REAL NOT NULL) "
+                            "WITHOUT ROWID")
+            self._conexao, self._pid = conexao, os.getpid()
+        return self._conexao
+
+    def marcar(self, identidade, ate):
+        """
+        function to keep a client on the primary until a moment
+        :param identidade: client identity (see identidade_cliente)
+        :param ate: epoch seconds
+        :return: None
+        """
+        with self._lock:
+            conexao = self._conectar()
+            conexao.execute("INSERT INTO janelas (identidade, ate) VALUES (?, ?) ON CONFLICT (identidade) "
+                            "DO UPDATE SET ate = max(ate, excluded.ate)", (identidade, ate))
+            # Janela vencida equivale a janela inexistente: de vez em quando remove as vencidas
+            if random.random() < 0.01:
+                conexao.execute("DELETE FROM janelas WHERE ate < ?", (time.time(),))
+
+    def ate(self, identidade):
+        """
+        function to read until when a client stays on the primary
+        :param identidade: client identity
+        :return: epoch seconds (0 when the client has no window)
+        """
+        with self._lock:
+            linha = self._conectar().execute("SELECT ate FROM janelas WHERE identidade = ?", (identidade,)).fetchone()
+        return linha[0] if linha else 0.0
+
+
+def _identidade():
+    return identidade_cliente(request.headers.get("Authorization"), request.remote_addr)
+
+
+def _escrita_recente():
+    """
+    function to check whether the client wrote less than REPLICA_STICKY_SECONDS ago: by its identity,
+    or by the cookie / X-Primario-Ate header it sent back (the only signals shared between hosts)
+    :return: True while the client's last write is younger than REPLICA_STICKY_SECONDS
+    """
+    agora = time.time()
+    for valor in (request.cookies.get(COOKIE_PRIMARIO), request.headers.get(CABECALHO_PRIMARIO)):
+        try:
+            if valor and float(valor) > agora:
+                return True
+        except ValueError:
+            pass
+    try:
+        return current_app.extensions["replicas_janelas"].ate(_identidade()) > agora
+    except Exception as e:
+        # Sem como saber se o cliente escreveu: o primário sempre tem os dados dele
+        logger.warning("Janelas de leitura no primário indisponíveis: %s", e)
+        return True
+
+
+def _antes_requisicao():
+    """
+    before_request hook: chooses the replica the SELECTs of a read-only request go to.
+    """
+    if request.method not in METODOS_LEITURA:
+        return
+    if _escrita_recente():
+        registrar_roteamento("primario", "escrita_recente")
+        return
+    nome, motivo = escolher_replica(current_app)
+    registrar_roteamento(nome or "primario", motivo)
+    if nome is not None:
+        g._replica_leitura = db.engines[nome]
+
+
+def _depois_requisicao(response):
+    """
+    after_request hook: keeps a client that has just written on the primary for REPLICA_STICKY_SECONDS
+    (identity window, cookie and X-Primario-Ate header).
+    :param response: flask response
+    :return: response
+    """
+    if g.pop("_escreveu", False):
+        janela = current_app.config["REPLICA_STICKY_SECONDS"]
+        ate = time.time() + janela
+        response.set_cookie(COOKIE_PRIMARIO, str(ate), max_age=math.ceil(janela), httponly=True, samesite="Lax")
+        response.headers[CABECALHO_PRIMARIO] = f"{ate:.3f}"
+        try:
+            current_app.extensions["replicas_janelas"].marcar(_identidade(), ate)
+        except Exception as e:
+            logger.warning("Janelas de leitura no primário indisponíveis: %s", e)
+    return response
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_escrita(session, flush_context):
+    """
+    SQLAlchemy hook: the request wrote through the ORM.
+    """
+    if g:
+        g._escreveu = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcar_escrita_em_massa(orm_execute_state):
+    """
+    SQLAlchemy hook: the request ran an ORM-enabled INSERT/UPDATE/DELETE (e.g. query.update()).
+    """
+    if g and (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        g._escreveu = True
+
+
+def init_replicas(app):
+    """
+    function to route the reads of GET/HEAD requests to the replicas of REPLICA_DATABASE_URLS
+    :param app: flask application
+    :return: None
+    """
+    if not app.config["REPLICA_DATABASE_URLS"]:
+        return
+    app.extensions["replicas_janelas"] = JanelasPrimario(app)
+    app.before_request(_antes_requisicao)
+    app.after_request(_depois_requisicao)
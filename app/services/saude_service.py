@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoTimeoutError
+
+from sqlalchemy import inspect, text
+
+from app.extensions import db
+from app.services.metricas_service import registrar_cache
+
+logger = logging.getLogger("curasys.saude")
+
+# Estado do processo: cada worker do gunicorn cacheia a sua própria verificação
+_lock = threading.Lock()
+_cache = {"resultado": None, "expira_em": 0.0}
+_revisoes_esperadas = {}
+_executor = None
+_verificacao_pendente = None
+
+
+class BancoIndisponivelError(Exception):
+    pass
+
+
+def revisoes_esperadas(diretorio):
+    """
+    function to read the alembic head revisions of the migrations directory (once per process)
+    :param diretorio: migrations directory
+    :return: set of head revisions, or None when the project has no migrations
+    """
+    if diretorio not in _revisoes_esperadas:
+        if not os.path.isdir(diretorio):
+            _revisoes_esperadas[diretorio] = None
+        else:
+            from alembic.script import ScriptDirectory  # só quando há migrações a conferir
+
+            _revisoes_esperadas[diretorio] = set(ScriptDirectory(diretorio).get_heads())
+    return _revisoes_esperadas[diretorio]
+
+
+def _verificar(app):
+    """
+    function to check the database: pooled checkout, SELECT 1 and the applied migration version
+    :param app: flask application
+    :return: dictionary of checks
+    """
+    with app.app_context():
+        inicio = time.perf_counter()
+        with db.engine.connect() as conexao:
+            conexao.execute(text("SELECT 1"))
+            banco_ms = round((time.perf_counter() - inicio) * 1000, 2)
+
+            esperadas = revisoes_esperadas(app.config["MIGRATIONS_DIR"])
+            if esperadas is None:
+                return {"banco": {"ok": True, "ms": banco_ms}, "migracoes": {"ok": True, "detalhe": "sem migrações"}}
+
+            aplicadas = set()
+            if inspect(conexao).has_table("alembic_version"):
+                aplicadas = {linha[0] for linha in conexao.execute(text("SELECT version_num FROM alembic_version"))}
+            return {
+                "banco": {"ok": True, "ms": banco_ms},
+                "migracoes": {"ok": aplicadas == esperadas, "aplicadas": sorted(aplicadas), "esperadas": sorted(esperadas)},
+            }
+
+
+def prontidao(app):
+    """
+    function to compute (or reuse) the readiness of the application
+    The result is cached for READINESS_CACHE_SECONDS so orchestrator probes do not hit the database
+    on every call, and a check that exceeds READINESS_TIMEOUT_SECONDS reports not ready without
+    piling up: the next probes wait on the same pending check instead of opening new connections.
+    :param app: flask application
+    :return: (pronto, dictionary of checks)
+    """
+    global _executor, _verificacao_pendente
+    agora = time.monotonic()
+    with _lock:
+        if _cache["resultado"] is not None and agora < _cache["expira_em"]:
+            registrar_cache("readyz", True)
+            return _cache["resultado"]
+        registrar_cache("readyz", False)
+
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readyz")
+        if _verificacao_pendente is None or _verificacao_pendente.done():
+            _verificacao_pendente = _executor.submit(_verificar, app)
+        futuro = _verificacao_pendente
+
+    # A espera fica fora do lock: probes concorrentes aguardam o mesmo futuro, e um acerto de cache
+    # de outra thread não fica preso atrás de um banco lento
+    try:
+        verificacoes = futuro.result(timeout=app.config["READINESS_TIMEOUT_SECONDS"])
+    except FuturoTimeoutError:
+        verificacoes = {"banco": {"ok": False, "erro": "tempo esgotado aguardando o banco"}}
+    except Exception as e:
+        verificacoes = {"banco": {"ok": False, "erro": str(e)}}
+
+    resultado = (all(v["ok"] for v in verificacoes.values()), verificacoes)
+    with _lock:
+        _cache["resultado"] = resultado
+        _cache["expira_em"] = time.monotonic() + app.config["READINESS_CACHE_SECONDS"]
+    return resultado
+
+
+def aguardar_banco(app, tempo_maximo, espera_inicial=0.5, espera_maxima=5.0):
+    """
+    function to block until the database accepts connections, retrying with exponential backoff and jitter
+    The pool is disposed afterwards so no connection is inherited by forked workers.
+    :param app: flask application
+    :param tempo_maximo: seconds to keep trying
+    :param espera_inicial: first wait between attempts (seconds)
+    :param espera_maxima: cap for the wait between attempts (seconds)
+    :return: number of attempts
+    """
+    limite = time.monotonic() + tempo_maximo
+    espera = espera_inicial
+    tentativa = 0
+    with app.app_context():
+        while True:
+            tentativa += 1
+            try:
+                with db.engine.connect() as conexao:
+                    conexao.execute(text("SELECT 1"))
+                db.engine.dispose()
+                logger.info("Banco disponível após %d tentativa(s)", tentativa)
+                return tentativa
+            except Exception as e:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise BancoIndisponivelError(f"Banco indisponível após {tentativa} tentativa(s): {e}") from e
+                logger.warning("Banco indisponível (tentativa %d): %s", tentativa, e)
+                time.sleep(min(restante, espera * random.uniform(0.5, 1.0)))
+                espera = min(espera * 2, espera_maxima)
+
+
+def init_saude(app):
+    """
+    function to wait for the database at startup when WAIT_FOR_DB_SECONDS is set
+    :param app: flask application
+    :return: None
+    """
+    if app.config.get("WAIT_FOR_DB_SECONDS", 0) > 0:
+        aguardar_banco(app, app.config["WAIT_FOR_DB_SECONDS"])
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+from app.services.instrumentacao_service import registrar_observador_query
+
+logger = logging.getLogger("curasys.slow_query")
+
+# Literais no texto do SQL (ou nos planos do EXPLAIN, que trazem os valores já interpolados)
+_LITERAIS_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAIS_NUMERICOS = re.compile(r"\b\d{4,}\b")
+
+# Estado do processo: cada worker do gunicorn mantém o seu próprio buffer
+_config = {"limite_segundos": None, "amostragem_explain": 0.0}
+_buffer = deque(maxlen=100)
+_lock = threading.Lock()
+_sequencia = itertools.count(1)
+_executor_explain = None
+
+
+def mascarar_valor(valor):
+    """
+    function to drop the value of bound parameters, keeping only their shape and types
+    No value is kept: names, birth dates and free text are as sensitive as CPFs or e-mails.
+    :param valor: parameter value
+    :return: placeholder such as "<str>", with lists and dicts kept as structure
+    """
+    if isinstance(valor, (list, tuple)):
+        return [mascarar_valor(v) for v in valor]
+    if isinstance(valor, dict):
+        return {chave: mascarar_valor(v) for chave, v in valor.items()}
+    if valor is None:
+        return None
+    return f"<{type(valor).__name__}>"
+
+
+def mascarar_sql(texto):
+    """
+    function to mask literals written into SQL text (inline values, EXPLAIN plans)
+    :param texto: SQL text or plan fragment
+    :return: text with string literals and long numbers replaced
+    """
+    texto = _LITERAIS_TEXTO.sub("'***'", texto)
+    return _LITERAIS_NUMERICOS.sub("***", texto)
+
+
+def _mascarar_plano(plano):
+    """
+    function to mask every string of an EXPLAIN (FORMAT JSON) plan
+    :param plano: decoded plan
+    :return: masked plan
+    """
+    if isinstance(plano, str):
+        return mascarar_sql(plano)
+    if isinstance(plano, list):
+        return [_mascarar_plano(item) for item in plano]
+    if isinstance(plano, dict):
+        return {chave: _mascarar_plano(valor) for chave, valor in plano.items()}
+    return plano
+
+
+def _origem():
+    """
+    function to describe where the statement came from
+    :return: endpoint name, or the thread name outside requests
+    """
+    if has_request_context():
+        return request.endpoint or request.path
+    return threading.current_thread().name
+
+
+def _explicar(engine, registro, statement, parameters):
+    """
+    function to capture EXPLAIN (ANALYZE, BUFFERS) of a slow SELECT on a separate connection
+    The statement really runs again, so this is done in background, read-only, and sampled.
+    :return: None
+    """
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+            plano = conn.exec_driver_sql(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+            ).scalar()
+            conn.rollback()
+        registro["plano"] = _mascarar_plano(plano if not isinstance(plano, str) else json.loads(plano))
+    except Exception as e:
+        registro["plano_erro"] = str(e)
+
+
+def _observar(conn, statement, parameters, duracao):
+    """
+    query observer: records statements slower than the configured threshold
+    """
+    limite = _config["limite_segundos"]
+    if limite is None or duracao < limite:
+        return
+
+    registro = {
+        "id": next(_sequencia),
+        "registrado_em": datetime.now(timezone.utc).isoformat(),
+        "origem": _origem(),
+        "duracao_ms": round(duracao * 1000, 2),
+        "statement": mascarar_sql(statement),
+        "parametros": mascarar_valor(parameters),
+    }
+    with _lock:
+        _buffer.append(registro)
+    logger.warning(json.dumps({"evento": "slow_query", **registro}, ensure_ascii=False, default=str))
+
+    if (_executor_explain is not None
+            and conn.engine.dialect.name == "postgresql"
+            and statement.lstrip()[:6].upper() == "SELECT"
+            and random.random() < _config["amostragem_explain"]):
+        _executor_explain.submit(_explicar, conn.engine, registro, statement, parameters)
+
+
+def listar_slow_queries(limite=None):
+    """
+    function to list the slow queries recorded by this process, most recent first
+    :param limite: maximum number of entries
+    :return: list of dictionaries
+    """
+    with _lock:
+        registros = list(reversed(_buffer))
+    return registros[:limite] if limite else registros
+
+
+def limpar_slow_queries():
+    """
+    function to clear the ring buffer
+    :return: None
+    """
+    with _lock:
+        _buffer.clear()
+
+
+def init_slow_query(app):
+    """
+    function to enable the slow query recorder
+    :param app: flask application
+    :return: None
+    """
+    global _buffer, _executor_explain
+    limite_ms = app.config.get("SLOW_QUERY_THRESHOLD_MS")
+    if limite_ms is None or limite_ms < 0:
+        return
+
+    _config["limite_segundos"] = limite_ms / 1000
+    _config["amostragem_explain"] = app.config.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.0)
+    _buffer = deque(_buffer, maxlen=app.config.get("SLOW_QUERY_BUFFER_SIZE", 100))
+    if _config["amostragem_explain"] > 0 and _executor_explain is None:
+        _executor_explain = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+    registrar_observador_query(_observar)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+
+from flask_sqlalchemy.session import Session
+
+from app.extensions import db
+
+
+class _SessaoDaConexao(Session):
+    """
+    Session pinned to one connection: Flask-SQLAlchemy's get_bind always picks the engine, which
+    would open a new connection outside the shared transaction.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return bind if bind is not None else self.bind
+
+
+def confirmar():
+    """
+    function to commit the current session without expiring the objects it wrote
+    After the flush the written rows are already in the objects (server defaults come back in the
+    INSERT ... RETURNING), so expiring them would only cost one more SELECT to serialize the response.
+    :return: None
+    """
+    sessao = db.session()
+    expirar = sessao.expire_on_commit
+    sessao.expire_on_commit = False
+    try:
+        sessao.commit()
+    finally:
+        sessao.expire_on_commit = expirar
+
+
+def queries_de_abertura():
+    """
+    function to tell how many statements transacao_unica runs by itself before the first controller
+    call (the BEGIN IMMEDIATE of SQLite), for the query budget of the routes that use it
+    :return: number of statements
+    """
+    return 1 if db.engine.dialect.name == "sqlite" else 0
+
+
+@contextmanager
+def transacao_unica():
+    """
+    context manager to run several controller calls in one database transaction with one commit
+    While it is active, db.session (and Model.query) of the current app context is a session joined
+    to an outer transaction in "create_savepoint" mode: each controller's commit() only releases a
+    SAVEPOINT and its rollback() only undoes its own work. The outer transaction is committed when
+    the block exits normally and rolled back when it raises.
+    :return: None
+    """
+    anterior = db.session.registry()
+    with db.engine.connect() as conexao:
+        transacao = conexao.begin()
+        if conexao.dialect.name == "sqlite":
+            # O pysqlite não abre a transação antes de um SAVEPOINT (cada RELEASE viraria um commit);
+            # IMMEDIATE já reserva a escrita e evita SQLITE_BUSY ao promover uma leitura no WAL.
+            # Conta no orçamento de queries da requisição: veja queries_de_abertura.
+            conexao.exec_driver_sql("BEGIN IMMEDIATE")
+        sessao = _SessaoDaConexao(**{
+            **db.session.session_factory.kw,
+            "bind": conexao,
+            "join_transaction_mode": "create_savepoint",
+            # Nada é visível fora da transação até o commit final: não há o que recarregar a cada savepoint
+            "expire_on_commit": False,
+        })
+        db.session.registry.set(sessao)
+        try:
+            yield
+            transacao.commit()
+        except BaseException:
+            transacao.rollback()
+            raise
+        finally:
+            sessao.close()
+            db.session.registry.set(anterior)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import re
+from datetime import date, time
+
+_DATA = re.compile(r"(\d{2})-(\d{2})-(\d{4})")
+_HORA = re.compile(r"(\d{2}):(\d{2})")
+_EMAIL = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+_SEPARADORES_CPF = re.compile(r"[.\-\s]")
+_PESOS_CPF = (tuple(range(10, 1, -1)), tuple(range(11, 1, -1)))
+# Campos de to_dict() que o banco controla: um cliente que devolve o recurso lido no PUT os reenvia
+SOMENTE_LEITURA = ("id", "criado_em", "versao")
+
+
+class ValidacaoError(Exception):
+    """
+    Raised when a request body does not match its schema; erros lists every invalid field.
+    """
+
+    def __init__(self, erros):
+        super().__init__("Dados inválidos")
+        self.erros = erros
+
+
+def _digito_cpf(digitos, pesos):
+    """
+    function to compute one CPF check digit
+    :param digitos: digits (ints) the check digit is computed from
+    :param pesos: weight of each digit
+    :return: check digit
+    """
+    resto = sum(d * p for d, p in zip(digitos, pesos)) * 10 % 11
+    return 0 if resto == 10 else resto
+
+
+def completar_cpf(base):
+    """
+    function to append the two check digits to a 9-digit CPF base
+    :param base: string with 9 digits
+    :return: 11-digit CPF
+    """
+    digitos = [int(c) for c in base]
+    digitos.append(_digito_cpf(digitos, _PESOS_CPF[0]))
+    digitos.append(_digito_cpf(digitos, _PESOS_CPF[1]))
+    return "".join(map(str, digitos))
+
+
+def limpar_cpf(valor):
+    """
+    function to normalize a CPF (dots, dash and spaces removed) and check its digits
+    :param valor: CPF as typed by the user
+    :return: 11-digit CPF
+    """
+    cpf = _SEPARADORES_CPF.sub("", str(valor))
+    if not (len(cpf) == 11 and cpf.isdigit()) or cpf == cpf[0] * 11 or completar_cpf(cpf[:9]) != cpf:
+        raise ValueError("CPF inválido")
+    return cpf
+
+
+def _texto(campo):
+    maximo = campo.max_len
+
+    def converter(valor):
+        if not isinstance(valor, str):
+            raise ValueError("Deve ser um texto")
+        valor = valor.strip()
+        if not valor:
+            raise ValueError("Não pode ser vazio")
+        if maximo is not None and len(valor) > maximo:
+            raise ValueError(f"Máximo de {maximo} caracteres")
+        return valor
+    return converter
+
+
+def _senha(campo):
+    def converter(valor):
+        if not isinstance(valor, str):
+            raise ValueError("Deve ser um texto")
+        return valor
+    return converter
+
+
+def _id(campo):
+    def converter(valor):
+        if isinstance(valor, bool) or not isinstance(valor, int) or valor < 1:
+            raise ValueError("Deve ser um número inteiro positivo")
+        return valor
+    return converter
+
+
+def _data(campo):
+    def converter(valor):
+        if isinstance(valor, date):
+            return valor
+        partes = _DATA.fullmatch(valor) if isinstance(valor, str) else None
+        try:
+            return date(int(partes[3]), int(partes[2]), int(partes[1]))
+        except (TypeError, ValueError):
+            raise ValueError("Data inválida. Use DD-MM-YYYY")
+    return converter
+
+
+def _hora(campo):
+    def converter(valor):
+        if isinstance(valor, time):
+            return valor
+        partes = _HORA.fullmatch(valor) if isinstance(valor, str) else None
+        try:
+            return time(int(partes[1]), int(partes[2]))
+        except (TypeError, ValueError):
+            raise ValueError("Hora inválida. Use HH:MM")
+    return converter
+
+
+def _cpf(campo):
+    def converter(valor):
+        if not isinstance(valor, (str, int)) or isinstance(valor, bool):
+            raise ValueError("CPF inválido")
+        return limpar_cpf(valor)
+    return converter
+
+
+def _email(campo):
+    texto = _texto(campo)
+
+    def converter(valor):
+        valor = texto(valor)
+        if not _EMAIL.fullmatch(valor):
+            raise ValueError("Email inválido")
+        return valor
+    return converter
+
+
+def _opcao(campo):
+    opcoes = frozenset(campo.opcoes)
+    mensagem = f"Valor inválido. Use: {', '.join(campo.opcoes)}"
+
+    def converter(valor):
+        if not isinstance(valor, str) or valor not in opcoes:
+            raise ValueError(mensagem)
+        return valor
+    return converter
+
+
+# tipo do campo -> fábrica do conversor (chamada uma vez, na declaração do esquema)
+CONVERSORES = {
+    "texto": _texto,
+    "senha": _senha,
+    "id": _id,
+    "data": _data,
+    "hora": _hora,
+    "cpf": _cpf,
+    "email": _email,
+    "opcao": _opcao,
+}
+
+
+class Campo:
+    """
+    Declaration of one field of a request body.
+    """
+
+    def __init__(self, tipo, obrigatorio=False, max_len=None, opcoes=None):
+        if tipo not in CONVERSORES:
+            raise ValueError(f"Tipo de campo desconhecido: {tipo}")
+        self.tipo = tipo
+        self.obrigatorio = obrigatorio
+        self.max_len = max_len
+        self.opcoes = tuple(opcoes or ())
+
+
+class Esquema:
+    """
+    Whitelist of the fields a resource accepts, compiled once into one converter per field.
+    validar() checks the body without touching the database, so an invalid request costs no query.
+    The resource's read-only fields (somente_leitura) are dropped silently; any other unknown key is an error.
+    """
+
+    def __init__(self, somente_leitura=SOMENTE_LEITURA, **campos):
+        self._permitidos = frozenset(campos)
+        self._ignorados = frozenset(somente_leitura) - self._permitidos
+        self._campos = tuple((nome, campo.obrigatorio, CONVERSORES[campo.tipo](campo))
+                             for nome, campo in campos.items())
+
+    def validar(self, dados, parcial=False):
+        """
+        function to validate and convert a request body
+        :param dados: JSON body
+        :param parcial: True for updates (required fields may be omitted, but not blanked)
+        :return: dictionary with only the declared fields, converted
+        """
+        if not isinstance(dados, dict):
+            raise ValidacaoError([{"campo": None, "erro": "O corpo deve ser um objeto JSON"}])
+        erros = [{"campo": nome, "erro": "Campo não permitido"}
+                 for nome in sorted(dados.keys() - self._permitidos - self._ignorados)]
+        limpos = {}
+        for nome, obrigatorio, converter in self._campos:
+            if nome not in dados:
+                if obrigatorio and not parcial:
+                    erros.append({"campo": nome, "erro": "Campo obrigatório"})
+                continue
+            valor = dados[nome]
+            if valor is None or valor == "":
+                if obrigatorio:
+                    erros.append({"campo": nome, "erro": "Campo obrigatório"})
+                else:
+                    limpos[nome] = None
+                continue
+            try:
+                limpos[nome] = converter(valor)
+            except ValueError as e:
+                erros.append({"campo": nome, "erro": str(e)})
+        if erros:
+            raise ValidacaoError(erros)
+        return limpos
@@ -0,0 +1,10 @@
+import gc
+
+from app.asgi import criar_app_asgi
+
+# Modo assíncrono: leituras pesadas com SQLAlchemy asyncio, demais rotas no Flask (ver app/asgi.py).
+#   GUNICORN_WORKER_CLASS=uvicorn gunicorn -c gunicorn.conf.py asgi:app
+app = criar_app_asgi()
+
+# Mesmo motivo do wsgi.py: preserva o copy-on-write com `--preload`
+gc.freeze()
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of every blueprint route through the Flask test client, with a regression gate.
+
+Uso:
+    python -m benchmarks.bench_endpoints                       # compara com benchmarks/baseline.json
+    python -m benchmarks.bench_endpoints --atualizar-baseline  # grava os resultados como nova baseline
+    BENCH_POSTGRES_URL=postgresql://... python -m benchmarks.bench_endpoints
+
+Cada banco roda em um processo separado (DATABASE_URL é lido na importação do app).
+O processo termina com código 1 quando alguma rota regride além do limite ou responde com um status
+fora de 2xx (nem a baseline é gravada nesse caso: medir respostas de erro não diz nada sobre a rota).
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+BASELINE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+RESERVA_DELECAO = "reserva"
+# Rotas cujo cenário não pode responder 2xx. Médicos não têm CPF no modelo: a busca sempre responde 404
+STATUS_ESPERADOS = {
+    "medicos.search_medico_cpf": {404},
+}
+
+
+def _percentil(valores, percentual):
+    """
+    function to compute a percentile (nearest rank) of a list of values
+    :param valores: list of values
+    :param percentual: percentile between 0 and 100
+    :return: percentile value
+    """
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(percentual / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def cenarios(ctx):
+    """
+    function to describe how each endpoint is exercised
+    Each scenario maps an endpoint to a request factory receiving the iteration number.
+    Routes that delete rows consume ids reserved by preparar_reservas. Routes run in endpoint order,
+    so a scenario must not change data read by a later one (e.g. put_paciente keeps the CPFs).
+    :param ctx: benchmark context (volumes, reserved ids, admin headers and a stored profile)
+    :return: dictionary endpoint -> callable(i) returning (method, url, kwargs)
+    """
+    from app.services.validacao_service import completar_cpf
+    from benchmarks.seed import SENHA_PADRAO
+
+    v = ctx["volumes"]
+    reserva = ctx[RESERVA_DELECAO]
+    admin = {"headers": ctx["admin"]}
+
+    def paciente(i):
+        return 1 + i % v["pacientes"]
+
+    def medico(i):
+        return 1 + i % v["medicos"]
+
+    def ids(total, i, quantidade=50):
+        return {"json": {"ids": [1 + (i + passo * 7) % total for passo in range(quantidade)]}}
+
+    return {
+        "admin.listar_slow_queries": lambda i: ("get", "/admin/slow-queries", admin),
+        "admin.limpar_slow_queries": lambda i: ("delete", "/admin/slow-queries", admin),
+        "admin.listar_perfis": lambda i: ("get", "/admin/perfis", admin),
+        "admin.baixar_perfil": lambda i: ("get", f"/admin/perfis/{ctx['perfil_id']}", admin),
+
+        "alteracoes.listar_alteracoes": lambda i: ("get", "/changes", {"query_string": {"since": i, "limit": 100}}),
+
+        "lote.executar_lote": lambda i: ("post", "/batch", {"json": {"operacoes": [
+            {"recurso": "pacientes", "operacao": "criar", "ref": "p", "dados": {
+                "nome": "Paciente Lote", "data_nascimento": "01-01-1990", "cpf": completar_cpf(f"6{i:08d}")}},
+            {"recurso": "exames", "operacao": "criar", "dados": {"id_paciente": {"$ref": "p"}, "tipo": "hemograma"}},
+            {"recurso": "consultas", "operacao": "atualizar", "id": 1 + i % v["consultas"],
+             "dados": {"status": "realizada"}},
+        ]}}),
+
+        "users.get_users": lambda i: ("get", "/users/", {}),
+        "users.get_user": lambda i: ("get", f"/users/{1 + i % v['usuarios']}", {}),
+        "users.post_user": lambda i: ("post", "/users/", {"json": {
+            "username": f"bench{i}", "email": f"bench{i}@curasys.local", "password": "senha"}}),
+        "users.put_user": lambda i: ("put", f"/users/{1 + i % v['usuarios']}", {"json": {
+            "email": f"usuario-editado{i}@curasys.local"}}),
+        "users.delete_user": lambda i: ("delete", f"/users/{reserva['usuarios'][i]}", {}),
+        "users.lookup_users": lambda i: ("post", "/users/lookup", ids(v["usuarios"], i, 10)),
+        "auth.login": lambda i: ("post", "/login", {"json": {
+            "username": f"usuario{1 + i % v['usuarios']}", "password": SENHA_PADRAO}}),
+
+        "pacientes.get_pacientes": lambda i: ("get", "/pacientes/", {}),
+        "pacientes.get_paciente": lambda i: ("get", f"/pacientes/{paciente(i)}", {}),
+        "pacientes.get_prontuario": lambda i: ("get", f"/pacientes/{paciente(i)}/prontuario", {}),
+        "pacientes.get_duplicatas": lambda i: ("get", f"/pacientes/{paciente(i)}/duplicatas", {}),
+        "pacientes.lookup_pacientes": lambda i: ("post", "/pacientes/lookup", ids(v["pacientes"], i)),
+        "pacientes.post_paciente": lambda i: ("post", "/pacientes/", {"json": {
+            "nome": "Paciente Benchmark", "data_nascimento": "01-01-1990", "cpf": completar_cpf(f"8{i:08d}")}}),
+        "pacientes.put_paciente": lambda i: ("put", f"/pacientes/{paciente(i)}", {"json": {
+            "nome": "Paciente Editado", "telefone": f"11988{i:06d}"}}),
+        "pacientes.delete_paciente": lambda i: ("delete", f"/pacientes/{reserva['pacientes'][i]}", {}),
+        "pacientes.search_paciente": lambda i: ("get", "/pacientes/buscar?nome=silva", {}),
+        "pacientes.search_paciente_cpf": lambda i: ("get", "/pacientes/buscar/cpf", {"query_string": {
+            "cpf": completar_cpf(f"{paciente(i):09d}")}}),
+
+        "medicos.get_medicos": lambda i: ("get", "/medicos/", {}),
+        "medicos.get_medico": lambda i: ("get", f"/medicos/{medico(i)}", {}),
+        "medicos.lookup_medicos": lambda i: ("post", "/medicos/lookup", ids(v["medicos"], i)),
+        "medicos.post_medico": lambda i: ("post", "/medicos/", {"json": {
+            "nome": "Medico Benchmark", "crm": f"BENCH{i:06d}", "especialidade": "cardiologia"}}),
+        "medicos.put_medico": lambda i: ("put", f"/medicos/{medico(i)}", {"json": {"nome": "Medico Editado"}}),
+        "medicos.delete_medico": lambda i: ("delete", f"/medicos/{reserva['medicos'][i]}", {}),
+        "medicos.search_medico": lambda i: ("get", "/medicos/buscar?nome=souza", {}),
+        "medicos.search_medico_cpf": lambda i: ("get", f"/medicos/buscar/cpf?cpf={completar_cpf('000000001')}", {}),
+        "medicos.search_medico_crm": lambda i: ("get", f"/medicos/buscar/crm?crm=CRM{medico(i):06d}", {}),
+        "medicos.filter_medicos": lambda i: ("get", "/medicos/filtrar?especialidade=cardio", {}),
+
+        "consultas.listar_consultas": lambda i: ("get", "/consultas/", {}),
+        "consultas.consulta_por_id": lambda i: ("get", f"/consultas/{1 + i % v['consultas']}", {}),
+        "consultas.lookup_consultas": lambda i: ("post", "/consultas/lookup", ids(v["consultas"], i)),
+        "consultas.eventos_consultas": lambda i: ("get", "/consultas/eventos", {
+            "query_string": {"medico_id": medico(i)}}),
+        "consultas.criar_consulta": lambda i: ("post", "/consultas/", {"json": {
+            "paciente_id": paciente(i), "medico_id": medico(i), "data_consulta": "10-10-2030",
+            "hora_consulta": "10:00"}}),
+        "consultas.atualizar_consulta": lambda i: ("put", f"/consultas/{1 + i % v['consultas']}", {"json": {
+            "status": "realizada"}}),
+        "consultas.deletar_consulta": lambda i: ("delete", f"/consultas/{reserva['consultas'][i]}", {}),
+        "consultas.listar_consultas_por_paciente": lambda i: ("get", f"/consultas/paciente/{paciente(i)}", {}),
+        "consultas.listar_consultas_por_medico": lambda i: ("get", f"/consultas/medico/{medico(i)}", {}),
+
+        "exames.get_exames": lambda i: ("get", "/exames/", {}),
+        "exames.get_exame": lambda i: ("get", f"/exames/{1 + i % v['exames']}", {}),
+        "exames.lookup_exames": lambda i: ("post", "/exames/lookup", ids(v["exames"], i)),
+        "exames.post_exame": lambda i: ("post", "/exames/", {"json": {
+            "id_paciente": paciente(i), "tipo": "hemograma", "resultado": "normal"}}),
+        "exames.put_exame": lambda i: ("put", f"/exames/{1 + i % v['exames']}", {"json": {"resultado": "alterado"}}),
+        "exames.delete_exame": lambda i: ("delete", f"/exames/{reserva['exames'][i]}", {}),
+        "exames.listar_exames_paciente": lambda i: ("get", f"/exames/paciente/{paciente(i)}", {}),
+        "exames.upload_arquivo_exame": lambda i: ("post", f"/exames/{1 + i % v['exames']}/upload", {
+            "data": {"arquivo": (io.BytesIO(b"%PDF-1.4 benchmark"), f"exame{i}.pdf")},
+            "content_type": "multipart/form-data"}),
+
+        "exportacoes.criar_exportacao": lambda i: ("post", "/exportacoes/", {"json": {
+            "recurso": "consultas", "formato": "ndjson", "paciente_id": paciente(i)}}),
+        "exportacoes.status_exportacao": lambda i: ("get", f"/exportacoes/{ctx['exportacao_id']}", {}),
+        "exportacoes.baixar_exportacao": lambda i: ("get", f"/exportacoes/{ctx['exportacao_id']}/arquivo", {}),
+
+        "metricas.metrics": lambda i: ("get", "/metrics", {}),
+
+        "saude.healthz": lambda i: ("get", "/healthz", {}),
+        "saude.readyz": lambda i: ("get", "/readyz", {}),
+    }
+
+
+def preparar_reservas(quantidade):
+    """
+    function to insert extra rows consumed by DELETE scenarios (inside an app context)
+    :param quantidade: rows per table
+    :return: dictionary table -> list of ids
+    """
+    from datetime import date, datetime
+    from app.extensions import db
+    from app.models import Consulta, Exame, Medico, Paciente, User
+    from app.services.validacao_service import completar_cpf
+
+    def criar(objetos):
+        db.session.add_all(objetos)
+        db.session.flush()
+        return [o.id for o in objetos]
+
+    reserva = {
+        "usuarios": criar([User(username=f"reserva{i}", email=f"reserva{i}@curasys.local", senha_hash="x")
+                           for i in range(quantidade)]),
+        "pacientes": criar([Paciente(nome="Reserva", data_nascimento=date(1990, 1, 1), cpf=completar_cpf(f"9{i:08d}"))
+                            for i in range(quantidade)]),
+        "medicos": criar([Medico(nome="Reserva", crm=f"RESERVA{i}", especialidade="reserva")
+                          for i in range(quantidade)]),
+        "consultas": criar([Consulta(paciente_id=1, medico_id=1, data_consulta=datetime(2030, 1, 1))
+                            for _ in range(quantidade)]),
+        "exames": criar([Exame(id_paciente=1, tipo="reserva") for _ in range(quantidade)]),
+    }
+    db.session.commit()
+    return reserva
+
+
+def executar_banco(database_url, volumes, iteracoes, aquecimento, iteracoes_memoria):
+    """
+    function to seed one database and benchmark every route against it (runs in a child process)
+    :param database_url: SQLAlchemy URL of the target database
+    :param volumes: rows per table for the seed
+    :param iteracoes: timed requests per route
+    :param aquecimento: untimed warm-up requests per route
+    :param iteracoes_memoria: requests per route measured under tracemalloc
+    :return: dictionary with metadata and per-route results
+    """
+    diretorio = tempfile.mkdtemp(prefix="curasys-bench-")
+    os.chdir(diretorio)
+    os.makedirs("uploads", exist_ok=True)
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["EXPORT_DIR"] = os.path.join(diretorio, "exports")
+    os.environ["PROFILE_DIR"] = os.path.join(diretorio, "profiles")
+    os.environ.setdefault("NPLUSONE_MODE", "off")
+    # Baldes no processo: nada de arquivo compartilhado com outras execuções no host. O limitador
+    # continua medido, mas com limites que as iterações não esgotam (429 não é medição da rota)
+    os.environ["RATE_LIMIT_BACKEND"] = "memoria"
+    os.environ["RATE_LIMIT_LOGIN"] = os.environ["RATE_LIMIT_BUSCA"] = "1000000/1"
+    # O log estruturado por requisição distorceria as medições
+    logging.getLogger("curasys.performance").disabled = True
+
+    from app import create_app
+    from app.extensions import db
+    from app.models import Exportacao
+    from app.services import exportacao_service
+    from benchmarks.seed import SENHA_PADRAO, popular
+
+    app = create_app("production")
+    total_reserva = aquecimento + iteracoes + iteracoes_memoria
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        volumes = popular(volumes)
+        reserva = preparar_reservas(total_reserva)
+        exportacao = Exportacao(recurso="consultas", formato="csv", filtros={"medico_id": 1})
+        db.session.add(exportacao)
+        db.session.commit()
+        exportacao_service.executar_exportacao(app, exportacao.id)
+        ctx = {"volumes": volumes, RESERVA_DELECAO: reserva, "exportacao_id": exportacao.id}
+        dialeto = db.engine.dialect.name
+
+    cliente = app.test_client()
+    # usuario1 é o administrador do seed: rotas /admin e um perfil gravado para baixar_perfil
+    token = cliente.post("/login", json={"username": "usuario1", "password": SENHA_PADRAO}).get_json()["access_token"]
+    ctx["admin"] = {"Authorization": f"Bearer {token}"}
+    ctx["perfil_id"] = cliente.get("/healthz?_profile=1", headers=ctx["admin"]).headers["X-Profile-Id"]
+    mapa = cenarios(ctx)
+    endpoints = sorted({regra.endpoint for regra in app.url_map.iter_rules() if regra.endpoint != "static"})
+    sem_cenario = [endpoint for endpoint in endpoints if endpoint not in mapa]
+
+    resultados = {}
+    for endpoint in endpoints:
+        if endpoint not in mapa:
+            continue
+        fabrica = mapa[endpoint]
+
+        def requisitar(i):
+            metodo, url, kwargs = fabrica(i)
+            resposta = getattr(cliente, metodo)(url, **kwargs)
+            # Um stream SSE não termina: lê só o primeiro bloco; as demais respostas são lidas inteiras
+            if resposta.mimetype == "text/event-stream":
+                next(iter(resposta.response), None)
+            else:
+                resposta.get_data()
+            resposta.close()
+            return resposta.status_code
+
+        for i in range(aquecimento):
+            requisitar(i)
+
+        duracoes, status = [], {}
+        inicio_total = time.perf_counter()
+        for i in range(aquecimento, aquecimento + iteracoes):
+            inicio = time.perf_counter()
+            codigo = requisitar(i)
+            duracoes.append(time.perf_counter() - inicio)
+            status[codigo] = status.get(codigo, 0) + 1
+        decorrido = time.perf_counter() - inicio_total
+
+        tracemalloc.start()
+        for i in range(aquecimento + iteracoes, total_reserva):
+            requisitar(i)
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        resultados[endpoint] = {
+            "requisicoes_por_segundo": round(iteracoes / decorrido, 1),
+            "p50_ms": round(statistics.median(duracoes) * 1000, 3),
+            "p99_ms": round(_percentil(duracoes, 99) * 1000, 3),
+            "pico_memoria_kb": round(pico / 1024, 1),
+            "status": {str(codigo): quantidade for codigo, quantidade in sorted(status.items())},
+        }
+
+    return {
+        "meta": {
+            "banco": dialeto,
+            "volumes": volumes,
+            "iteracoes": iteracoes,
+            "python": platform.python_version(),
+            "sem_cenario": sem_cenario,
+        },
+        "rotas": resultados,
+    }
+
+
+def status_inesperados(rotas):
+    """
+    function to list the routes that answered outside 2xx (or outside STATUS_ESPERADOS) in a run
+    :param rotas: per-route results of a run
+    :return: list of failure messages
+    """
+    falhas = []
+    for endpoint, resultado in rotas.items():
+        inesperados = {codigo: quantidade for codigo, quantidade in resultado["status"].items()
+                       if int(codigo) not in STATUS_ESPERADOS.get(endpoint, range(200, 300))}
+        if inesperados:
+            falhas.append(f"{endpoint}: status {', '.join(f'{c}x{q}' for c, q in inesperados.items())}")
+    return falhas
+
+
+def comparar(atual, baseline, limite):
+    """
+    function to compare a run with the stored baseline
+    p50 and peak memory fail above (1 + limite); p99, noisier, fails above (1 + 2 * limite).
+    :param atual: per-route results of the current run
+    :param baseline: per-route results of the baseline
+    :param limite: relative threshold (0.3 = 30%)
+    :return: list of regression messages
+    """
+    regressoes = []
+    for endpoint, resultado in atual.items():
+        base = baseline.get(endpoint)
+        if not base:
+            continue
+        if resultado["p50_ms"] > base["p50_ms"] * (1 + limite):
+            regressoes.append(f"{endpoint}: p50 {base['p50_ms']}ms -> {resultado['p50_ms']}ms")
+        if resultado["p99_ms"] > base["p99_ms"] * (1 + 2 * limite):
+            regressoes.append(f"{endpoint}: p99 {base['p99_ms']}ms -> {resultado['p99_ms']}ms")
+        if (resultado["pico_memoria_kb"] > base["pico_memoria_kb"] * (1 + limite)
+                and resultado["pico_memoria_kb"] - base["pico_memoria_kb"] > 64):
+            regressoes.append(
+                f"{endpoint}: memória {base['pico_memoria_kb']}KB -> {resultado['pico_memoria_kb']}KB")
+    return regressoes
+
+
+def imprimir(execucao):
+    """
+    function to print a run as a table
+    :param execucao: result of executar_banco
+    :return: None
+    """
+    meta = execucao["meta"]
+    print(f"\n== {meta['banco']} ({', '.join(f'{q} {t}' for t, q in meta['volumes'].items())})")
+    print(f"{'endpoint':45} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'pico KB':>9}  status")
+    for endpoint, r in execucao["rotas"].items():
+        status = " ".join(f"{c}x{q}" for c, q in r["status"].items())
+        print(f"{endpoint:45} {r['requisicoes_por_segundo']:>9} {r['p50_ms']:>9} {r['p99_ms']:>9} "
+              f"{r['pico_memoria_kb']:>9}  {status}")
+    for endpoint in meta["sem_cenario"]:
+        print(f"AVISO: rota sem cenário de benchmark: {endpoint}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas com gate de regressão.")
+    parser.add_argument("--iteracoes", type=int, default=200)
+    parser.add_argument("--aquecimento", type=int, default=10)
+    parser.add_argument("--iteracoes-memoria", type=int, default=20)
+    parser.add_argument("--limite", type=float, default=0.30, help="Regressão relativa tolerada (0.30 = 30%%).")
+    parser.add_argument("--baseline", default=BASELINE_PADRAO)
+    parser.add_argument("--atualizar-baseline", action="store_true")
+    parser.add_argument("--saida", help="Grava os resultados completos em JSON.")
+    parser.add_argument("--postgres-url", default=os.getenv("BENCH_POSTGRES_URL"),
+                        help="Também executa contra este PostgreSQL (o banco é recriado!).")
+    from benchmarks.seed import VOLUMES_PADRAO
+    for tabela, quantidade in VOLUMES_PADRAO.items():
+        parser.add_argument(f"--{tabela}", type=int, default=quantidade)
+    args = parser.parse_args()
+
+    volumes = {tabela: getattr(args, tabela) for tabela in VOLUMES_PADRAO}
+    bancos = [f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='curasys-bench-db-'), 'bench.sqlite3')}"]
+    if args.postgres_url:
+        bancos.append(args.postgres_url)
+
+    execucoes = {}
+    for url in bancos:
+        # Processo novo por banco: create_app e app.config leem DATABASE_URL na importação
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            try:
+                execucao = executor.submit(executar_banco, url, volumes, args.iteracoes, args.aquecimento,
+                                           args.iteracoes_memoria).result()
+            except Exception as e:
+                print(f"AVISO: benchmark ignorado para {url.split('@')[-1]}: {e}")
+                continue
+        imprimir(execucao)
+        execucoes[execucao["meta"]["banco"]] = execucao
+
+    falhas = [f"[{banco}] {falha}" for banco, execucao in execucoes.items()
+              for falha in status_inesperados(execucao["rotas"])]
+    if falhas:
+        print("\nRESPOSTAS DE ERRO (cenário quebrado ou rota com defeito; baseline não atualizada):")
+        print("\n".join(falhas))
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(execucoes, arquivo, indent=2, ensure_ascii=False)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+
+    if falhas:
+        return 1
+
+    if args.atualizar_baseline:
+        for banco, execucao in execucoes.items():
+            baseline[banco] = {"meta": execucao["meta"], "rotas": execucao["rotas"]}
+        with open(args.baseline, "w", encoding="utf-8") as arquivo:
+            json.dump(baseline, arquivo, indent=2, ensure_ascii=False, sort_keys=True)
+            arquivo.write("\n")
+        print(f"\nBaseline atualizada em {args.baseline}")
+        return 0
+
+    regressoes = []
+    for banco, execucao in execucoes.items():
+        if banco not in baseline:
+            print(f"\nAVISO: sem baseline para {banco}; rode com --atualizar-baseline")
+            continue
+        if baseline[banco]["meta"]["volumes"] != execucao["meta"]["volumes"]:
+            print(f"\nAVISO: volumes diferentes da baseline de {banco}; comparação pode não ser justa")
+        regressoes += [f"[{banco}] {r}" for r in comparar(execucao["rotas"], baseline[banco]["rotas"], args.limite)]
+
+    if regressoes:
+        print("\nREGRESSÕES:")
+        print("\n".join(regressoes))
+        return 1
+    print("\nSem regressões acima do limite.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the write routes (create/update) with an emulated network round trip to the database.
+
+Uso:
+    python -m benchmarks.bench_escritas                           # SQLite temporário, 1 ms por ida e volta
+    python -m benchmarks.bench_escritas --saida depois.json
+    python -m benchmarks.bench_escritas --comparar antes.json     # compara com uma execução anterior
+    python -m benchmarks.bench_escritas --database-url postgresql://...  # o banco é recriado!
+
+Em um SQLite local cada comando custa microssegundos, então a diferença no número de idas e voltas
+some na medição. --latencia-ms soma esse atraso a cada comando e a cada COMMIT, como a rede até um
+PostgreSQL faria. Para medir antes/depois de uma mudança, grave --saida em cada versão do código e
+compare as duas com --comparar.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+VOLUMES = {"pacientes": 500, "medicos": 50, "consultas": 1000, "exames": 100, "usuarios": 20}
+
+
+def cenarios(volumes):
+    """
+    function to describe how each write is exercised
+    Creating users is left out: the bcrypt hash would hide everything else.
+    :param volumes: rows per table of the seed
+    :return: dictionary scenario -> callable(i) returning (method, url, kwargs)
+    """
+    from app.services.validacao_service import completar_cpf
+
+    def paciente(i):
+        return 1 + i % volumes["pacientes"]
+
+    def medico(i):
+        return 1 + i % volumes["medicos"]
+
+    return {
+        "pacientes.criar": lambda i: ("post", "/pacientes/", {"json": {
+            "nome": "Paciente Escrita", "data_nascimento": "01-01-1990", "cpf": completar_cpf(f"5{i:08d}")}}),
+        "pacientes.criar_duplicado": lambda i: ("post", "/pacientes/", {"json": {
+            "nome": "Paciente Escrita", "data_nascimento": "01-01-1990", "cpf": completar_cpf("000000001")}}),
+        "pacientes.atualizar": lambda i: ("put", f"/pacientes/{paciente(i)}", {"json": {
+            "nome": f"Paciente Editado {i}", "cpf": completar_cpf(f"6{paciente(i):08d}")}}),
+        "medicos.criar": lambda i: ("post", "/medicos/", {"json": {
+            "nome": "Medico Escrita", "crm": f"ESCRITA{i:06d}", "especialidade": "cardiologia"}}),
+        "medicos.atualizar": lambda i: ("put", f"/medicos/{medico(i)}", {"json": {
+            "nome": f"Medico Editado {i}", "crm": f"EDITADO{medico(i):06d}"}}),
+        "consultas.criar": lambda i: ("post", "/consultas/", {"json": {
+            "paciente_id": paciente(i), "medico_id": medico(i), "data_consulta": "10-10-2030",
+            "hora_consulta": "10:00"}}),
+        "consultas.atualizar": lambda i: ("put", f"/consultas/{1 + i % volumes['consultas']}", {"json": {
+            "status": "realizada"}}),
+        "usuarios.atualizar": lambda i: ("put", f"/users/{1 + i % volumes['usuarios']}", {"json": {
+            "email": f"escrita{i}@curasys.local"}}),
+    }
+
+
+def executar(database_url, iteracoes, aquecimento, latencia):
+    """
+    function to seed a database and time every write scenario against it
+    :param database_url: SQLAlchemy URL of the target database
+    :param iteracoes: timed requests per scenario
+    :param aquecimento: untimed warm-up requests per scenario
+    :param latencia: seconds added to every statement and COMMIT
+    :return: dictionary scenario -> results
+    """
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("NPLUSONE_MODE", "off")
+    # Baldes no processo: nada de arquivo compartilhado com outras execuções no host
+    os.environ["RATE_LIMIT_BACKEND"] = "memoria"
+    logging.getLogger("curasys.performance").disabled = True
+
+    from sqlalchemy import event
+
+    from app import create_app
+    from app.extensions import db
+    from benchmarks.seed import popular
+
+    app = create_app("production")
+    comandos = [0]
+
+    def ida_e_volta(*args, **kwargs):
+        comandos[0] += 1
+        if latencia:
+            time.sleep(latencia)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        popular(VOLUMES)
+        event.listen(db.engine, "before_cursor_execute", ida_e_volta)
+        event.listen(db.engine, "commit", ida_e_volta)
+
+    cliente = app.test_client()
+    resultados = {}
+    for nome, fabrica in cenarios(VOLUMES).items():
+        def requisitar(i):
+            metodo, url, kwargs = fabrica(i)
+            return getattr(cliente, metodo)(url, **kwargs).status_code
+
+        for i in range(aquecimento):
+            requisitar(i)
+
+        duracoes, status = [], {}
+        comandos[0] = 0
+        for i in range(aquecimento, aquecimento + iteracoes):
+            inicio = time.perf_counter()
+            codigo = requisitar(i)
+            duracoes.append(time.perf_counter() - inicio)
+            status[codigo] = status.get(codigo, 0) + 1
+
+        duracoes.sort()
+        resultados[nome] = {
+            "p50_ms": round(statistics.median(duracoes) * 1000, 3),
+            "p99_ms": round(duracoes[max(0, round(0.99 * len(duracoes)) - 1)] * 1000, 3),
+            "idas_e_voltas": round(comandos[0] / iteracoes, 1),
+            "status": {str(codigo): quantidade for codigo, quantidade in sorted(status.items())},
+        }
+    return resultados
+
+
+def imprimir(resultados, anteriores=None):
+    """
+    function to print the results, side by side with a previous run when given
+    :param resultados: dictionary scenario -> results
+    :param anteriores: results of a previous run (optional)
+    :return: None
+    """
+    if not anteriores:
+        print(f"{'cenário':28} {'p50 ms':>9} {'p99 ms':>9} {'idas/req':>9}  status")
+        for nome, r in resultados.items():
+            status = " ".join(f"{c}x{q}" for c, q in r["status"].items())
+            print(f"{nome:28} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['idas_e_voltas']:>9}  {status}")
+        return
+
+    print(f"{'cenário':28} {'p50 antes':>10} {'p50 depois':>11} {'variação':>9} {'idas/req':>12}  status")
+    for nome, r in resultados.items():
+        antes = anteriores.get(nome)
+        if not antes:
+            continue
+        variacao = (r["p50_ms"] - antes["p50_ms"]) / antes["p50_ms"] * 100
+        idas = f"{antes['idas_e_voltas']:g} -> {r['idas_e_voltas']:g}"
+        status = f"{'/'.join(antes['status'])} -> {'/'.join(r['status'])}"
+        print(f"{nome:28} {antes['p50_ms']:>10} {r['p50_ms']:>11} {variacao:>8.0f}% {idas:>12}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas de escrita com ida e volta emulada.")
+    parser.add_argument("--iteracoes", type=int, default=200)
+    parser.add_argument("--aquecimento", type=int, default=10)
+    parser.add_argument("--latencia-ms", type=float, default=1.0,
+                        help="Atraso somado a cada comando e COMMIT (0 desliga).")
+    parser.add_argument("--database-url", help="Banco alvo (recriado!). Padrão: SQLite temporário.")
+    parser.add_argument("--saida", help="Grava os resultados em JSON.")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior (--saida) para comparar.")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='curasys-escritas-'), 'bench.sqlite3')}"
+    resultados = executar(url, args.iteracoes, args.aquecimento, args.latencia_ms / 1000)
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anteriores = json.load(arquivo)["cenarios"]
+    imprimir(resultados, anteriores)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"latencia_ms": args.latencia_ms, "cenarios": resultados}, arquivo, indent=2,
+                      ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of application startup: what every gunicorn worker boot and every `flask ...` call pays.
+
+Uso:
+    python -m benchmarks.bench_startup                     # 10 interpretadores novos por modo
+    python -m benchmarks.bench_startup --execucoes 30 --maximo-ms 800
+    python -m benchmarks.bench_startup --importacoes 15    # módulos que mais pesam na importação
+
+Cada medição roda em um interpretador novo (nada em cache no processo). O processo termina com
+código 1 quando a mediana passa de --maximo-ms ou quando create_app deixa conexões ou threads
+abertas, o que quebraria o `gunicorn --preload` (ambas não sobrevivem ao fork).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Roda no interpretador filho: mede importação do pacote, create_app e o estado deixado para o fork
+SCRIPT_MEDICAO = """
+import json, resource, sys, threading, time
+inicio = time.perf_counter()
+import app as pacote
+importado = time.perf_counter()
+aplicacao = pacote.create_app()
+criado = time.perf_counter()
+with aplicacao.app_context():
+    pool = pacote.db.engine.pool
+    conexoes = getattr(pool, "checkedin", lambda: 0)() + getattr(pool, "checkedout", lambda: 0)()
+print(json.dumps({
+    "importacao_ms": (importado - inicio) * 1000,
+    "create_app_ms": (criado - importado) * 1000,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modulos": len(sys.modules),
+    "threads": threading.active_count(),
+    "conexoes": conexoes,
+}))
+"""
+
+# wsgi: boot de worker do gunicorn; cli: comandos `flask ...` (carregam Flask-Migrate/alembic)
+MODOS = {
+    "wsgi": {},
+    "cli": {"FLASK_RUN_FROM_CLI": "true"},
+}
+
+
+def _ambiente(extra):
+    """
+    function to build the child environment
+    :param extra: variables specific to the mode
+    :return: environment dictionary
+    """
+    ambiente = dict(os.environ)
+    ambiente.pop("FLASK_RUN_FROM_CLI", None)
+    ambiente.setdefault("FLASK_ENV", "production")
+    ambiente["PYTHONPATH"] = RAIZ + os.pathsep + ambiente.get("PYTHONPATH", "")
+    ambiente.update(extra)
+    return ambiente
+
+
+def medir(modo, execucoes):
+    """
+    function to start fresh interpreters and measure the application startup
+    :param modo: key of MODOS
+    :param execucoes: number of interpreters to start
+    :return: list of measurement dictionaries (plus total_ms, wall time of the whole process)
+    """
+    medicoes = []
+    for _ in range(execucoes):
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, "-c", SCRIPT_MEDICAO], cwd=RAIZ, env=_ambiente(MODOS[modo]),
+                               capture_output=True, text=True, check=True)
+        medicao = json.loads(saida.stdout.strip().splitlines()[-1])
+        medicao["total_ms"] = (time.perf_counter() - inicio) * 1000
+        medicoes.append(medicao)
+    return medicoes
+
+
+def importacoes_mais_caras(quantidade):
+    """
+    function to rank top-level packages by import time (python -X importtime)
+    :param quantidade: number of packages to return
+    :return: list of (package, milliseconds)
+    """
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", "import wsgi"], cwd=RAIZ,
+                           env=_ambiente({}), capture_output=True, text=True, check=True)
+    por_pacote = Counter()
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, _, modulo = linha[len("import time:"):].split("|")
+        por_pacote[modulo.strip().split(".")[0]] += int(proprio) / 1000
+    return por_pacote.most_common(quantidade)
+
+
+def resumir(medicoes):
+    """
+    function to summarize a list of measurements
+    :param medicoes: list of measurement dictionaries
+    :return: dictionary metric -> median (and min/max for total_ms)
+    """
+    resumo = {chave: statistics.median(m[chave] for m in medicoes)
+              for chave in ("total_ms", "importacao_ms", "create_app_ms", "rss_kb", "modulos")}
+    resumo["total_min_ms"] = min(m["total_ms"] for m in medicoes)
+    resumo["total_max_ms"] = max(m["total_ms"] for m in medicoes)
+    resumo["threads"] = max(m["threads"] for m in medicoes)
+    resumo["conexoes"] = max(m["conexoes"] for m in medicoes)
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de inicialização da aplicação.")
+    parser.add_argument("--execucoes", type=int, default=10)
+    parser.add_argument("--modos", default=",".join(MODOS), help="Modos separados por vírgula (wsgi,cli).")
+    parser.add_argument("--maximo-ms", type=float, help="Falha se a mediana do boot (wsgi) passar deste valor.")
+    parser.add_argument("--importacoes", type=int, default=0, help="Lista os N pacotes mais caros de importar.")
+    parser.add_argument("--saida", help="Grava os resultados em JSON.")
+    args = parser.parse_args()
+
+    resultados = {}
+    print(f"{'modo':<6}{'total p50':>11}{'min':>9}{'max':>9}{'import':>9}{'create_app':>12}{'RSS MB':>8}{'módulos':>9}")
+    for modo in args.modos.split(","):
+        resumo = resumir(medir(modo, args.execucoes))
+        resultados[modo] = resumo
+        print(f"{modo:<6}{resumo['total_ms']:>9.0f}ms{resumo['total_min_ms']:>7.0f}ms{resumo['total_max_ms']:>7.0f}ms"
+              f"{resumo['importacao_ms']:>7.0f}ms{resumo['create_app_ms']:>10.1f}ms{resumo['rss_kb'] / 1024:>8.1f}"
+              f"{resumo['modulos']:>9.0f}")
+
+    if args.importacoes:
+        print("\nImportações mais caras (tempo próprio por pacote):")
+        for pacote, milissegundos in importacoes_mais_caras(args.importacoes):
+            print(f"  {pacote:<28}{milissegundos:>8.1f}ms")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    falhas = []
+    for modo, resumo in resultados.items():
+        if resumo["conexoes"]:
+            falhas.append(f"{modo}: create_app abriu {resumo['conexoes']} conexão(ões) com o banco antes do fork")
+        if resumo["threads"] > 1:
+            falhas.append(f"{modo}: create_app iniciou {resumo['threads'] - 1} thread(s) antes do fork")
+    if args.maximo_ms and "wsgi" in resultados and resultados["wsgi"]["total_ms"] > args.maximo_ms:
+        falhas.append(f"wsgi: mediana {resultados['wsgi']['total_ms']:.0f}ms acima de {args.maximo_ms:.0f}ms")
+
+    if falhas:
+        print("\nFALHAS:")
+        for falha in falhas:
+            print(f"  - {falha}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+Load test against wsgi:app running under gunicorn, for sizing workers and threads.
+
+Uso:
+    python -m benchmarks.loadtest --configuracoes 1x1,2x4,4x8 --duracao 30 --concorrencia 32
+    python -m benchmarks.loadtest --database-url postgresql://... --worker-class gthread
+    python -m benchmarks.loadtest --worker-class uvicorn --configuracoes 1x1,2x1   # modo assíncrono (asgi:app)
+
+Para cada configuração WORKERSxTHREADS o banco é populado (benchmarks.seed), o gunicorn é
+iniciado, e clientes HTTP com keep-alive reproduzem uma mistura realista de operações:
+leitura de agenda, busca de pacientes, agendamentos, logins e upload de exames.
+O processo termina com código 1 quando a taxa de erro de alguma configuração passa de --max-erros.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIX_PADRAO = "agenda=40,busca_paciente=25,agendamento=15,login=10,upload_exame=10"
+VOLUMES_CARGA = {"pacientes": 2000, "medicos": 100, "consultas": 10000, "exames": 5000, "usuarios": 50}
+TERMOS_BUSCA = ["silva", "souza", "ana", "bruno", "lima", "costa", "gomes", "joão"]
+
+
+def _multipart(campo, nome_arquivo, conteudo):
+    """
+    function to build a multipart/form-data body with one file
+    :param campo: form field name
+    :param nome_arquivo: file name
+    :param conteudo: file bytes
+    :return: tuple with the body and its content type
+    """
+    fronteira = uuid.uuid4().hex
+    corpo = (
+        f"--{fronteira}\r\n"
+        f'Content-Disposition: form-data; name="{campo}"; filename="{nome_arquivo}"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode() + conteudo + f"\r\n--{fronteira}--\r\n".encode()
+    return corpo, f"multipart/form-data; boundary={fronteira}"
+
+
+def operacoes(volumes):
+    """
+    function to describe the operations of the traffic mix
+    :param volumes: seeded rows per table
+    :return: dictionary name -> callable(rng) returning (method, path, body, headers)
+    """
+    from benchmarks.seed import SENHA_PADRAO
+
+    json_headers = {"Content-Type": "application/json"}
+
+    def agenda(rng):
+        return "GET", f"/consultas/medico/{rng.randint(1, volumes['medicos'])}", None, {}
+
+    def busca_paciente(rng):
+        return "GET", f"/pacientes/buscar?nome={quote(rng.choice(TERMOS_BUSCA))}", None, {}
+
+    def agendamento(rng):
+        corpo = {
+            "paciente_id": rng.randint(1, volumes["pacientes"]),
+            "medico_id": rng.randint(1, volumes["medicos"]),
+            "data_consulta": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2030",
+            "hora_consulta": f"{rng.randint(8, 17):02d}:{rng.choice(['00', '30'])}",
+        }
+        return "POST", "/consultas/", json.dumps(corpo).encode(), json_headers
+
+    def login(rng):
+        corpo = {"username": f"usuario{rng.randint(1, volumes['usuarios'])}", "password": SENHA_PADRAO}
+        return "POST", "/login", json.dumps(corpo).encode(), json_headers
+
+    def upload_exame(rng):
+        corpo, tipo = _multipart("arquivo", f"exame-{uuid.uuid4().hex[:8]}.pdf", b"%PDF-1.4 " + os.urandom(2048))
+        return "POST", f"/exames/{rng.randint(1, volumes['exames'])}/upload", corpo, {"Content-Type": tipo}
+
+    return {
+        "agenda": agenda,
+        "busca_paciente": busca_paciente,
+        "agendamento": agendamento,
+        "login": login,
+        "upload_exame": upload_exame,
+    }
+
+
+def _porta_livre():
+    """
+    function to pick a free local TCP port
+    :return: port number
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def popular_banco(database_url, volumes):
+    """
+    function to recreate and seed the target database in a separate process
+    :param database_url: SQLAlchemy URL
+    :param volumes: rows per table
+    :return: None
+    """
+    comando = [sys.executable, "-m", "benchmarks.seed", "--database-url", database_url, "--recriar"]
+    for tabela, quantidade in volumes.items():
+        comando += [f"--{tabela}", str(quantidade)]
+    subprocess.run(comando, cwd=RAIZ, check=True, stdout=subprocess.DEVNULL)
+
+
+def iniciar_gunicorn(database_url, workers, threads, worker_class, diretorio, porta):
+    """
+    function to start gunicorn serving wsgi:app with the shipped gunicorn.conf.py (preload,
+    recycling, multiprocess metrics) and wait until it answers
+    :param database_url: SQLAlchemy URL
+    :param workers: gunicorn worker processes
+    :param threads: threads per worker
+    :param worker_class: gunicorn worker class
+    :param diretorio: working directory (uploads and exports are written there)
+    :param porta: TCP port
+    :return: gunicorn process
+    """
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "FLASK_ENV": "production",
+        "NPLUSONE_MODE": "off",
+        "EXPORT_DIR": os.path.join(diretorio, "exports"),
+        # Limitador medido com o backend real, em um arquivo desta execução e com limites que a carga
+        # não esgota: todos os clientes vêm de 127.0.0.1 e 429 não é medição da rota
+        "RATE_LIMIT_STORAGE_PATH": os.path.join(diretorio, "ratelimit.sqlite3"),
+        "RATE_LIMIT_LOGIN": "1000000/1",
+        "RATE_LIMIT_BUSCA": "1000000/1",
+        "PYTHONPATH": RAIZ,
+    }
+    # O worker uvicorn serve o modo assíncrono (asgi.py); os demais, o wsgi.py
+    modulo = "asgi:app" if "uvicorn" in worker_class else "wsgi:app"
+    if worker_class == "uvicorn":
+        worker_class = "uvicorn.workers.UvicornWorker"
+    comando = [
+        sys.executable, "-m", "gunicorn", modulo,
+        "--config", os.path.join(RAIZ, "gunicorn.conf.py"),
+        "--bind", f"127.0.0.1:{porta}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--worker-class", worker_class,
+        "--chdir", diretorio,
+        "--log-level", "warning",
+    ]
+    # Log em arquivo: um PIPE não lido encheria e travaria os workers
+    caminho_log = os.path.join(diretorio, "gunicorn.log")
+    with open(caminho_log, "wb") as log:
+        processo = subprocess.Popen(comando, cwd=diretorio, env=env, stdout=log, stderr=subprocess.STDOUT)
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            with open(caminho_log, encoding="utf-8", errors="replace") as log:
+                raise RuntimeError(f"gunicorn terminou: {log.read()[-2000:]}")
+        try:
+            conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=2)
+            conexao.request("GET", "/readyz")
+            resposta = conexao.getresponse()
+            resposta.read()
+            conexao.close()
+            if resposta.status == 200:
+                return processo
+        except OSError:
+            pass
+        time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("gunicorn não respondeu em 30s")
+
+
+def _cliente(porta, mix, pesos, ops, fim, semente, resultados, timeout):
+    """
+    function run by each client thread: sends requests over a keep-alive connection until fim
+    :return: None (appends (operation, status, seconds) to resultados)
+    """
+    rng = random.Random(semente)
+    conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=timeout)
+    locais = []
+    while time.monotonic() < fim:
+        nome = rng.choices(mix, pesos)[0]
+        metodo, caminho, corpo, headers = ops[nome](rng)
+        inicio = time.perf_counter()
+        try:
+            conexao.request(metodo, caminho, body=corpo, headers=headers)
+            resposta = conexao.getresponse()
+            resposta.read()
+            status = resposta.status
+        except (OSError, http.client.HTTPException):
+            conexao.close()
+            status = 0
+        locais.append((nome, status, time.perf_counter() - inicio))
+    conexao.close()
+    resultados.extend(locais)
+
+
+def _resumo(amostras, decorrido):
+    """
+    function to summarize (status, seconds) samples
+    :return: dictionary with throughput, percentiles and error rate
+    """
+    duracoes = sorted(d for _, d in amostras)
+    erros = sum(1 for status, _ in amostras if status == 0 or status >= 400)
+
+    def percentil(p):
+        return round(duracoes[min(len(duracoes) - 1, int(p / 100 * len(duracoes)))] * 1000, 2)
+
+    status = {}
+    for codigo, _ in amostras:
+        status[str(codigo)] = status.get(str(codigo), 0) + 1
+    return {
+        "requisicoes": len(amostras),
+        "requisicoes_por_segundo": round(len(amostras) / decorrido, 1),
+        "p50_ms": percentil(50) if duracoes else None,
+        "p90_ms": percentil(90) if duracoes else None,
+        "p99_ms": percentil(99) if duracoes else None,
+        "media_ms": round(statistics.fmean(duracoes) * 1000, 2) if duracoes else None,
+        "taxa_erro": round(erros / len(amostras), 4) if amostras else None,
+        "status": dict(sorted(status.items())),
+    }
+
+
+def executar_configuracao(args, workers, threads, volumes, mix):
+    """
+    function to run the load for one gunicorn configuration
+    :return: dictionary with the overall and per-operation summary
+    """
+    diretorio = tempfile.mkdtemp(prefix="curasys-carga-")
+    os.makedirs(os.path.join(diretorio, "uploads"), exist_ok=True)
+    database_url = args.database_url or f"sqlite:///{os.path.join(diretorio, 'carga.sqlite3')}"
+    popular_banco(database_url, volumes)
+
+    porta = _porta_livre()
+    processo = iniciar_gunicorn(database_url, workers, threads, args.worker_class, diretorio, porta)
+    try:
+        ops = operacoes(volumes)
+        nomes = list(mix)
+        pesos = [mix[nome] for nome in nomes]
+
+        # Aquecimento: cada worker carrega o app e abre conexões antes da medição
+        aquecimento = []
+        fim = time.monotonic() + args.aquecimento
+        threads_aquecimento = [threading.Thread(target=_cliente, args=(porta, nomes, pesos, ops, fim, i,
+                                                                        aquecimento, args.timeout))
+                               for i in range(args.concorrencia)]
+        for t in threads_aquecimento:
+            t.start()
+        for t in threads_aquecimento:
+            t.join()
+
+        amostras = []
+        inicio = time.monotonic()
+        fim = inicio + args.duracao
+        clientes = [threading.Thread(target=_cliente, args=(porta, nomes, pesos, ops, fim, 1000 + i,
+                                                            amostras, args.timeout))
+                    for i in range(args.concorrencia)]
+        for t in clientes:
+            t.start()
+        for t in clientes:
+            t.join()
+        decorrido = time.monotonic() - inicio
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+            processo.wait()
+
+    return {
+        "workers": workers,
+        "threads": threads,
+        "worker_class": args.worker_class,
+        "geral": _resumo([(s, d) for _, s, d in amostras], decorrido),
+        "operacoes": {
+            nome: _resumo([(s, d) for n, s, d in amostras if n == nome], decorrido) for nome in nomes
+        },
+    }
+
+
+def imprimir(resultado):
+    """
+    function to print the summary of one configuration
+    :return: None
+    """
+    print(f"\n== {resultado['workers']} workers x {resultado['threads']} threads ({resultado['worker_class']})")
+    print(f"{'operação':16} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'erros':>7}  status")
+    linhas = [("TOTAL", resultado["geral"])] + list(resultado["operacoes"].items())
+    for nome, r in linhas:
+        if not r["requisicoes"]:
+            continue
+        status = " ".join(f"{c}x{q}" for c, q in r["status"].items())
+        print(f"{nome:16} {r['requisicoes']:>7} {r['requisicoes_por_segundo']:>8} {r['p50_ms']:>8} "
+              f"{r['p90_ms']:>8} {r['p99_ms']:>8} {r['taxa_erro']:>7.2%}  {status}")
+
+
+def erros_acima_do_limite(resultado, maximo):
+    """
+    function to list the operations of a configuration whose error rate is above the threshold
+    :param resultado: result of executar_configuracao
+    :param maximo: tolerated error rate (0.01 = 1%)
+    :return: list of failure messages
+    """
+    configuracao = f"{resultado['workers']}x{resultado['threads']}"
+    linhas = [("TOTAL", resultado["geral"])] + list(resultado["operacoes"].items())
+    return [f"{configuracao} {nome}: {r['taxa_erro']:.2%} de erros ({r['status']})"
+            for nome, r in linhas if r["requisicoes"] and r["taxa_erro"] > maximo]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do wsgi:app sob gunicorn.")
+    parser.add_argument("--configuracoes", default="1x1,2x4,4x4",
+                        help="Lista WORKERSxTHREADS separada por vírgula.")
+    parser.add_argument("--worker-class", default="gthread", help="gthread, sync, gevent ou uvicorn (asgi:app).")
+    parser.add_argument("--duracao", type=float, default=20, help="Segundos de medição por configuração.")
+    parser.add_argument("--aquecimento", type=float, default=3)
+    parser.add_argument("--concorrencia", type=int, default=16, help="Clientes simultâneos.")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--mix", default=MIX_PADRAO, help="Pesos das operações (nome=peso,...).")
+    parser.add_argument("--database-url", help="Banco alvo (recriado!). Padrão: SQLite temporário.")
+    parser.add_argument("--saida", help="Grava os resultados em JSON.")
+    parser.add_argument("--max-erros", type=float, default=0.01,
+                        help="Taxa de erro tolerada por operação (0.01 = 1%%); acima dela o processo falha.")
+    for tabela, quantidade in VOLUMES_CARGA.items():
+        parser.add_argument(f"--{tabela}", type=int, default=quantidade)
+    args = parser.parse_args()
+
+    volumes = {tabela: getattr(args, tabela) for tabela in VOLUMES_CARGA}
+    mix = {nome: float(peso) for nome, peso in (item.split("=") for item in args.mix.split(","))}
+    desconhecidas = set(mix) - set(operacoes(volumes))
+    if desconhecidas:
+        parser.error(f"operações desconhecidas no mix: {', '.join(sorted(desconhecidas))}")
+
+    resultados = []
+    for configuracao in args.configuracoes.split(","):
+        workers, threads = (int(parte) for parte in configuracao.lower().split("x"))
+        resultado = executar_configuracao(args, workers, threads, volumes, mix)
+        imprimir(resultado)
+        resultados.append(resultado)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+
+    falhas = [falha for resultado in resultados for falha in erros_acima_do_limite(resultado, args.max_erros)]
+    if falhas:
+        print(f"\nTAXA DE ERRO ACIMA DE {args.max_erros:.2%}:")
+        print("\n".join(falhas))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
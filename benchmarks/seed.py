@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Seed of production-shaped volumes for benchmarks and load tests.
+
+Uso:
+    python -m benchmarks.seed --database-url sqlite:///bench.sqlite3 --pacientes 5000
+"""
+import argparse
+import os
+import random
+from datetime import date, datetime, timedelta
+
+import bcrypt
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import Consulta, Exame, Medico, Paciente, User
+from app.services.duplicidade_service import chaves_paciente
+from app.services.validacao_service import completar_cpf
+
+VOLUMES_PADRAO = {
+    "pacientes": 2000,
+    "medicos": 100,
+    "consultas": 10000,
+    "exames": 5000,
+    "usuarios": 50,
+}
+SENHA_PADRAO = "senha-benchmark"
+ESPECIALIDADES = ["cardiologia", "pediatria", "dermatologia", "ortopedia", "neurologia", "clinica geral"]
+NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Almeida", "Ferreira", "Gomes"]
+LOTE = 1000
+
+
+def _nome(rng):
+    """
+    function to build a random full name
+    :param rng: random generator
+    :return: name
+    """
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def _inserir(modelo, linhas):
+    """
+    function to bulk insert rows in batches (executemany)
+    :param modelo: model class
+    :param linhas: list of dictionaries
+    :return: None
+    """
+    for inicio in range(0, len(linhas), LOTE):
+        db.session.execute(insert(modelo), linhas[inicio:inicio + LOTE])
+
+
+def popular(volumes=None, semente=42):
+    """
+    function to seed the current database (inside an app context) with synthetic data
+    :param volumes: dictionary overriding VOLUMES_PADRAO
+    :param semente: random seed, so runs are reproducible
+    :return: dictionary with the number of rows per table
+    """
+    volumes = {**VOLUMES_PADRAO, **(volumes or {})}
+    rng = random.Random(semente)
+    hoje = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    _inserir(Medico, [{
+        "nome": f"Dr(a). {_nome(rng)}",
+        "crm": f"CRM{i:06d}",
+        "especialidade": rng.choice(ESPECIALIDADES),
+        "telefone": f"119{rng.randint(10000000, 99999999)}",
+        "email": f"medico{i}@curasys.local",
+    } for i in range(1, volumes["medicos"] + 1)])
+
+    pacientes = [{
+        "nome": _nome(rng),
+        "data_nascimento": date(1940, 1, 1) + timedelta(days=rng.randint(0, 30000)),
+        "cpf": completar_cpf(f"{i:09d}"),
+        "telefone": f"119{rng.randint(10000000, 99999999)}",
+        "email": f"paciente{i}@curasys.local",
+    } for i in range(1, volumes["pacientes"] + 1)]
+    # O insert do Core não passa pelo hook do ORM: as chaves de bloqueio da deduplicação vão na mesma linha
+    _inserir(Paciente, [{**paciente, **chaves_paciente(paciente["nome"], paciente["telefone"])}
+                        for paciente in pacientes])
+
+    _inserir(Consulta, [{
+        "paciente_id": rng.randint(1, volumes["pacientes"]),
+        "medico_id": rng.randint(1, volumes["medicos"]),
+        "data_consulta": hoje + timedelta(hours=rng.randint(-24 * 365, 24 * 60)),
+        "status": rng.choice(["agendada", "realizada", "cancelada"]),
+    } for _ in range(volumes["consultas"])])
+
+    _inserir(Exame, [{
+        "id_paciente": rng.randint(1, volumes["pacientes"]),
+        "tipo": rng.choice(["hemograma", "raio-x", "ressonancia", "glicemia", "eletrocardiograma"]),
+        "resultado": "normal",
+    } for _ in range(volumes["exames"])])
+
+    # Um único hash bcrypt reaproveitado: o custo do hash não interessa ao seed
+    senha_hash = bcrypt.hashpw(SENHA_PADRAO.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    _inserir(User, [{
+        "username": f"usuario{i}",
+        "email": f"usuario{i}@curasys.local",
+        "senha_hash": senha_hash,
+        "role": "admin" if i == 1 else "recepcao",
+    } for i in range(1, volumes["usuarios"] + 1)])
+
+    db.session.commit()
+    return volumes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco com dados sintéticos para benchmarks.")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--recriar", action="store_true", help="Apaga e recria as tabelas antes de popular.")
+    for tabela, quantidade in VOLUMES_PADRAO.items():
+        parser.add_argument(f"--{tabela}", type=int, default=quantidade)
+    args = parser.parse_args()
+
+    # DATABASE_URL é lido ao importar app.config
+    os.environ["DATABASE_URL"] = args.database_url
+    from app import create_app
+
+    app = create_app("production")
+    with app.app_context():
+        if args.recriar:
+            db.drop_all()
+        db.create_all()
+        volumes = popular({tabela: getattr(args, tabela) for tabela in VOLUMES_PADRAO})
+    print(", ".join(f"{quantidade} {tabela}" for tabela, quantidade in volumes.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Perfil do gunicorn para produção (carregado automaticamente a partir do diretório de trabalho,
+ou com `gunicorn -c gunicorn.conf.py wsgi:app`).
+
+Todas as opções podem ser ajustadas por variáveis de ambiente GUNICORN_*; argumentos de linha de
+comando continuam tendo precedência sobre este arquivo.
+
+    GUNICORN_WORKER_CLASS  gthread (padrão) | gevent (requer o pacote gevent) | sync
+                           | uvicorn (servir asgi:app; requer requirements-async.txt)
+    GUNICORN_WORKERS       padrão: número de CPUs disponíveis (2*CPUs + 1 no modo sync)
+    GUNICORN_THREADS       padrão: 4 (apenas gthread)
+    GUNICORN_PRELOAD       padrão: true (false no modo gevent, que precisa aplicar o monkey patch antes)
+"""
+import glob
+import os
+import tempfile
+
+
+def _env_int(nome, padrao):
+    valor = os.getenv(nome)
+    return int(valor) if valor else padrao
+
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    return valor.lower() in ("1", "true", "yes") if valor else padrao
+
+
+# CPUs realmente disponíveis ao processo (respeita cpuset/affinity do container)
+CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+if worker_class == "gevent":
+    # Um processo por CPU; a concorrência vem das greenlets (I/O de banco e rede cooperativos)
+    workers = _env_int("GUNICORN_WORKERS", CPUS)
+    worker_connections = _env_int("GUNICORN_WORKER_CONNECTIONS", 1000)
+elif worker_class == "uvicorn":
+    # Um processo por CPU com event loop: as leituras assíncronas (asgi.py) esperam o banco sem ocupar threads
+    worker_class = "uvicorn.workers.UvicornWorker"
+    workers = _env_int("GUNICORN_WORKERS", CPUS)
+elif worker_class == "gthread":
+    # Um processo por CPU e threads para sobrepor a espera por I/O (banco, bcrypt libera o GIL)
+    workers = _env_int("GUNICORN_WORKERS", CPUS)
+    threads = _env_int("GUNICORN_THREADS", 4)
+else:
+    workers = _env_int("GUNICORN_WORKERS", 2 * CPUS + 1)
+
+# Preload: o app é criado uma vez no master e compartilhado copy-on-write (ver gc.freeze em wsgi.py).
+# No gevent o monkey patch do worker precisa acontecer antes de importar o app, então não há preload.
+preload_app = _env_bool("GUNICORN_PRELOAD", worker_class != "gevent")
+
+# Reciclagem: limita vazamentos e fragmentação; o jitter evita que todos os workers reiniciem juntos.
+# No gthread (gunicorn 23) cada reciclagem pode derrubar uma conexão já aceita e ainda não atendida:
+# mantenha o valor alto e deixe o proxy/cliente repetir requisições idempotentes. 0 desativa.
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 10000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 1000)
+
+# Timeouts: worker travado é reiniciado; no SIGTERM as requisições em andamento têm graceful_timeout
+timeout = _env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# Heartbeat dos workers em memória: em containers /tmp costuma ser overlayfs e pode travar o heartbeat
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG")
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+# Métricas Prometheus agregadas entre workers: precisa estar definido antes de o app ser importado
+# (o preload acontece antes de qualquer hook), por isso é resolvido na leitura deste arquivo. Este
+# arquivo é lido de novo a cada SIGHUP: aqui só se cria o diretório, quem o esvazia é o on_starting.
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+else:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="curasys-prometheus-")
+
+
+def on_starting(server):
+    """
+    Só na primeira subida do master (não no SIGHUP, que manteria workers vivos escrevendo ali): remove as
+    métricas de execuções anteriores de um diretório reaproveitado. Apenas os *.db do prometheus_client;
+    o diretório pode ser compartilhado com outros arquivos.
+    """
+    for arquivo in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        try:
+            os.remove(arquivo)
+        except OSError as e:
+            server.log.warning("Não foi possível remover %s: %s", arquivo, e)
+
+
+def when_ready(server):
+    server.log.info("curasys: %s workers %s, threads=%s, preload=%s, max_requests=%s(+%s)",
+                    server.cfg.workers, server.cfg.worker_class_str, server.cfg.threads,
+                    server.cfg.preload_app, server.cfg.max_requests, server.cfg.max_requests_jitter)
+
+
+def post_fork(server, worker):
+    """
+    Descarta as conexões herdadas do master (preload): um socket de banco compartilhado entre
+    processos corrompe o protocolo. close=False deixa o master fechar as suas, sem afetar o filho.
+    """
+    if not server.cfg.preload_app:
+        return
+    from app.extensions import db
+
+    aplicacao = server.app.wsgi()
+    # asgi:app embrulha o Flask (app/asgi.py); wsgi:app é o próprio Flask
+    with getattr(aplicacao, "flask_app", aplicacao).app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    """
+    No gevent o psycopg2 precisa do wait callback cooperativo (psycogreen), senão cada query bloqueia
+    o worker inteiro.
+    """
+    if worker.cfg.worker_class_str == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            worker.log.warning("psycogreen não instalado: queries PostgreSQL bloquearão o worker gevent")
+        else:
+            patch_psycopg()
+
+
+def child_exit(server, worker):
+    """
+    Remove os arquivos mmap de gauges do worker que saiu (livesum não soma processos mortos).
+    """
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
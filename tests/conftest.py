@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+
+# Antes de importar o app: a configuração é lida do ambiente na importação de app/config.py
+_DIRETORIO = tempfile.mkdtemp(prefix="curasys-testes-")
+os.environ.setdefault("TEST_DATABASE_URL", f"sqlite:///{os.path.join(_DIRETORIO, 'testes.sqlite3')}")
+os.environ.setdefault("EXPORT_DIR", os.path.join(_DIRETORIO, "exports"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_DIRETORIO, "profiles"))
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.services.limite_requisicoes_service import BackendMemoria
+
+
+def criar_app():
+    """
+    function to build an application with the testing configuration
+    :return: flask application
+    """
+    return create_app("testing")
+
+
+@pytest.fixture(scope="session")
+def app():
+    return criar_app()
+
+
+@pytest.fixture(autouse=True)
+def banco(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    # Baldes cheios a cada teste: os logins de um teste não contam contra o seguinte
+    app.extensions["limite_requisicoes"] = BackendMemoria(app)
+    yield
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def cadastrar_e_logar(client, username="recepcao1", password="senha-forte"):
+    """
+    function to register a user through the API and log in
+    :param client: flask test client
+    :param username: username of the new user
+    :param password: password of the new user
+    :return: Authorization headers with the access token
+    """
+    resposta = client.post("/users/", json={"username": username, "email": f"{username}@curasys.local",
+                                            "password": password})
+    assert resposta.status_code == 201, resposta.get_json()
+    return logar(client, username, password)
+
+
+def logar(client, username, password="senha-forte"):
+    """
+    function to log in an existing user
+    :return: Authorization headers with the access token
+    """
+    resposta = client.post("/login", json={"username": username, "password": password})
+    assert resposta.status_code == 200, resposta.get_json()
+    return {"Authorization": f"Bearer {resposta.get_json()['access_token']}"}
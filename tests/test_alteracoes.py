@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from sqlalchemy import delete
+
+from app.extensions import db
+from app.models.alteracao import SequenciaAlteracoes
+from app.services.alteracoes_service import compactar_tombstones
+
+
+def _paciente(client, cpf, nome="Maria da Silva"):
+    resposta = client.post("/pacientes/", json={"nome": nome, "data_nascimento": "01-02-1990", "cpf": cpf})
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()["data"]["id"]
+
+
+def _medico(client, crm):
+    resposta = client.post("/medicos/", json={"nome": "Dr. Souza", "crm": crm, "especialidade": "cardiologia"})
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()["data"]["id"]
+
+
+def test_paginacao_pelo_cursor(client):
+    primeiro = _paciente(client, "52998224725")
+    medico = _medico(client, "CRM000001")
+    segundo = _paciente(client, "11144477735")
+
+    pagina = client.get("/changes?since=0&limit=2").get_json()
+    assert [(a["recurso"], a["id"], a["operacao"]) for a in pagina["data"]] == [
+        ("pacientes", primeiro, "upsert"), ("medicos", medico, "upsert")]
+    assert pagina["data"][0]["data"]["cpf"] == "52998224725"
+    assert pagina["has_more"] is True
+
+    seguinte = client.get(f"/changes?since={pagina['cursor']}&limit=2").get_json()
+    assert [(a["recurso"], a["id"]) for a in seguinte["data"]] == [("pacientes", segundo)]
+    assert seguinte["has_more"] is False
+
+    vazia = client.get(f"/changes?since={seguinte['cursor']}").get_json()
+    assert vazia["data"] == [] and vazia["cursor"] == seguinte["cursor"]
+
+
+def test_alteracao_substitui_a_entrada_anterior(client):
+    id_paciente = _paciente(client, "52998224725")
+    cursor = client.get("/changes").get_json()["cursor"]
+
+    assert client.put(f"/pacientes/{id_paciente}", json={"nome": "Maria Souza"}).status_code == 200
+
+    completo = client.get("/changes").get_json()["data"]
+    assert len(completo) == 1 and completo[0]["seq"] > cursor
+    delta = client.get(f"/changes?since={cursor}").get_json()["data"]
+    assert [(a["id"], a["data"]["nome"]) for a in delta] == [(id_paciente, "Maria Souza")]
+
+
+def test_exclusao_vira_tombstone(client):
+    id_paciente = _paciente(client, "52998224725")
+    cursor = client.get("/changes").get_json()["cursor"]
+
+    assert client.delete(f"/pacientes/{id_paciente}").status_code == 200
+
+    delta = client.get(f"/changes?since={cursor}").get_json()["data"]
+    assert delta == [{"seq": delta[0]["seq"], "recurso": "pacientes", "id": id_paciente, "operacao": "delete"}]
+
+
+def test_cursor_anterior_a_compactacao(app, client):
+    id_paciente = _paciente(client, "52998224725")
+    _paciente(client, "11144477735")
+    antigo = client.get("/changes").get_json()["cursor"]
+    client.delete(f"/pacientes/{id_paciente}")
+
+    with app.app_context():
+        # Retenção negativa: todo tombstone já passou do prazo
+        assert compactar_tombstones(-1) == 1
+
+    assert client.get(f"/changes?since={antigo}").status_code == 410
+    completo = client.get("/changes?since=0").get_json()
+    assert [a["operacao"] for a in completo["data"]] == ["upsert"]
+    assert client.get(f"/changes?since={completo['cursor']}").status_code == 200
+
+
+def test_sincronizacao_completa_paginada_depois_da_compactacao(app, client):
+    ids = [_paciente(client, cpf) for cpf in ("52998224725", "11144477735", "39053344705")]
+    client.delete(f"/pacientes/{ids[1]}")
+    with app.app_context():
+        compactar_tombstones(-1)
+    novo = _paciente(client, "86288366757")
+
+    vistos, cursor = [], 0
+    for _ in range(5):
+        pagina = client.get(f"/changes?since={cursor}&limit=1")
+        assert pagina.status_code == 200, pagina.get_json()
+        vistos += [a["id"] for a in pagina.get_json()["data"]]
+        cursor = pagina.get_json()["cursor"]
+        if not pagina.get_json()["has_more"]:
+            break
+    assert vistos == [ids[0], ids[2], novo]
+    assert cursor > 0
+
+
+def test_parametros_invalidos(client):
+    assert client.get("/changes?since=abc").status_code == 400
+    assert client.get("/changes?limit=0").status_code == 400
+
+
+def test_contador_ausente_e_recriado(app, client):
+    with app.app_context():
+        db.session.execute(delete(SequenciaAlteracoes))
+        db.session.commit()
+
+    _paciente(client, "52998224725")
+    _paciente(client, "11144477735")
+
+    assert [a["seq"] for a in client.get("/changes").get_json()["data"]] == [1, 2]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+
+from flask import Flask
+
+from app.asgi import AplicacaoAsgi
+from app.extensions import db
+from app.services.async_db_service import criar_engine_assincrona
+
+
+async def _requisitar(aplicacao, caminho, query=""):
+    """
+    function to send one GET through the ASGI application
+    :return: (status, decoded JSON body)
+    """
+    mensagens = []
+    entregue = False
+
+    async def receive():
+        nonlocal entregue
+        if not entregue:
+            entregue = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    await aplicacao({
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": caminho, "raw_path": caminho.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }, receive, send)
+    status = next(m["status"] for m in mensagens if m["type"] == "http.response.start")
+    corpo = b"".join(m.get("body", b"") for m in mensagens if m["type"] == "http.response.body")
+    return status, json.loads(corpo)
+
+
+def test_leituras_assincronas_usam_o_banco_do_app(app, client):
+    id_paciente = client.post("/pacientes/", json={
+        "nome": "Maria da Silva", "data_nascimento": "01-02-1990", "cpf": "52998224725"}).get_json()["data"]["id"]
+
+    async def executar():
+        aplicacao = AplicacaoAsgi(app)
+        try:
+            busca = await _requisitar(aplicacao, "/pacientes/buscar", "nome=maria")
+            prontuario = await _requisitar(aplicacao, f"/pacientes/{id_paciente}/prontuario")
+            # Rota sem versão assíncrona: segue para o Flask
+            detalhe = await _requisitar(aplicacao, f"/pacientes/{id_paciente}")
+        finally:
+            await aplicacao.engine.dispose()
+        return busca, prontuario, detalhe
+
+    (status_busca, busca), (status_prontuario, prontuario), (status_detalhe, detalhe) = asyncio.run(executar())
+    assert status_busca == 200, busca
+    assert [p["id"] for p in busca["data"]] == [id_paciente]
+    assert status_prontuario == 200, prontuario
+    assert prontuario["data"]["consultas"] == [] and prontuario["data"]["exames"] == []
+    assert status_detalhe == 200 and detalhe["data"]["nome"] == "Maria da Silva"
+
+
+def test_sqlite_relativo_aponta_para_instance(tmp_path):
+    flask_app = Flask("app", instance_path=str(tmp_path / "instance"))
+    flask_app.config.update(SQLALCHEMY_DATABASE_URI="sqlite:///db.sqlite3", ASYNC_DB_POOL_SIZE=1,
+                            ASYNC_DB_MAX_OVERFLOW=0)
+    db.init_app(flask_app)
+
+    engine, _ = criar_engine_assincrona(flask_app)
+    try:
+        assert engine.url.drivername == "sqlite+aiosqlite"
+        assert engine.url.database == os.path.join(str(tmp_path / "instance"), "db.sqlite3")
+    finally:
+        engine.sync_engine.dispose()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models import OutboxAuditoria, Paciente, RegistroAuditoria
+from app.services.auditoria_service import drenar_outbox, gravar_lote
+
+
+@pytest.fixture
+def enfileirados(app, monkeypatch):
+    # Sem a thread de gravação em lote: o teste move o outbox quando quer
+    pendentes = []
+    monkeypatch.setattr(app.extensions["auditoria"], "enfileirar", pendentes.extend)
+    return pendentes
+
+
+def _contar(modelo):
+    return db.session.execute(select(func.count()).select_from(modelo)).scalar()
+
+
+def _paciente():
+    return Paciente(nome="Maria da Silva", data_nascimento=date(1990, 2, 1), cpf="52998224725")
+
+
+def test_escrita_grava_outbox_na_mesma_transacao(app, enfileirados):
+    with app.app_context():
+        paciente = _paciente()
+        db.session.add(paciente)
+        db.session.flush()
+        # Visível antes do commit: a linha do outbox é da transação da escrita
+        (registros,) = db.session.execute(select(OutboxAuditoria.registros)).scalars().all()
+        assert enfileirados == []
+        db.session.commit()
+        paciente_id = paciente.id
+
+    assert [quantidade for _, quantidade in enfileirados] == [1]
+    (registro,) = registros
+    assert registro["recurso"] == "pacientes"
+    assert registro["registro_id"] == paciente_id
+    assert registro["operacao"] == "insert"
+    assert registro["alteracoes"]["cpf"] == {"antes": None, "depois": "52998224725"}
+
+
+def test_gravar_lote_move_o_outbox_para_auditoria(app, enfileirados):
+    with app.app_context():
+        db.session.add(_paciente())
+        db.session.commit()
+
+        assert gravar_lote([outbox_id for outbox_id, _ in enfileirados]) == 1
+        assert _contar(OutboxAuditoria) == 0
+        (registro,) = RegistroAuditoria.query.all()
+        assert registro.operacao == "insert"
+        # Já movido: uma segunda gravação não duplica
+        assert gravar_lote([outbox_id for outbox_id, _ in enfileirados]) == 0
+
+
+def test_drenar_outbox_respeita_a_carencia(app, enfileirados):
+    with app.app_context():
+        paciente = _paciente()
+        db.session.add(paciente)
+        db.session.commit()
+        paciente.telefone = "11 98765-4321"
+        db.session.commit()
+
+        assert drenar_outbox(3600, 10) == 0
+        assert drenar_outbox(0, 1) == 2
+        assert _contar(OutboxAuditoria) == 0
+        assert [r.operacao for r in RegistroAuditoria.query.order_by(RegistroAuditoria.id)] == ["insert", "update"]
+
+
+def test_rollback_nao_deixa_auditoria(app, enfileirados):
+    with app.app_context():
+        db.session.add(_paciente())
+        db.session.flush()
+        assert _contar(OutboxAuditoria) == 1
+        db.session.rollback()
+
+        assert _contar(OutboxAuditoria) == 0
+        assert drenar_outbox(0, 10) == 0
+        assert _contar(RegistroAuditoria) == 0
+        assert "auditoria_pendente" not in db.session.info
+    assert enfileirados == []
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import pytest
+from flask_jwt_extended import decode_token
+
+from tests.conftest import cadastrar_e_logar
+
+
+def test_login_emite_token_com_papel(app, client):
+    cadastrar_e_logar(client, "recepcao1")
+
+    resposta = client.post("/login", json={"username": "recepcao1", "password": "senha-forte"})
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    assert corpo["data"]["username"] == "recepcao1"
+    with app.app_context():
+        token = decode_token(corpo["access_token"])
+    assert token["sub"] == str(corpo["data"]["id"])
+    assert token["role"] == "recepcao"
+    assert token["username"] == "recepcao1"
+
+
+@pytest.mark.parametrize("corpo", [{}, {"username": "recepcao1"}, {"password": "senha-forte"}])
+def test_login_sem_campos(client, corpo):
+    resposta = client.post("/login", json=corpo)
+    assert resposta.status_code == 400
+    assert resposta.get_json()["success"] is False
+
+
+@pytest.mark.parametrize("username, password", [("recepcao1", "senha-errada"), ("ninguem", "senha-forte")])
+def test_login_com_credenciais_invalidas(client, username, password):
+    cadastrar_e_logar(client, "recepcao1")
+
+    resposta = client.post("/login", json={"username": username, "password": password})
+    assert resposta.status_code == 401
+    assert "access_token" not in resposta.get_json()
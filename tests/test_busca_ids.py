@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import Paciente
+from app.services.validacao_service import completar_cpf
+
+
+@pytest.fixture
+def ids_pacientes(app):
+    with app.app_context():
+        pacientes = [Paciente(nome=f"Paciente {i}", data_nascimento=date(1990, 1, i), cpf=completar_cpf(f"{i:09d}"))
+                     for i in range(1, 6)]
+        db.session.add_all(pacientes)
+        db.session.commit()
+        return [paciente.id for paciente in pacientes]
+
+
+def test_ids_na_ordem_pedida_com_ausentes_e_repetidos(client, ids_pacientes):
+    pedidos = [ids_pacientes[4], ids_pacientes[1], 999, ids_pacientes[1], ids_pacientes[3]]
+
+    resposta = client.get(f"/pacientes/?ids={','.join(map(str, pedidos))}")
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    assert [p["id"] for p in corpo["data"]] == [ids_pacientes[4], ids_pacientes[1], ids_pacientes[3]]
+    assert corpo["count"] == 3
+    assert corpo["ausentes"] == [999]
+
+    resposta = client.post("/pacientes/lookup", json={"ids": pedidos})
+    assert resposta.status_code == 200
+    assert resposta.get_json()["data"] == corpo["data"]
+    assert resposta.get_json()["ausentes"] == [999]
+
+
+def test_ids_em_lotes_acima_do_limite_do_in(app, client, ids_pacientes, monkeypatch):
+    monkeypatch.setitem(app.config, "MULTIGET_CHUNK_SIZE", 2)
+    selects = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM pacientes" in statement:
+            selects.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", contar)
+        try:
+            resposta = client.post("/pacientes/lookup", json={"ids": list(reversed(ids_pacientes))})
+        finally:
+            event.remove(db.engine, "before_cursor_execute", contar)
+
+    assert resposta.status_code == 200
+    assert [p["id"] for p in resposta.get_json()["data"]] == list(reversed(ids_pacientes))
+    assert len(selects) == 3
+
+
+@pytest.mark.parametrize("ids", ["1,abc", ",", "1.5"])
+def test_ids_malformados(client, ids):
+    assert client.get(f"/pacientes/?ids={ids}").status_code == 400
+
+
+@pytest.mark.parametrize("corpo", [{}, {"ids": []}, {"ids": [1, None]}, {"ids": [[1]]}, {"ids": {"1": 1}}])
+def test_lookup_malformado(client, corpo):
+    resposta = client.post("/pacientes/lookup", json=corpo)
+    assert resposta.status_code == 400
+    assert resposta.get_json()["success"] is False
+
+
+def test_ids_acima_do_maximo(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "MULTIGET_MAX_IDS", 3)
+    assert client.get("/pacientes/?ids=1,2,3,4").status_code == 400
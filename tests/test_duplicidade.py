@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.duplicidade_service import chaves_paciente, ficha, fonetica, normalizar_nome, pontuar
+
+
+def _ficha(nome="Thiago de Souza", nascimento=date(1990, 2, 1), cpf="52998224725", telefone=None, email=None):
+    return ficha(SimpleNamespace(id=1, nome=nome, data_nascimento=nascimento, cpf=cpf, telefone=telefone,
+                                 email=email))
+
+
+def _paciente(client, nome, nascimento, cpf, telefone=None):
+    resposta = client.post("/pacientes/", json={"nome": nome, "data_nascimento": nascimento, "cpf": cpf,
+                                                "telefone": telefone})
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()["data"]["id"]
+
+
+@pytest.mark.parametrize("a, b", [
+    ("THIAGO", "TIAGO"), ("SOUZA", "SOUSA"), ("RAPHAEL", "RAFAEL"), ("KATIA", "CATIA"), ("LUIZ", "LUIS"),
+])
+def test_fonetica_aproxima_grafias(a, b):
+    assert fonetica(a) == fonetica(b)
+
+
+def test_chaves_ignoram_acentos_particulas_e_agnomes():
+    assert normalizar_nome("José da Conceição") == ["JOSE", "CONCEISAO"]
+    chaves = chaves_paciente("Thiago de Souza Filho", "+55 (11) 98765-4321")
+    assert chaves["fonetica_nome"] == "TIAGO SOUSA FILIO"
+    assert chaves["fonetica_primeiro"] == fonetica("TIAGO")
+    assert chaves["fonetica_ultimo"] == fonetica("SOUSA")
+    assert chaves["telefone_normalizado"] == "87654321"
+    assert chaves_paciente("Maria", "123")["fonetica_ultimo"] is None
+
+
+def test_pontuar():
+    assert pontuar(_ficha(), _ficha(nome="Tiago Sousa"))[0] == 1.0
+    pontuacao, similaridades = pontuar(_ficha(), _ficha(nascimento=date(1990, 1, 2), cpf="52998224752"))
+    assert similaridades["data_nascimento"] == 0.8
+    assert similaridades["cpf"] == 0.8
+    assert "telefone" not in similaridades
+    assert pontuacao == pytest.approx((0.4 + 0.3 * 0.8 + 0.2 * 0.8) / 0.9, abs=1e-3)
+    assert pontuar(_ficha(), _ficha(nome="Carlos Pereira", nascimento=date(1970, 6, 5), cpf="11144477735"),
+                   limiar=0.5) is None
+
+
+def test_rota_de_duplicatas(client):
+    original = _paciente(client, "Thiago de Souza", "01-02-1990", "52998224725", "11 98765-4321")
+    duplicata = _paciente(client, "Tiago Sousa", "01-02-1990", "11144477735")
+
+    resposta = client.get(f"/pacientes/{original}/duplicatas")
+    assert resposta.status_code == 200
+    (candidato,) = resposta.get_json()["data"]
+    assert candidato["paciente"]["id"] == duplicata
+    assert candidato["similaridades"]["nome"] == 1.0
+
+    for limiar in ("abc", "1.5", "-0.1"):
+        assert client.get(f"/pacientes/{original}/duplicatas?limiar={limiar}").status_code == 400
+    assert client.get("/pacientes/999/duplicatas").status_code == 404
+
+
+def test_limite_de_candidatos_le_primeiro_quem_divide_mais_blocos(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "DEDUP_MAX_CANDIDATES", 1)
+    # Só o primeiro nome e a data em comum, e id menor: sem ordenação seria o único candidato lido
+    _paciente(client, "Thiago Pereira", "01-02-1990", "39053344705")
+    duplicata = _paciente(client, "Tiago Sousa", "01-02-1990", "11144477735", "11 98765-4321")
+    original = _paciente(client, "Thiago de Souza", "01-02-1990", "52998224725", "11 98765-4321")
+
+    resposta = client.get(f"/pacientes/{original}/duplicatas?limiar=0")
+    assert [item["paciente"]["id"] for item in resposta.get_json()["data"]] == [duplicata]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Consulta, EventoConsulta, Medico, Paciente
+from app.services.eventos_consultas_service import eventos_desde
+
+
+@pytest.fixture
+def agenda(app):
+    with app.app_context():
+        paciente = Paciente(nome="Maria da Silva", data_nascimento=date(1990, 2, 1), cpf="52998224725")
+        medicos = [Medico(nome=nome, crm=crm, especialidade="clínica") for nome, crm in
+                   (("Ana Souza", "CRM-1"), ("Bruno Lima", "CRM-2"))]
+        db.session.add_all([paciente, *medicos])
+        db.session.commit()
+        return paciente.id, [medico.id for medico in medicos]
+
+
+def _consulta(app, paciente_id, medico_id, dia=1):
+    with app.app_context():
+        consulta = Consulta(paciente_id=paciente_id, medico_id=medico_id, data_consulta=datetime(2026, 3, dia, 9))
+        db.session.add(consulta)
+        db.session.commit()
+        return consulta.id
+
+
+def _eventos(app):
+    with app.app_context():
+        return db.session.execute(select(EventoConsulta).order_by(EventoConsulta.seq)).scalars().all()
+
+
+def test_evento_de_criacao_traz_os_valores_gravados_pelo_banco(app, agenda):
+    paciente_id, (medico_a, _) = agenda
+    _consulta(app, paciente_id, medico_a)
+
+    (evento,) = _eventos(app)
+    assert evento.tipo == "criada"
+    assert evento.dados["status"] == "agendada"
+    assert evento.dados["versao"] == 1
+    assert evento.dados["criado_em"] is not None
+
+
+def test_troca_de_medico_chega_aos_dois_streams(app, agenda):
+    paciente_id, (medico_a, medico_b) = agenda
+    consulta_id = _consulta(app, paciente_id, medico_a)
+    with app.app_context():
+        db.session.get(Consulta, consulta_id).medico_id = medico_b
+        db.session.commit()
+
+        do_a = eventos_desde(0, medico_a, 10)
+        do_b = eventos_desde(0, medico_b, 10)
+        todos = eventos_desde(0, None, 10)
+
+    assert [seq for seq, _ in todos] == [seq for seq, _ in do_a]
+    assert "consulta.atualizada" in do_a[-1][1] and f'"medico_id":{medico_b}' in do_a[-1][1]
+    assert [mensagem for _, mensagem in do_b] == [do_a[-1][1]]
+    assert len(todos) == 2
+
+
+def test_retomada_por_last_event_id_filtrada_por_medico(app, client, agenda, monkeypatch):
+    monkeypatch.setitem(app.config, "SSE_HEARTBEAT_SECONDS", 0.01)
+    paciente_id, (medico_a, medico_b) = agenda
+    _consulta(app, paciente_id, medico_a, dia=1)
+    visto = _eventos(app)[-1].seq
+    _consulta(app, paciente_id, medico_b, dia=2)
+    _consulta(app, paciente_id, medico_a, dia=3)
+    esperado = _eventos(app)[-1].seq
+
+    resposta = client.get(f"/consultas/eventos?medico_id={medico_a}", headers={"Last-Event-ID": str(visto)},
+                          buffered=False)
+    try:
+        assert resposta.status_code == 200
+        assert resposta.mimetype == "text/event-stream"
+        mensagens = (pedaco.decode() for pedaco in resposta.response)
+        assert next(mensagens).startswith("retry:")
+        assert next(mensagens).startswith(f"id: {esperado}\nevent: consulta.criada\n")
+        assert next(mensagens) == ": heartbeat\n\n"
+    finally:
+        resposta.close()
+
+
+def test_parametros_invalidos_do_stream(client):
+    assert client.get("/consultas/eventos", headers={"Last-Event-ID": "abc"}).status_code == 400
+    assert client.get("/consultas/eventos?medico_id=x").status_code == 400
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import io
+
+
+def _paciente(client):
+    resposta = client.post("/pacientes/", json={
+        "nome": "Maria da Silva", "data_nascimento": "01-02-1990", "cpf": "52998224725"})
+    return resposta.get_json()["data"]["id"]
+
+
+def _exame(client, id_paciente):
+    resposta = client.post("/exames/", json={"id_paciente": id_paciente, "tipo": "hemograma"})
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()["exame"]
+
+
+def test_criar_e_detalhar_exame_com_etag(client):
+    exame = _exame(client, _paciente(client))
+
+    resposta = client.get(f"/exames/{exame['id']}")
+    assert resposta.status_code == 200
+    assert resposta.get_json()["tipo"] == "hemograma"
+    assert resposta.headers["ETag"] == '"1"'
+
+
+def test_atualizar_exame_com_if_match(client):
+    exame = _exame(client, _paciente(client))
+
+    resposta = client.put(f"/exames/{exame['id']}", json={"resultado": "normal"}, headers={"If-Match": '"1"'})
+    assert resposta.status_code == 200
+    assert resposta.get_json()["exame"]["resultado"] == "normal"
+    assert resposta.headers["ETag"] == '"2"'
+
+    resposta = client.put(f"/exames/{exame['id']}", json={"resultado": "alterado"}, headers={"If-Match": '"1"'})
+    assert resposta.status_code == 412
+
+
+def test_listar_exames_do_paciente(client):
+    id_paciente = _paciente(client)
+    _exame(client, id_paciente)
+
+    assert client.get("/exames/").status_code == 200
+    resposta = client.get(f"/exames/paciente/{id_paciente}")
+    assert resposta.status_code == 200
+    assert len(resposta.get_json()) == 1
+
+
+def test_upload_de_arquivo(client, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "uploads").mkdir()
+    exame = _exame(client, _paciente(client))
+
+    resposta = client.post(f"/exames/{exame['id']}/upload",
+                           data={"arquivo": (io.BytesIO(b"%PDF-1.4"), "laudo.pdf")},
+                           content_type="multipart/form-data")
+    assert resposta.status_code == 200
+    assert resposta.get_json()["arquivo_exame"] == "uploads/laudo.pdf"
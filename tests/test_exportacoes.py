@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import csv
+import gzip
+import io
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.extensions import db
+from app.models import Exportacao
+
+
+def _paciente(client):
+    resposta = client.post("/pacientes/", json={
+        "nome": "Maria da Silva", "data_nascimento": "01-02-1990", "cpf": "52998224725"})
+    return resposta.get_json()["data"]["id"]
+
+
+def _aguardar(client, id_exportacao, prazo=10):
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        exportacao = client.get(f"/exportacoes/{id_exportacao}").get_json()["data"]
+        if exportacao["status"] not in ("pendente", "processando"):
+            return exportacao
+        time.sleep(0.05)
+    raise AssertionError("exportação não terminou no prazo")
+
+
+def test_ciclo_de_vida_da_exportacao(client):
+    id_paciente = _paciente(client)
+    for tipo in ("hemograma", "glicemia"):
+        client.post("/exames/", json={"id_paciente": id_paciente, "tipo": tipo})
+
+    resposta = client.post("/exportacoes/", json={"recurso": "exames", "formato": "csv"})
+    assert resposta.status_code == 202
+    exportacao = _aguardar(client, resposta.get_json()["data"]["id"])
+    assert exportacao["status"] == "concluida"
+    assert exportacao["linhas_exportadas"] == 2
+
+    arquivo = client.get(f"/exportacoes/{exportacao['id']}/arquivo")
+    assert arquivo.status_code == 200
+    assert arquivo.mimetype == "application/gzip"
+    linhas = list(csv.DictReader(io.StringIO(gzip.decompress(arquivo.data).decode("utf-8"))))
+    assert sorted(linha["tipo"] for linha in linhas) == ["glicemia", "hemograma"]
+
+
+def test_download_retomado_com_range(client):
+    resposta = client.post("/exportacoes/", json={"recurso": "consultas", "formato": "ndjson"})
+    exportacao = _aguardar(client, resposta.get_json()["data"]["id"])
+    completo = client.get(f"/exportacoes/{exportacao['id']}/arquivo").data
+
+    inicio = client.get(f"/exportacoes/{exportacao['id']}/arquivo", headers={"Range": "bytes=0-9"})
+    resto = client.get(f"/exportacoes/{exportacao['id']}/arquivo", headers={"Range": "bytes=10-"})
+    assert (inicio.status_code, resto.status_code) == (206, 206)
+    assert inicio.headers["Content-Range"] == f"bytes 0-9/{len(completo)}"
+    assert inicio.data + resto.data == completo
+
+
+def test_job_sem_heartbeat_e_marcado_como_erro(app, client):
+    with app.app_context():
+        parada = Exportacao(recurso="consultas", formato="csv", status="processando",
+                            atualizado_em=datetime.now(timezone.utc) - timedelta(
+                                seconds=app.config["EXPORT_STALE_SECONDS"] + 1))
+        viva = Exportacao(recurso="consultas", formato="csv", status="processando")
+        db.session.add_all([parada, viva])
+        db.session.commit()
+        ids = parada.id, viva.id
+
+    assert client.get(f"/exportacoes/{ids[0]}").get_json()["data"]["status"] == "erro"
+    assert client.get(f"/exportacoes/{ids[1]}").get_json()["data"]["status"] == "processando"
+
+    resposta = client.get(f"/exportacoes/{ids[0]}/arquivo")
+    assert resposta.status_code == 409
+    assert "message" in resposta.get_json()
+
+
+def test_erros_usam_message(client):
+    resposta = client.post("/exportacoes/", json={"recurso": "usuarios"})
+    assert resposta.status_code == 400
+    assert resposta.get_json() == {"success": False, "message": "Recurso inválido. Use: consultas, exames"}
+    assert client.get("/exportacoes/999").get_json()["message"] == "Exportação não encontrada"
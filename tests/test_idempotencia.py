@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from flask import Response, jsonify
+
+from app.models import Paciente
+from app.services.idempotencia_service import concluir_chave, reservar_chave
+from tests.conftest import criar_app
+
+PACIENTE = {"nome": "Maria da Silva", "data_nascimento": "01-02-1990", "cpf": "52998224725"}
+
+
+@pytest.fixture
+def app_contador(app):
+    # App próprio: rotas de teste não podem ser registradas depois da primeira requisição do app da sessão
+    app = criar_app()
+    app.chamadas = []
+
+    @app.route("/_teste/lento", methods=["POST"])
+    def lento():
+        app.chamadas.append("lento")
+        time.sleep(0.3)
+        return jsonify({"success": True, "chamada": len(app.chamadas)}), 201
+
+    @app.route("/_teste/instavel", methods=["POST"])
+    def instavel():
+        app.chamadas.append("instavel")
+        if len(app.chamadas) == 1:
+            return jsonify({"success": False}), 503
+        return jsonify({"success": True}), 201
+
+    return app
+
+
+def test_repeticao_devolve_a_resposta_gravada(client, app):
+    primeira = client.post("/pacientes/", json=PACIENTE, headers={"Idempotency-Key": "k1"})
+    segunda = client.post("/pacientes/", json=PACIENTE, headers={"Idempotency-Key": "k1"})
+
+    assert primeira.status_code == segunda.status_code == 201
+    assert "Idempotent-Replayed" not in primeira.headers
+    assert segunda.headers["Idempotent-Replayed"] == "true"
+    assert segunda.get_json() == primeira.get_json()
+    with app.app_context():
+        assert Paciente.query.count() == 1
+
+
+def test_chave_reutilizada_com_outro_corpo(client):
+    client.post("/pacientes/", json=PACIENTE, headers={"Idempotency-Key": "k1"})
+    resposta = client.post("/pacientes/", json={**PACIENTE, "nome": "Outra Pessoa"}, headers={"Idempotency-Key": "k1"})
+
+    assert resposta.status_code == 422
+
+
+def test_erro_5xx_libera_a_chave(app_contador):
+    cliente = app_contador.test_client()
+
+    assert cliente.post("/_teste/instavel", headers={"Idempotency-Key": "k1"}).status_code == 503
+    resposta = cliente.post("/_teste/instavel", headers={"Idempotency-Key": "k1"})
+    assert resposta.status_code == 201
+    assert "Idempotent-Replayed" not in resposta.headers
+    assert app_contador.chamadas == ["instavel", "instavel"]
+
+
+def test_requisicoes_simultaneas_executam_uma_vez(app_contador):
+    respostas = []
+
+    def enviar():
+        respostas.append(app_contador.test_client().post("/_teste/lento", headers={"Idempotency-Key": "k1"}))
+
+    threads = [threading.Thread(target=enviar) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert app_contador.chamadas == ["lento"]
+    assert [r.status_code for r in respostas] == [201, 201]
+    assert sorted(r.headers.get("Idempotent-Replayed", "") for r in respostas) == ["", "true"]
+    assert respostas[0].get_json() == respostas[1].get_json()
+
+
+def test_reserva_de_worker_morto_expira(client, app):
+    with app.app_context():
+        # Reserva deixada por um worker que morreu antes de gravar a resposta, já fora do arrendamento
+        abandonada, _ = reservar_chave("k1", "hash-qualquer", timedelta(seconds=-1))
+
+    resposta = client.post("/pacientes/", json=PACIENTE, headers={"Idempotency-Key": "k1"})
+    assert resposta.status_code == 201
+    assert "Idempotent-Replayed" not in resposta.headers
+
+    with app.app_context():
+        # O worker antigo não sobrescreve a resposta de quem retomou a chave
+        assert not concluir_chave(abandonada, Response("{}", status=500), timedelta(hours=1))
+    repeticao = client.post("/pacientes/", json=PACIENTE, headers={"Idempotency-Key": "k1"})
+    assert repeticao.status_code == 201
+    assert repeticao.headers["Idempotent-Replayed"] == "true"
+
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import pytest
+from flask import Flask
+
+from app import config
+from app.services.limite_requisicoes_service import BackendMemoria, BackendSQLite, caminho_padrao
+from tests.conftest import cadastrar_e_logar, criar_app
+
+
+def test_caminho_padrao_por_implantacao(tmp_path):
+    primeira = Flask("app", instance_path=str(tmp_path / "a"))
+    segunda = Flask("app", instance_path=str(tmp_path / "b"))
+
+    assert caminho_padrao(primeira) != caminho_padrao(segunda)
+    assert caminho_padrao(primeira) == caminho_padrao(Flask("app", instance_path=str(tmp_path / "a")))
+    assert BackendSQLite(primeira).caminho == caminho_padrao(primeira)
+
+
+def test_caminho_configurado(tmp_path):
+    app = Flask("app")
+    app.config["RATE_LIMIT_STORAGE_PATH"] = str(tmp_path / "baldes.sqlite3")
+    assert BackendSQLite(app).caminho == str(tmp_path / "baldes.sqlite3")
+
+
+def test_testes_usam_baldes_em_memoria(app):
+    assert isinstance(app.extensions["limite_requisicoes"], BackendMemoria)
+
+
+@pytest.fixture
+def app_limitado(monkeypatch):
+    monkeypatch.setattr(config.TestingConfig, "RATE_LIMIT_BUSCA", "2/60")
+    return criar_app()
+
+
+def _buscar(cliente, **kwargs):
+    return cliente.get("/medicos/buscar?nome=Ana", **kwargs)
+
+
+def test_balde_vazio_responde_429_com_retry_after(app_limitado):
+    cliente = app_limitado.test_client()
+    assert [_buscar(cliente).status_code for _ in range(2)] == [200, 200]
+
+    resposta = _buscar(cliente)
+    assert resposta.status_code == 429
+    assert resposta.get_json()["success"] is False
+    assert 1 <= int(resposta.headers["Retry-After"]) <= 30
+
+
+def test_baldes_separados_por_usuario_e_por_ip(app_limitado):
+    cliente = app_limitado.test_client()
+    cabecalhos = cadastrar_e_logar(cliente)
+    for _ in range(2):
+        _buscar(cliente)
+    assert _buscar(cliente).status_code == 429
+    # Token inválido não tira o cliente do balde do IP
+    assert _buscar(cliente, headers={"Authorization": "Bearer invalido"}).status_code == 429
+
+    assert [_buscar(cliente, headers=cabecalhos).status_code for _ in range(3)] == [200, 200, 429]
+    assert _buscar(cliente, environ_base={"REMOTE_ADDR": "10.0.0.2"}).status_code == 200
+
+
+def test_backend_com_falha_deixa_passar(app_limitado, monkeypatch, caplog):
+    def indisponivel(chave, capacidade, taxa):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(app_limitado.extensions["limite_requisicoes"], "consumir", indisponivel)
+    cliente = app_limitado.test_client()
+
+    assert [_buscar(cliente).status_code for _ in range(3)] == [200, 200, 200]
+    assert "Limitador de requisições indisponível" in caplog.text
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from app.models import Medico, Paciente
+
+
+def _paciente(cpf="52998224725"):
+    return {"nome": "Maria da Silva", "data_nascimento": "01-02-1990", "cpf": cpf}
+
+
+def test_lote_dentro_do_orcamento(client, app):
+    # Em modo raise o detector falha a requisição se o BEGIN IMMEDIATE do SQLite estourar o orçamento
+    resposta = client.post("/batch", json={"operacoes": [
+        {"recurso": "pacientes", "operacao": "criar", "ref": "p", "dados": _paciente()},
+        {"recurso": "exames", "operacao": "criar", "dados": {"id_paciente": {"$ref": "p"}, "tipo": "hemograma"}},
+    ]})
+
+    assert resposta.status_code == 200, resposta.get_json()
+    corpo = resposta.get_json()
+    assert [r["status"] for r in corpo["resultados"]] == [201, 201]
+    assert corpo["resultados"][1]["data"]["id_paciente"] == corpo["resultados"][0]["data"]["id"]
+
+
+def test_lote_falha_desfaz_todas_as_operacoes(client, app):
+    resposta = client.post("/batch", json={"operacoes": [
+        {"recurso": "pacientes", "operacao": "criar", "dados": _paciente()},
+        {"recurso": "medicos", "operacao": "criar", "dados": {"nome": "Dr. Sem CRM"}},
+    ]})
+
+    assert resposta.status_code in (400, 422)
+    assert resposta.get_json()["falha"]["indice"] == 1
+    with app.app_context():
+        assert Paciente.query.count() == 0
+        assert Medico.query.count() == 0
+
+
+def test_lote_versao_divergente_desfaz_criacoes_anteriores(client, app):
+    id_paciente = client.post("/pacientes/", json=_paciente()).get_json()["data"]["id"]
+
+    resposta = client.post("/batch", json={"operacoes": [
+        {"recurso": "pacientes", "operacao": "criar", "dados": _paciente("11144477735")},
+        {"recurso": "pacientes", "operacao": "atualizar", "id": id_paciente, "versao": 7,
+         "dados": {"nome": "Maria Souza"}},
+    ]})
+
+    assert resposta.status_code == 412
+    assert resposta.get_json()["falha"] == {"indice": 1, "status": 412, "message": resposta.get_json()["message"]}
+    with app.app_context():
+        pacientes = Paciente.query.all()
+        assert [(p.id, p.nome, p.versao) for p in pacientes] == [(id_paciente, "Maria da Silva", 1)]
+
+
+def test_lote_referencia_desconhecida_nao_grava_nada(client, app):
+    resposta = client.post("/batch", json={"operacoes": [
+        {"recurso": "pacientes", "operacao": "criar", "dados": _paciente()},
+        {"recurso": "exames", "operacao": "criar", "dados": {"id_paciente": {"$ref": "x"}, "tipo": "hemograma"}},
+    ]})
+
+    assert resposta.status_code == 400
+    with app.app_context():
+        assert Paciente.query.count() == 0
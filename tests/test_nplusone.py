@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import pytest
+from flask import jsonify
+
+from app.extensions import db
+from app.models import Paciente
+from app.services.nplusone_service import ConsultasExcessivasError, orcamento_queries
+from tests.conftest import criar_app
+
+
+@pytest.fixture
+def app_orcamento(app):
+    # App próprio: rotas não podem ser registradas depois da primeira requisição do app da sessão
+    app = criar_app()
+
+    @app.route("/_teste/orcamento", methods=["POST"])
+    @orcamento_queries(1)
+    def acima_do_orcamento():
+        try:
+            db.session.add(Paciente(nome="Fora do Orçamento", data_nascimento=db.func.current_date(),
+                                    cpf="52998224725"))
+            db.session.flush()
+            Paciente.query.count()
+            db.session.commit()
+            return jsonify({"success": True}), 201
+        except Exception as e:
+            # Como as rotas do projeto: o erro vira 400, mas o detector não pode ser engolido
+            return jsonify({"success": False, "message": str(e)}), 400
+
+    return app
+
+
+def test_modo_raise_sob_pytest_com_app_da_sessao(app):
+    assert app.config["_NPLUSONE_MODE"] == "raise"
+
+
+def test_rota_acima_do_orcamento_falha_antes_do_commit(app_orcamento):
+    with pytest.raises(ConsultasExcessivasError, match="máximo 1"):
+        app_orcamento.test_client().post("/_teste/orcamento")
+
+    with app_orcamento.app_context():
+        db.session.remove()
+        assert Paciente.query.count() == 0
+
+
+def test_rota_dentro_do_orcamento_passa(client):
+    resposta = client.post("/pacientes/", json={
+        "nome": "Maria da Silva", "data_nascimento": "01-02-1990", "cpf": "52998224725"})
+    assert resposta.status_code == 201
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import os
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import config
+from app.extensions import db
+from app.models import Consulta, Medico, Paciente
+from app.services.particionamento_service import garantir_particoes
+from tests.conftest import criar_app
+
+# Banco PostgreSQL descartável: as tabelas são apagadas e recriadas
+DSN = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not DSN, reason="TEST_POSTGRES_URL não definido")
+
+
+@pytest.fixture
+def app_postgres(monkeypatch):
+    monkeypatch.setattr(config.TestingConfig, "SQLALCHEMY_DATABASE_URI", DSN)
+    aplicacao = criar_app()
+    with aplicacao.app_context():
+        db.drop_all()
+        db.create_all()
+    yield aplicacao
+    with aplicacao.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+def test_particao_nova_recebe_linhas_do_default(app_postgres):
+    with app_postgres.app_context():
+        garantir_particoes(meses_a_frente=0, hoje=date(2026, 1, 15))
+        paciente = Paciente(nome="Maria da Silva", data_nascimento=date(1990, 2, 1), cpf="52998224725")
+        medico = Medico(nome="Ana Souza", crm="CRM-1", especialidade="clínica")
+        db.session.add_all([paciente, medico])
+        db.session.flush()
+        db.session.add_all([
+            Consulta(paciente_id=paciente.id, medico_id=medico.id, data_consulta=datetime(2026, mes, 10))
+            for mes in (1, 3, 4)
+        ])
+        db.session.commit()
+
+        particoes = garantir_particoes(meses_a_frente=0, hoje=date(2026, 3, 1))
+
+        assert "consultas_p2026_03" in particoes
+        with db.engine.connect() as conn:
+            def contar(tabela):
+                return conn.execute(text(f"SELECT count(*) FROM {tabela}")).scalar()
+            assert contar("consultas_p2026_03") == 1
+            assert contar("consultas_default") == 1
+            assert contar("consultas") == 3
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from tests.conftest import cadastrar_e_logar, logar
+
+
+def test_usuario_cadastrado_nao_perfila_requisicoes(client):
+    cabecalhos = cadastrar_e_logar(client)
+
+    resposta = client.get("/pacientes/?_profile=1", headers=cabecalhos)
+    assert resposta.status_code == 200
+    assert "X-Profile-Id" not in resposta.headers
+    assert client.get("/admin/perfis", headers=cabecalhos).status_code == 403
+    assert client.get("/admin/perfis/qualquer", headers=cabecalhos).status_code == 403
+
+
+def test_admin_perfila_e_le_o_resultado(app, client):
+    cadastrar_e_logar(client, "chefe")
+    app.test_cli_runner().invoke(args=["usuarios", "papel", "chefe", "admin"])
+    cabecalhos = logar(client, "chefe")
+
+    resposta = client.get("/pacientes/?_profile=1", headers=cabecalhos)
+    perfil_id = resposta.headers["X-Profile-Id"]
+    assert client.get(f"/admin/perfis/{perfil_id}", headers=cabecalhos).status_code == 200
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from app import config
+from app.extensions import db
+from tests.conftest import cadastrar_e_logar, criar_app
+
+PACIENTE = {"nome": "Maria da Silva", "data_nascimento": "01-02-1990", "cpf": "52998224725"}
+
+
+@pytest.fixture
+def app_replica(app, tmp_path, monkeypatch):
+    # Primário: o banco dos testes; réplica: outro arquivo SQLite com o mesmo esquema, que nunca recebe
+    # as escritas (uma réplica atrasada indefinidamente)
+    url = f"sqlite:///{tmp_path / 'replica.sqlite3'}"
+    monkeypatch.setattr(config.TestingConfig, "REPLICA_DATABASE_URLS", [url])
+    monkeypatch.setattr(config.TestingConfig, "SQLALCHEMY_BINDS", {"replica_0": url})
+    monkeypatch.setattr(config.TestingConfig, "REPLICA_STICKY_STORAGE_PATH", str(tmp_path / "janelas.sqlite3"))
+    app = criar_app()
+    with app.app_context():
+        db.metadata.create_all(db.engines["replica_0"])
+    yield app
+    # init_app registra um metadata por bind no db compartilhado: os demais apps não têm esse bind
+    db.metadatas.pop("replica_0", None)
+
+
+def test_leituras_vao_para_a_replica(app_replica):
+    cliente = app_replica.test_client(use_cookies=False)
+    id_paciente = cliente.post("/pacientes/", json=PACIENTE).get_json()["data"]["id"]
+
+    # Outro cliente, sem escrita recente: lê da réplica, que não tem o paciente
+    outro = cadastrar_e_logar(cliente, "outro")
+    assert cliente.get(f"/pacientes/{id_paciente}", headers=outro).status_code == 404
+
+
+def test_cliente_jwt_sem_cookie_le_a_propria_escrita(app_replica):
+    cliente = app_replica.test_client(use_cookies=False)
+    autor = cadastrar_e_logar(cliente, "autor")
+    outro = cadastrar_e_logar(cliente, "outro")
+
+    resposta = cliente.post("/pacientes/", json=PACIENTE, headers=autor)
+    assert resposta.status_code == 201
+    id_paciente = resposta.get_json()["data"]["id"]
+
+    assert cliente.get(f"/pacientes/{id_paciente}", headers=autor).status_code == 200
+    assert cliente.get(f"/pacientes/{id_paciente}", headers=outro).status_code == 404
+
+
+def test_cabecalho_devolvido_mantem_o_primario(app_replica):
+    cliente = app_replica.test_client(use_cookies=False)
+    outro = cadastrar_e_logar(cliente, "outro")
+    resposta = cliente.post("/pacientes/", json=PACIENTE)
+    id_paciente = resposta.get_json()["data"]["id"]
+
+    cabecalhos = {**outro, "X-Primario-Ate": resposta.headers["X-Primario-Ate"]}
+    assert cliente.get(f"/pacientes/{id_paciente}", headers=cabecalhos).status_code == 200
+
+
+def test_cookie_mantem_o_primario(app_replica):
+    cliente = app_replica.test_client()
+    outro = cadastrar_e_logar(cliente, "outro")
+    id_paciente = cliente.post("/pacientes/", json=PACIENTE, headers=outro).get_json()["data"]["id"]
+
+    assert cliente.get(f"/pacientes/{id_paciente}", headers=outro).status_code == 200
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from app.services import saude_service
+
+
+@pytest.fixture
+def verificacao(monkeypatch):
+    # Cada teste começa sem resultado em cache e troca a verificação do banco por uma controlada
+    monkeypatch.setitem(saude_service._cache, "resultado", None)
+    monkeypatch.setitem(saude_service._cache, "expira_em", 0.0)
+    chamadas = []
+
+    def trocar(funcao):
+        def verificar(app):
+            chamadas.append(time.monotonic())
+            return funcao()
+        monkeypatch.setattr(saude_service, "_verificar", verificar)
+    trocar.chamadas = chamadas
+    return trocar
+
+
+def test_readyz_usa_o_resultado_em_cache(app, client, verificacao):
+    verificacao(lambda: {"banco": {"ok": True, "ms": 1.0}})
+
+    assert client.get("/readyz").status_code == 200
+    assert client.get("/readyz").status_code == 200
+    assert len(verificacao.chamadas) == 1
+
+
+def test_banco_lento_responde_nao_pronto_no_tempo_limite(app, client, verificacao, monkeypatch):
+    monkeypatch.setitem(app.config, "READINESS_TIMEOUT_SECONDS", 0.05)
+    liberar = threading.Event()
+    verificacao(lambda: liberar.wait(5) and {"banco": {"ok": True}})
+    try:
+        inicio = time.monotonic()
+        resposta = client.get("/readyz")
+        assert time.monotonic() - inicio < 1
+        assert resposta.status_code == 503
+        assert "tempo esgotado" in resposta.get_data(as_text=True)
+    finally:
+        liberar.set()
+
+
+def test_espera_pelo_banco_nao_segura_o_lock(app, verificacao, monkeypatch):
+    monkeypatch.setitem(app.config, "READINESS_TIMEOUT_SECONDS", 2)
+    lock_durante_a_espera = []
+
+    def verificar():
+        time.sleep(0.1)
+        lock_durante_a_espera.append(saude_service._lock.locked())
+        return {"banco": {"ok": True}}
+    verificacao(verificar)
+
+    assert saude_service.prontidao(app)[0] is True
+    assert lock_durante_a_espera == [False]
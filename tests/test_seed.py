@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from app.models import Paciente
+from app.services.duplicidade_service import chaves_paciente
+from benchmarks.seed import popular
+
+
+def test_seed_grava_chaves_de_bloqueio(app):
+    with app.app_context():
+        popular({"pacientes": 20, "medicos": 2, "consultas": 5, "exames": 5, "usuarios": 1})
+
+        pacientes = Paciente.query.all()
+        assert len(pacientes) == 20
+        for paciente in pacientes:
+            assert paciente.fonetica_nome is not None
+            assert {coluna: getattr(paciente, coluna) for coluna in chaves_paciente(paciente.nome, paciente.telefone)} \
+                == chaves_paciente(paciente.nome, paciente.telefone)
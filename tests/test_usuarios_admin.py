@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from app.services.slow_query_service import mascarar_sql, mascarar_valor
+from tests.conftest import cadastrar_e_logar, logar
+
+
+def test_cadastro_pela_api_nao_e_admin(client):
+    resposta = client.post("/users/", json={"username": "novo", "email": "novo@curasys.local",
+                                            "password": "senha-forte", "role": "admin"})
+    assert resposta.status_code == 422
+
+    cabecalhos = cadastrar_e_logar(client, "novo")
+    usuario = client.get("/users/", headers=cabecalhos).get_json()["data"][0]
+    assert usuario["role"] == "recepcao"
+
+
+def test_usuario_cadastrado_nao_le_slow_queries(client):
+    cabecalhos = cadastrar_e_logar(client)
+    assert client.get("/admin/slow-queries").status_code == 401
+    assert client.get("/admin/slow-queries", headers=cabecalhos).status_code == 403
+    assert client.delete("/admin/slow-queries", headers=cabecalhos).status_code == 403
+
+
+def test_admin_so_pela_cli(app, client):
+    cadastrar_e_logar(client, "chefe")
+    resultado = app.test_cli_runner().invoke(args=["usuarios", "papel", "chefe", "admin"])
+    assert resultado.exit_code == 0, resultado.output
+
+    cabecalhos = logar(client, "chefe")
+    assert client.get("/admin/slow-queries", headers=cabecalhos).status_code == 200
+
+
+def test_slow_query_nao_guarda_valores():
+    parametros = ("Maria da Silva", "1990-02-01", 52998224725, ["a@b.com", None], {"nome": "José"})
+    assert mascarar_valor(parametros) == ["<str>", "<str>", "<int>", ["<str>", None], {"nome": "<str>"}]
+    assert mascarar_sql("SELECT * FROM pacientes WHERE nome = 'Maria' AND cpf = 52998224725") == \
+        "SELECT * FROM pacientes WHERE nome = '***' AND cpf = ***"
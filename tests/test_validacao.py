@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from app.controllers.paciente_controller import ESQUEMA_PACIENTE
+from app.services.validacao_service import ValidacaoError, completar_cpf, limpar_cpf
+
+
+def test_digitos_verificadores_do_cpf():
+    assert completar_cpf("529982247") == "52998224725"
+    assert completar_cpf("111444777") == "11144477735"
+    assert limpar_cpf("529.982.247-25") == "52998224725"
+    assert limpar_cpf(" 529 982 247 25") == "52998224725"
+
+
+@pytest.mark.parametrize("cpf", ["52998224724", "52998224715", "11111111111", "5299822472", "5299822472a"])
+def test_cpf_invalido(cpf):
+    with pytest.raises(ValueError):
+        limpar_cpf(cpf)
+
+
+def test_campos_somente_leitura_sao_ignorados_e_desconhecidos_recusados():
+    dados = {"nome": "Maria da Silva", "id": 7, "versao": 2, "criado_em": "2026-01-01T00:00:00"}
+    assert ESQUEMA_PACIENTE.validar(dados, parcial=True) == {"nome": "Maria da Silva"}
+
+    with pytest.raises(ValidacaoError) as erro:
+        ESQUEMA_PACIENTE.validar({**dados, "fonetica_nome": "MARIA"}, parcial=True)
+    assert erro.value.erros == [{"campo": "fonetica_nome", "erro": "Campo não permitido"}]
+
+
+def test_422_lista_todos_os_campos_invalidos(client):
+    resposta = client.post("/pacientes/", json={"nome": " ", "data_nascimento": "1990-02-01",
+                                                "cpf": "52998224724", "apelido": "Mari"})
+    assert resposta.status_code == 422
+    corpo = resposta.get_json()
+    assert corpo["success"] is False
+    assert corpo["erros"] == [
+        {"campo": "apelido", "erro": "Campo não permitido"},
+        {"campo": "nome", "erro": "Não pode ser vazio"},
+        {"campo": "data_nascimento", "erro": "Data inválida. Use DD-MM-YYYY"},
+        {"campo": "cpf", "erro": "CPF inválido"},
+    ]
+
+
+def test_put_aceita_o_recurso_lido(client):
+    criado = client.post("/pacientes/", json={"nome": "Maria da Silva", "data_nascimento": "01-02-1990",
+                                              "cpf": "52998224725"}).get_json()["data"]
+
+    resposta = client.put(f"/pacientes/{criado['id']}",
+                          json={**criado, "data_nascimento": "01-02-1990", "telefone": "11 98765-4321"})
+    assert resposta.status_code == 200, resposta.get_json()
+    assert resposta.get_json()["data"]["versao"] == 2
@@ -1,6 +1,14 @@
+import gc
+
 from app import create_app
 
-app = create_app("development")
+# Config escolhida por FLASK_ENV (production na imagem Docker)
+app = create_app()
+
+# Com `gunicorn --preload` o app é criado uma única vez no master e herdado pelos workers.
+# Congelar o GC aqui evita que as coletas nos workers escrevam nos objetos herdados
+# (e forcem a cópia das páginas), preservando o compartilhamento copy-on-write.
+gc.freeze()
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5000)